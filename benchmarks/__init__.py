@@ -0,0 +1,5 @@
+"""Performance benchmarks, run with airspeed velocity (`asv run`) from the repository root."""
+import os
+
+# The benchmarks run a fake Raven executable, see `common.py`, so the Raven binaries need not be installed.
+os.environ.setdefault("DO_NOT_CHECK_EXECUTABLE_EXISTENCE", "1")
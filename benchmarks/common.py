@@ -0,0 +1,29 @@
+"""Shared configuration of the benchmarks.
+
+Models launch the fake Raven executable in `fakeraven.py` instead of Raven, so that the benchmarks measure the time
+spent by raven around the simulations, and run on machines without the Raven binaries.
+"""
+import datetime as dt
+from pathlib import Path
+
+import numpy as np
+
+import raven
+
+TESTDATA = Path(__file__).parent.parent / "tests" / "testdata"
+FAKE_RAVEN = Path(__file__).parent / "fakeraven.py"
+
+raven.raven_exec = FAKE_RAVEN
+raven.ostrich_exec = getattr(raven, "ostrich_exec", None)
+
+# Forcing file and configuration of the Salmon River GR4J-CemaNeige emulator, as in the tests.
+TS = TESTDATA / "raven-gr4j-cemaneige" / "Salmon-River-Near-Prince-George_meteo_daily.nc"
+GR4JCN_PARAMS = (0.529, -3.396, 407.29, 1.072, 16.9, 0.947)
+SALMON = dict(start_date=dt.datetime(2000, 1, 1), end_date=dt.datetime(2002, 1, 1), area=4250.6, elevation=843.0,
+              latitude=54.4848, longitude=-123.3659)
+
+
+def ensemble_params(n, params=GR4JCN_PARAMS, seed=0):
+    """Return `n` parameter sets, perturbing `params` by up to 10%."""
+    rng = np.random.RandomState(seed)
+    return [tuple(np.array(params) * rng.uniform(.9, 1.1, len(params))) for _ in range(n)]
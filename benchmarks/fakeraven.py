@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+"""Stand-in for the Raven executable, used by the benchmarks.
+
+Called as `fakeraven.py <name> -o <output directory>` from the directory holding the `<name>.rv?` configuration files,
+it writes the outputs Raven would write for a daily simulation over the period and the HRUs configured: the
+`Hydrographs.nc` and `WatershedStorage.nc` netCDF files, with the same variables, dimensions and attributes as Raven's,
+the `solution.rvc` end state, the `Diagnostics.csv` table and the `Raven_progress.txt` progress file. Flows are a
+synthetic seasonal signal whose noise is seeded by the model parameters, so that members of an ensemble differ.
+
+Called without arguments, it prints a version string, like Raven does.
+"""
+import datetime as dt
+import json
+import re
+import sys
+from pathlib import Path
+
+import netCDF4 as nc
+import numpy as np
+
+VERSION = "3.0 fake"
+STORAGE = ("Surface Water", "Ponded Water", "Soil Water[0]", "Soil Water[1]", "Snow", "Convolution[0]",
+           "Convolution[1]", "Channel Storage", "Rivulet Storage", "Total")
+STATE = ("SURFACE_WATER", "ATMOSPHERE", "ATMOS_PRECIP", "PONDED_WATER", "SOIL[0]", "SOIL[1]", "SNOW", "SNOW_COVER",
+         "AET", "CONVOLUTION[0]", "CONVOLUTION[1]") + tuple("CONV_STOR[{}]".format(i) for i in range(100))
+
+
+def config(name):
+    """Return the run name, start date, number of days and number of HRUs configured, and the parameter values."""
+    rvi = Path(name + ".rvi").read_text()
+    run_name = re.search(r"^\s*:RunName\s+(\S+)", rvi, re.MULTILINE).group(1)
+    start = dt.datetime.strptime(re.search(r"^\s*:StartDate\s+(\S+)", rvi, re.MULTILINE).group(1), "%Y-%m-%d")
+
+    match = re.search(r"^\s*:Duration\s+(\S+)", rvi, re.MULTILINE)
+    if match:
+        ndays = int(float(match.group(1)))
+    else:
+        end = re.search(r"^\s*:EndDate\s+(\S+)", rvi, re.MULTILINE).group(1)
+        ndays = (dt.datetime.strptime(end, "%Y-%m-%d") - start).days
+
+    rvh = Path(name + ".rvh").read_text()
+    hrus = rvh[rvh.find(":HRUs"):rvh.find(":EndHRUs")].splitlines()[1:]
+    nhru = max(sum(1 for line in hrus if line.strip() and not line.strip().startswith(':')), 1)
+
+    rvp = Path(name + ".rvp").read_text()
+    params = [float(v) for v in re.findall(r"(?<![\w.\[])-?\d+\.\d+(?:[eE][-+]?\d+)?", rvp)]
+    return run_name, start, ndays, nhru, params
+
+
+def progress(out, percent):
+    (out / "Raven_progress.txt").write_text(json.dumps({"progress": percent}))
+
+
+def write_netcdf(fn, start, variables, basins=None):
+    """Write time series `variables`, a dict of (dims, values, attributes), in the layout of Raven's outputs."""
+    with nc.Dataset(str(fn), "w") as ds:
+        ds.setncatts(dict(Conventions="CF-1.6", featureType="timeSeries", history="Created by Raven",
+                          description="Standard Output"))
+        ds.createDimension("time", None)
+        t = ds.createVariable("time", "f8", ("time",))
+        t.setncatts(dict(units="days since {:%Y-%m-%d %H:%M:%S}".format(start), calendar="gregorian",
+                         standard_name="time"))
+        t[:] = np.arange(len(next(iter(variables.values()))[1]))
+
+        if basins is not None:
+            ds.createDimension("nbasins", len(basins))
+            b = ds.createVariable("basin_name", str, ("nbasins",))
+            b.setncatts(dict(long_name="Name/ID of sub-basins with simulated outflows", cf_role="timeseries_id",
+                             units="1"))
+            for i, name in enumerate(basins):
+                b[i] = name
+
+        for key, (dims, values, attrs) in variables.items():
+            v = ds.createVariable(key, "f8", dims, fill_value=-9999.0)
+            v.setncatts(dict(attrs, missing_value=-9999.0))
+            if "nbasins" in dims:
+                v.coordinates = "basin_name"
+            v[:] = values
+
+
+def main(name, out):
+    run_name, start, ndays, nhru, params = config(name)
+    rng = np.random.RandomState(int(abs(sum(params)) * 1000) % 2 ** 32)
+    out.mkdir(parents=True, exist_ok=True)
+    progress(out, 0)
+
+    # Daily flows with a spring freshet, and observations drawn around them.
+    doy = (np.arange(ndays) + start.timetuple().tm_yday) % 365.25
+    base = 20 + 300 * np.exp(-((doy - 150) / 25.) ** 2)
+    q_sim = base * (1 + .2 * rng.standard_normal(ndays)).clip(.1)
+    q_obs = base * (1 + .2 * rng.standard_normal(ndays)).clip(.1)
+    precip = rng.gamma(.5, 4., ndays)
+    progress(out, 50)
+
+    flow = dict(units="m**3 s**-1")
+    write_netcdf(out / "{}_Hydrographs.nc".format(run_name), start, {
+        "precip": (("time",), precip, dict(units="mm d**-1", long_name="Precipitation")),
+        "q_sim": (("time", "nbasins"), q_sim[:, None], dict(flow, long_name="Simulated outflows")),
+        "q_obs": (("time", "nbasins"), q_obs[:, None], dict(flow, long_name="Observed outflows")),
+        "q_in": (("time", "nbasins"), np.zeros((ndays, 1)), dict(flow, long_name="Observed inflows")),
+    }, basins=["watershed"])
+
+    write_netcdf(out / "{}_WatershedStorage.nc".format(run_name), start, {
+        key: (("time",), rng.gamma(2., 50., ndays), dict(units="mm", long_name=key)) for key in STORAGE})
+
+    nse = 1 - ((q_sim - q_obs) ** 2).sum() / ((q_obs - q_obs.mean()) ** 2).sum()
+    rmse = np.sqrt(((q_sim - q_obs) ** 2).mean())
+    (out / "{}_Diagnostics.csv".format(run_name)).write_text(
+        "observed data series,filename,DIAG_NASH_SUTCLIFFE,DIAG_RMSE,\n"
+        "HYDROGRAPH,{},{},{},\n".format(name + ".rvt", nse, rmse))
+
+    # End state of each HRU and of the basin.
+    end = start + dt.timedelta(days=ndays)
+    state = rng.uniform(0, 500, (nhru, len(STATE)))
+    rows = ["{},".format(i + 1) + ",".join("{:.5f}".format(v) for v in row) for i, row in enumerate(state)]
+    header = [":TimeStamp {:%Y-%m-%d %H:%M:%S}.00".format(end),
+              ":HRUStateVariableTable",
+              " :Attributes," + ",".join(STATE),
+              " :Units," + ",".join("mm" for _ in STATE)]
+    basin = [":EndHRUStateVariableTable",
+             ":BasinStateVariables",
+             " :BasinIndex 1,watershed",
+             "   :ChannelStorage, 0.00000",
+             "   :RivuletStorage, {:.5f}".format(rng.uniform(1e5, 1e6)),
+             "   :Qout,1,{0:.5f},{0:.5f}".format(q_sim[-1]),
+             "   :Qlat,1,{0:.5f},{0:.5f}".format(q_sim[-1]),
+             "   :Qin ,20," + ",".join(["0.00000"] * 20),
+             ":EndBasinStateVariables",
+             ""]
+    (out / "{}_solution.rvc".format(run_name)).write_text("\n".join(header + rows + basin))
+
+    progress(out, 100)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("RAVEN Version {} ".format(VERSION))
+        sys.exit(0)
+
+    args = sys.argv[1:]
+    out = Path(args[args.index("-o") + 1]) if "-o" in args else Path(".")
+    main(args[0], out)
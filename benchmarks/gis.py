@@ -0,0 +1,76 @@
+"""Benchmarks of the watershed selection and terrain analysis utilities, for networks and rasters of increasing size."""
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import rasterio
+from rasterio.transform import from_origin
+from shapely.geometry import box
+
+from raven.utilities import gis
+from raven.utils import dem_prop
+
+
+def hydrobasins_network(n, seed=0):
+    """Return a table of `n` HydroBASINS-like sub-basins draining into a single outlet, the first one."""
+    rng = np.random.RandomState(seed)
+    ids = 7120000000 + np.arange(n)
+    # Each basin drains into a basin created before it, so the network is a tree rooted at the outlet.
+    down = np.r_[0, ids[(rng.uniform(size=n - 1) * np.arange(1, n)).astype(int)]]
+    return pd.DataFrame({"HYBAS_ID": ids, "NEXT_DOWN": down, "MAIN_BAS": ids[0]})
+
+
+class UpstreamIds:
+    """Select the sub-basins upstream of the outlet, and of the first basin draining into it, about half the network."""
+    params = [100, 1000, 5000, 100000]
+    param_names = ["basins"]
+    timeout = 300
+
+    def setup(self, basins):
+        self.df = hydrobasins_network(basins)
+        self.index = gis.UpstreamIndex.from_frame(self.df)
+
+    def time_outlet(self, basins):
+        gis.hydrobasins_upstream_ids(self.df.HYBAS_ID[0], self.df)
+
+    def time_tributary(self, basins):
+        gis.hydrobasins_upstream_ids(self.df.HYBAS_ID[1], self.df)
+
+    def time_index_build(self, basins):
+        gis.UpstreamIndex.from_frame(self.df)
+
+    def time_index_tributary(self, basins):
+        self.index.upstream(self.df.HYBAS_ID[1])
+
+
+class DemProp:
+    """Compute the mean elevation, slope and aspect of a synthetic DEM, over the whole raster and over a polygon."""
+    params = [100, 500, 2000]
+    param_names = ["pixels"]
+    timeout = 300
+
+    def setup(self, pixels):
+        self.tmpdir = Path(tempfile.mkdtemp())
+        self.dem = self.tmpdir / "dem.tiff"
+
+        # Smooth hills over a 90 m grid in a projected coordinate system.
+        x, y = np.meshgrid(np.linspace(0, 6 * np.pi, pixels), np.linspace(0, 4 * np.pi, pixels))
+        elevation = (500 + 200 * np.sin(x) * np.cos(y) + 10 * np.random.RandomState(0).rand(pixels, pixels))
+        transform = from_origin(-1000000, 500000, 90, 90)
+        with rasterio.open(self.dem, "w", driver="GTiff", height=pixels, width=pixels, count=1, dtype="float32",
+                           crs="EPSG:3978", transform=transform, nodata=-9999) as f:
+            f.write(elevation.astype("float32"), 1)
+
+        width = pixels * 90
+        self.geom = box(-1000000 + width / 4, 500000 - 3 * width / 4, -1000000 + 3 * width / 4, 500000 - width / 4)
+
+    def teardown(self, pixels):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def time_raster(self, pixels):
+        dem_prop(self.dem, directory=self.tmpdir)
+
+    def time_polygon(self, pixels):
+        dem_prop(self.dem, geom=self.geom, directory=self.tmpdir)
@@ -0,0 +1,41 @@
+"""Benchmarks of the xclim indicators behind the streamflow statistics processes, over ensembles of simulations."""
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from raven.processes import TSStatsProcess, FreqAnalysisProcess, FitProcess, BaseFlowIndexProcess
+
+
+def ensemble_q_sim(members, years=30, seed=0):
+    """Return daily flows for an ensemble of `members` simulations, laid out as a merged Raven hydrograph."""
+    rng = np.random.RandomState(seed)
+    time = pd.date_range("1980-01-01", periods=int(years * 365.25), freq="D")
+    doy = time.dayofyear.values
+    base = 20 + 300 * np.exp(-((doy - 150) / 25.) ** 2)
+    q = base * (1 + .2 * rng.standard_normal((members, len(time)))).clip(.1)
+    return xr.DataArray(q[:, :, np.newaxis], dims=("params", "time", "nbasins"), coords={"time": time}, name="q_sim",
+                        attrs={"units": "m**3 s**-1", "long_name": "Simulated outflows",
+                               "standard_name": "water_volume_transport_in_river_channel"})
+
+
+class Indicators:
+    """Compute the indicators of the TSStats, FreqAnalysis, Fit and BaseFlowIndex processes."""
+    params = [1, 10, 50]
+    param_names = ["members"]
+    timeout = 300
+
+    def setup(self, members):
+        self.q = ensemble_q_sim(members)
+        self.ts = TSStatsProcess.xci(self.q, freq="YS", op="max")
+
+    def time_ts_stats(self, members):
+        TSStatsProcess.xci(self.q, freq="YS", op="max", season="JJA").load()
+
+    def time_freq_analysis(self, members):
+        FreqAnalysisProcess.xci(self.q, mode="max", t=[2, 50], dist="gumbel_r", season="JJA").load()
+
+    def time_fit(self, members):
+        FitProcess.xci(self.ts, dist="gumbel_r").load()
+
+    def time_base_flow_index(self, members):
+        BaseFlowIndexProcess.xci(self.q, freq="YS").load()
@@ -0,0 +1,66 @@
+"""Benchmarks of model runs over parameter ensembles of increasing size, and of the merging of their outputs."""
+import shutil
+import tempfile
+
+from raven.models import GR4JCN
+
+from .common import SALMON, TS, ensemble_params
+
+
+class RunFanOut:
+    """Launch one fake Raven run per parameter set, then parse and merge the outputs."""
+    params = [1, 10, 50]
+    param_names = ["members"]
+    number = 1
+    repeat = 5
+    timeout = 300
+
+    def setup(self, members):
+        self.workdir = tempfile.mkdtemp()
+        self.model = GR4JCN(self.workdir)
+        self.ensemble = ensemble_params(members)
+
+    def teardown(self, members):
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def time_run(self, members):
+        self.model(TS, params=self.ensemble, overwrite=True, **SALMON)
+
+    def time_run_sequential(self, members):
+        self.model.max_processes = 1
+        self.model(TS, params=self.ensemble, overwrite=True, **SALMON)
+
+    def peakmem_run(self, members):
+        self.model(TS, params=self.ensemble, overwrite=True, **SALMON)
+
+
+class MergeOutput:
+    """Merge the outputs of an ensemble of runs into single files."""
+    params = [1, 10, 50]
+    param_names = ["members"]
+    timeout = 300
+
+    def setup_cache(self):
+        # The runs are done once, the merge benchmarks read the same member files.
+        models = {}
+        for members in self.params:
+            model = GR4JCN(tempfile.mkdtemp())
+            model(TS, params=ensemble_params(members), **SALMON)
+            models[members] = model.workdir
+        return models
+
+    def setup(self, models, members):
+        self.model = GR4JCN(models[members])
+        self.model._pdim = "params"
+
+    def time_merge_hydrographs(self, models, members):
+        self.model._merge_output(self._files("*Hydrographs.nc"), "Hydrographs.nc")
+
+    def time_merge_storage(self, models, members):
+        self.model._merge_output(self._files("*WatershedStorage.nc"), "WatershedStorage.nc")
+
+    def time_merge_solutions(self, models, members):
+        self.model._merge_output(self._files("*solution.rvc"), "solution.rvc")
+
+    def _files(self, pattern):
+        return sorted(self.model._get_output(pattern, path=self.model.exec_path))
@@ -0,0 +1,100 @@
+"""Benchmarks of the regionalization of model parameters from gauged donor catchments."""
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+from raven.utilities import regionalization as reg
+
+from .common import SALMON, TS
+
+VARIABLES = ["latitude", "longitude", "area", "forest"]
+TARGET = {"latitude": 54.4848, "longitude": -123.3659, "area": 4250.6, "forest": 0.4}
+
+
+class Regionalize:
+    """Rank the donors, estimate parameters and run the model for each donor with the fake Raven executable."""
+    params = (["SP", "PS_IDW", "SP_IDW_RA", "MLR"], [2, 5, 10])
+    param_names = ["method", "size"]
+    number = 1
+    repeat = 5
+    timeout = 300
+
+    def setup(self, method, size):
+        self.nash, self.gauged = reg.read_gauged_params("GR4JCN")
+        self.props = reg.read_gauged_properties(VARIABLES)
+        # The models created by `regionalize` work in temporary directories, gathered here to be deleted afterwards.
+        self.workdir = tempfile.mkdtemp()
+        tempfile.tempdir, self.tempdir = self.workdir, tempfile.tempdir
+
+    def teardown(self, method, size):
+        tempfile.tempdir = self.tempdir
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def time_regionalize(self, method, size):
+        reg.regionalize(method, "GR4JCN", self.nash, self.gauged, self.props, TARGET, size=size, min_NSE=0.6,
+                        ts=TS, name="Salmon", run_name="bench", **SALMON)
+
+
+class RegionalizeBatch:
+    """Regionalize targets scattered around the Salmon River catchment in a single parallel ensemble."""
+    params = (["SP_IDW", "PS_IDW_RA"], [1, 5, 20])
+    param_names = ["method", "targets"]
+    number = 1
+    repeat = 3
+    timeout = 600
+
+    def setup(self, method, targets):
+        self.nash, self.gauged = reg.read_gauged_params("GR4JCN")
+        self.props = reg.read_gauged_properties(VARIABLES)
+        rng = np.random.RandomState(0)
+        self.targets = pd.DataFrame({key: TARGET[key] * rng.uniform(.95, 1.05, targets) for key in VARIABLES})
+        self.workdir = tempfile.mkdtemp()
+        tempfile.tempdir, self.tempdir = self.workdir, tempfile.tempdir
+
+    def teardown(self, method, targets):
+        tempfile.tempdir = self.tempdir
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def time_regionalize_batch(self, method, targets):
+        reg.regionalize_batch(method, "GR4JCN", self.nash, self.gauged, self.props, self.targets, size=5,
+                              min_NSE=0.6, ts=TS, **SALMON)
+
+
+class Donors:
+    """Read the donor tables, rank the donors and fit the parameters to the catchment properties."""
+
+    def setup(self):
+        self.nash, self.gauged = reg.read_gauged_params("GR4JCN")
+        self.props = reg.read_gauged_properties(VARIABLES)
+        self.target = pd.Series(TARGET)
+        self.index = reg.DonorIndex(self.props, self.nash)
+        for method in ["distance", "similarity"]:
+            self.index.nearest(self.target, 10, method=method, min_NSE=0.6)
+
+    def time_read_gauged_params(self):
+        reg.read_gauged_params("GR4JCN")
+
+    def time_read_gauged_properties(self):
+        reg.read_gauged_properties(VARIABLES)
+
+    def time_distance(self):
+        reg.distance(self.props, self.target)
+
+    def time_similarity(self):
+        reg.similarity(self.props, self.target)
+
+    def time_donor_index_distance(self):
+        self.index.nearest(self.target, 10, method="distance", min_NSE=0.6)
+
+    def time_donor_index_similarity(self):
+        self.index.nearest(self.target, 10, method="similarity", min_NSE=0.6)
+
+    def time_donor_index_build(self):
+        reg.DonorIndex(self.props, self.nash).nearest(self.target, 10, method="similarity", min_NSE=0.6)
+
+    def time_multiple_linear_regression(self):
+        reg.multiple_linear_regression(self.props, self.gauged, self.target.to_frame().T)
+
+    def time_gauged_mlr(self):
+        reg.gauged_mlr("GR4JCN", self.props.columns, 0.6).predict(self.target)
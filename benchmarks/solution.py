@@ -0,0 +1,51 @@
+"""Benchmarks of solution file reading and writing, for HRU state tables of increasing size."""
+import shutil
+import tempfile
+from pathlib import Path
+
+from raven.models.rv import RVC, parse_solution
+from raven.models.solution import read_solution, write_solution
+
+from .common import TESTDATA
+
+
+def solution_text(nhru):
+    """Return the content of the test solution file, with its HRU row repeated `nhru` times."""
+    lines = (TESTDATA / "solution.rvc").read_text().splitlines()
+    i = next(i for i, line in enumerate(lines) if line.strip().startswith(':EndHRUStateVariableTable'))
+    _, row = lines[i - 1].split(',', 1)
+    rows = ["{},{}".format(n + 1, row) for n in range(nhru)]
+    return "\n".join(lines[:i - 1] + rows + lines[i:])
+
+
+class SolutionRoundTrip:
+    params = [1, 100, 10000]
+    param_names = ['nhru']
+
+    def setup(self, nhru):
+        self.tmpdir = Path(tempfile.mkdtemp())
+        self.text = solution_text(nhru)
+        self.solution = read_solution(self.text)
+        self.rvc = RVC()
+        self.rvc.parse(self.text)
+
+    def teardown(self, nhru):
+        shutil.rmtree(str(self.tmpdir))
+
+    def time_read(self, nhru):
+        read_solution(self.text)
+
+    def time_write(self, nhru):
+        write_solution(self.solution, self.tmpdir / "solution.rvc")
+
+    def time_round_trip(self, nhru):
+        read_solution(write_solution(read_solution(self.text), self.tmpdir / "solution.rvc"))
+
+    def time_parse_solution(self, nhru):
+        parse_solution(self.text)
+
+    def time_rvc_parse(self, nhru):
+        RVC().parse(self.text)
+
+    def time_rvc_text(self, nhru):
+        self.rvc.txt_hru_state
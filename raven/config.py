@@ -1 +1,13 @@
 max_parallel_processes = 100
+
+# RAM-backed directory where models with `scratch` set run, and the free space it must have left for them to use it.
+scratch_dir = '/dev/shm'
+scratch_min_free = 512 * 2 ** 20
+
+# Whether WPS processes run their models in `scratch_dir`, unless the process sets its own `scratch` attribute.
+wps_scratch = False
+
+# Directory where the gauged catchment tables used for regionalization are stored as NumPy arrays, shared by worker
+# processes. Other processes load the tables found there, so it should only be writable by the service account. If
+# None, tables are only cached in memory.
+table_cache_dir = None
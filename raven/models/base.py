@@ -8,6 +8,7 @@ Raven : A generic class that knows how to launch the model from completed rv fil
 Ostrich:
 
 """
+import copy
 import csv
 import datetime as dt
 import os
@@ -15,15 +16,26 @@ import shutil
 import stat
 import subprocess
 import tempfile
+import time
+import warnings
+import weakref
 from collections import OrderedDict
 from pathlib import Path
+from typing import NamedTuple
 
 import numpy as np
 import six
 import xarray as xr
 
 import raven
+from raven import config
 from .rv import RVFile, RV, RVI, isinstance_namedtuple, Ost, RavenNcData, parse_solution
+from .scheduler import Job, run_processes, arun_processes, default_max_processes, ProgressTracker
+from .cache import ResultCache
+from .merge import merge_netcdf, ZarrEnsemble
+from .forcing import forcing_metadata
+from .profiling import Profile, bytes_written
+from . import engines
 
 
 class Raven:
@@ -119,6 +131,35 @@ class Raven:
         self._psim = 0
         self._pdim = None  # Parallel dimension (either params or nbasins)
 
+        # Parallel execution
+        self.max_processes = None  # Maximum number of simultaneous runs. Defaults to the number of CPUs.
+        self.run_callback = None  # Function called with the RunResult of each run as soon as it completes.
+        self.progress_callback = None  # Function called with the overall progress percentage of the runs.
+        self._progress = None  # ProgressTracker of the current runs.
+        self.run_results = []  # RunResult (exit code and stderr) for each run of the last call.
+        self.profile = Profile()  # Resources used by each phase of the last call, see `timings`.
+
+        # ResultCache instance. If set, outputs of identical simulations are served from the cache.
+        self.cache = None
+        self._cache_entries = []  # (key, output path) of simulations to store in the cache once completed.
+
+        # If True, the hydrograph and storage of parallel simulations are aggregated in chunked Zarr stores, filled as
+        # simulations complete, instead of netCDF files.
+        self.zarr = False
+        self._members = {}  # Index along the parallel dimension of each simulation, keyed by output path.
+        self._stores = {}  # ZarrEnsemble of each aggregated output.
+
+        # If True, `setup(overwrite=True)` keeps the configuration files, links and directories of the previous run and
+        # moves its outputs to `workdir/previous` instead of deleting the whole work directory. Configuration files
+        # are then only rewritten if their content changed.
+        self.reuse_workspace = False
+
+        # If True, the model runs in a directory under `config.scratch_dir`. Only outputs are copied to `final_path`.
+        self.scratch = False
+        self._scratch = None  # Scratch directory in use, deleted along with the model instance.
+
+        self._datasets = {}  # Lazily opened output datasets, closed when outputs are parsed again.
+
     @property
     def output_path(self):
         return self.model_path / self.output_dir
@@ -159,6 +200,11 @@ class Raven:
         """This is the main executable."""
         return self.raven_cmd
 
+    @property
+    def progress_file(self):
+        """Path to the file where the executable reports its progress."""
+        return self.output_path / 'Raven_progress.txt'
+
     @property
     def bash_cmd(self):
         """Bash command arguments."""
@@ -262,18 +308,98 @@ class Raven:
            model/
            output/
 
+        If `reuse_workspace` is True, overwriting keeps the configuration files, links and directories in place and
+        only rotates the outputs of the previous run to `workdir/previous`.
+
+        If `scratch` is True, `exec/` is created in a scratch directory instead, see `_allocate_scratch`.
+        """
+        with self.profile.phase('setup'):
+            if self.scratch and self._scratch is None:
+                self._allocate_scratch()
+
+            if overwrite:
+                if self.reuse_workspace:
+                    self._rotate_outputs()
+                else:
+                    if self.model_path.exists():
+                        shutil.rmtree(str(self.exec_path))
+                    if self.final_path.exists():
+                        shutil.rmtree(str(self.final_path))
+
+            # Create general subdirectories
+            if not self.exec_path.exists():
+                os.makedirs(str(self.exec_path))  # workdir/exec
+            if not self.final_path.exists():
+                os.makedirs(str(self.final_path))  # workdir/final
+
+    def _rotate_outputs(self):
+        """Move the outputs of the previous run to `workdir/previous`, replacing those of the run before it."""
+        previous = self.workdir / 'previous'
+        if previous.exists():
+            shutil.rmtree(str(previous))
+
+        outputs = [p for p in self.exec_path.rglob(self.output_dir) if p.is_dir()] if self.exec_path.exists() else []
+        if self.final_path.exists():
+            outputs.append(self.final_path)
+
+        for path in outputs:
+            if path == self.final_path:
+                dest = previous / self.final_dir
+            else:
+                dest = previous / path.relative_to(self.exec_path.parent)
+            os.makedirs(str(dest.parent), exist_ok=True)
+            shutil.move(str(path), str(dest))
+
+    def _allocate_scratch(self):
+        """Move the execution directory to a new directory under `config.scratch_dir`.
+
+        The scratch directory holds a link to `final_path`, so that paths relative to the execution directory resolve as
+        in the work directory. It is deleted along with the model instance. If the scratch directory has less than
+        `config.scratch_min_free` bytes available, the model runs in its work directory.
+        """
+        root = Path(config.scratch_dir)
+        try:
+            free = shutil.disk_usage(str(root)).free
+        except OSError:
+            free = 0
+
+        if free < config.scratch_min_free:
+            warnings.warn("Not enough space available in scratch directory {}. Running in {} instead."
+                          .format(root, self.workdir))
+            return
+
+        self._scratch = Path(tempfile.mkdtemp(prefix='raven-', dir=str(root)))
+        weakref.finalize(self, shutil.rmtree, str(self._scratch), True)
+
+        self.exec_path = self._scratch / 'exec'
+        os.makedirs(str(self.final_path), exist_ok=True)
+        os.symlink(str(self.final_path.absolute()), str(self._scratch / self.final_dir))
+
+    def _collect_outputs(self):
+        """Copy the outputs and individual outputs stored in the scratch directory to `final_path`.
+
+        Outputs are copied to `final_path`, and individual outputs to `final_path/scratch`, keeping their path relative
+        to the scratch directory. No output then refers to the scratch directory, which is deleted along with the model.
         """
-        if overwrite:
-            if self.model_path.exists():
-                shutil.rmtree(str(self.exec_path))
-            if self.final_path.exists():
-                shutil.rmtree(str(self.final_path))
-
-        # Create general subdirectories
-        if not self.exec_path.exists():
-            os.makedirs(str(self.exec_path))  # workdir/exec
-        if not self.final_path.exists():
-            os.makedirs(str(self.final_path))  # workdir/final
+        if self._scratch is None:
+            return
+
+        copied = {}
+
+        def copy(fn, dest):
+            if fn not in copied:
+                os.makedirs(str(dest.parent), exist_ok=True)
+                shutil.copy2(str(fn), str(dest))
+                copied[fn] = dest
+            return copied[fn]
+
+        for key, fn in self.outputs.items():
+            if isinstance(fn, Path) and self._scratch in fn.parents:
+                self.outputs[key] = copy(fn, self.final_path / fn.name)
+
+        for key, fns in self.ind_outputs.items():
+            self.ind_outputs[key] = [copy(fn, self.final_path / 'scratch' / fn.relative_to(self._scratch))
+                                     if self._scratch in fn.parents else fn for fn in fns]
 
     def setup_model_run(self, ts):
         """Create directory structure to store model input files, executable and output results.
@@ -286,7 +412,8 @@ class Raven:
           Run index.
         """
         # Create configuration information from input files
-        ncvars = self._assign_files(ts)
+        with self.profile.phase('assign_files'):
+            ncvars = self._assign_files(ts)
         self.rvt.update(ncvars)
         self.check_units()
         self.check_inputs()
@@ -295,19 +422,17 @@ class Raven:
         self.derived_parameters()
 
         # Write configuration files in model directory
-        if not self.model_path.exists():
-            os.makedirs(self.model_path)
-            os.makedirs(self.output_path)
-        self._dump_rv()
+        os.makedirs(str(self.output_path), exist_ok=True)
+        with self.profile.phase('dump_rv'):
+            self._dump_rv()
 
-        # Create symbolic link to input files
-        for fn in ts:
-            if not (self.model_path / Path(fn).name).exists():
-                os.symlink(str(fn), str(self.model_path / Path(fn).name))
+        with self.profile.phase('link'):
+            # Create symbolic link to input files
+            for fn in ts:
+                link(fn, self.model_path / Path(fn).name)
 
-        # Create symbolic link to Raven executable
-        if not self.raven_cmd.exists():
-            os.symlink(self.raven_exec, str(self.raven_cmd))
+            # Create symbolic link to Raven executable
+            link(self.raven_exec, self.raven_cmd)
 
         # Shell command to run the model
         if self.singularity:
@@ -333,12 +458,74 @@ class Raven:
         launch the Raven executable. If the configuration files are templates, values can be formatted by passing
         dictionaries keyed by their extension.
 
+        Parallel simulations are queued and launched with at most `max_processes` running simultaneously. The method
+        returns once all simulations have completed, with a list of `RunResult` storing the exit code and standard
+        error of each run.
+
         Example
         -------
         >>> r = Raven()
         >>> r.configure(rvi='path to template', rvp='...'}
         >>> r.run(ts, start_date=dt.datetime(2000, 1, 1), area=1000, X1=67)
 
+        """
+        jobs = self._prepare_runs(ts, overwrite, **kwds)
+
+        # Launch the simulations, at most `max_processes` at a time.
+        with self.profile.phase('run', children=True):
+            self.run_results = run_processes(jobs, max_processes=self.max_processes, callback=self._run_completed,
+                                             progress=self._track_progress(len(jobs)))
+        self._store_cache()
+        return self.run_results
+
+    def _prepare_runs(self, ts, overwrite=False, **kwds):
+        """Assign parameters and write the configuration files of each parallel simulation.
+
+        Returns
+        -------
+        list
+          The `Job` (command, launch directory and progress file) for each simulation.
+        """
+        ts, pdict, nloops = self._parse_kwds(ts, kwds)
+
+        # Loop over parallel parameters
+        jobs = []
+        self._rvs = []
+        self._cache_entries = []
+        self._members = {}
+        self._stores = {}
+        version = self.version if self.cache is not None else None
+        for self.psim in range(nloops):
+            for key, val in pdict.items():
+                if val[self.psim] is not None:
+                    self.assign(key, val[self.psim])
+
+            cmd = self.setup_model_run(tuple(map(Path, ts)))
+            self._members[self.output_path.absolute()] = self.psim
+
+            if self.cache is not None and not isinstance(self, Ostrich):
+                key = self.cache_key(ts, version)
+                if self.cache.get(key, self.output_path):
+                    continue
+                self._cache_entries.append((key, self.output_path))
+            else:
+                self._cache_entries.append((None, None))
+
+            jobs.append(Job(cmd, self.cmd_path, self.progress_file))
+
+        return jobs
+
+    def _parse_kwds(self, ts, kwds):
+        """Assign non-parallel parameters and return the parallel parameters.
+
+        Returns
+        -------
+        ts : list
+          Input file paths.
+        pdict : dict
+          Arrays of parallel parameter values, resized to the number of parallel loops.
+        nloops : int
+          Number of parallel loops.
         """
         if isinstance(ts, (six.string_types, Path)):
             ts = [ts, ]
@@ -386,32 +573,210 @@ class Raven:
         if self.rvi:
             self.handle_date_defaults(ts)
 
-        # Loop over parallel parameters
-        procs = []
-        for self.psim in range(nloops):
-            for key, val in pdict.items():
-                if val[self.psim] is not None:
-                    self.assign(key, val[self.psim])
+        return ts, pdict, nloops
 
-            cmd = self.setup_model_run(tuple(map(Path, ts)))
-            procs.append(subprocess.Popen(cmd, cwd=self.cmd_path, stdout=subprocess.PIPE))
+    def cache_key(self, ts, version):
+        """Return the result cache key for the current simulation.
+
+        The key is built from the configuration files rendered with the current parameters, the forcing files
+        fingerprints and the executable version. The creation time stamp is left out of the rendered content.
+        """
+        params = dict(self.parameters, now='')
+        contents = [rvf.render(**params) for _, rvf in sorted(self.rvfiles.items())]
+        return ResultCache.key(contents, forcings=ts, version=version)
 
-        return procs
+    def _track_progress(self, njobs, progress=None):
+        """Return the function receiving the progress of each run, reporting the overall progress to
+        `progress_callback`.
+
+        Parameters
+        ----------
+        njobs : int
+          Number of runs launched.
+        progress : callable
+          Function also called with the run index and its progress percentage.
+        """
+        self._progress = None
+        if self.progress_callback is None:
+            return progress
+
+        self._progress = ProgressTracker(njobs, self.progress_callback)
+        if progress is None:
+            return self._progress.update
+
+        def update(index, value):
+            progress(index, value)
+            self._progress.update(index, value)
+        return update
+
+    def _run_completed(self, result):
+        """Record the resources used by a completed simulation and add its outputs to the Zarr stores, then call
+        `run_callback`."""
+        since = time.time() - result.wall_time if result.wall_time is not None else 0
+        self.profile.add_run(result, bytes_written(result.cwd, since))
+        if self._progress is not None:
+            self._progress.completed(result)
+
+        if self.zarr and result.returncode == 0:
+            path = Path(result.cwd).absolute() / self.output_dir
+            for pattern in ('*Hydrographs.nc', '*WatershedStorage.nc'):
+                for fn in path.glob(pattern):
+                    self._write_member(fn, pattern[1:])
+
+        if self.run_callback is not None:
+            self.run_callback(result)
+
+    def _write_member(self, fn, name):
+        """Write output file `fn` in the Zarr store aggregating output `name`, if it belongs to a parallel simulation.
+
+        Returns
+        -------
+        ZarrEnsemble
+          The store, or None if the file is not the output of a parallel simulation.
+        """
+        index = self._members.get(fn.parent.absolute())
+        if self._pdim is None or index is None:
+            return None
+
+        if name not in self._stores:
+            path = (self.final_path / name).with_suffix('.zarr')
+            self._stores[name] = ZarrEnsemble(path, self._pdim, len(self._members))
+
+        store = self._stores[name]
+        if index not in store.written:
+            store.write(fn, index)
+        return store
+
+    def _store_cache(self):
+        """Store the outputs of successful simulations in the result cache."""
+        with self.profile.phase('cache'):
+            for result, (key, path) in zip(self.run_results, self._cache_entries):
+                if key is not None and result.returncode == 0:
+                    self.cache.put(key, path)
+
+    def emulate(self, ts, **kwds):
+        """Simulate streamflow in-process with the model's vectorized engine, without launching Raven.
+
+        All parameter sets (`params`) and basins (`nc_index`) are simulated at once as an array computation. No
+        configuration or output file is written. This is only available for emulators implementing
+        `_emulate(params, derived, forcing, time, **attrs)`, which takes the parameters (params, nparams), the derived
+        parameters as computed by `derived_parameters`, the forcing arrays (nbasins, time) and the basin attributes
+        (nbasins,), and returns the simulated outflows [m3/s] (params, time, nbasins). Calibration models have no
+        engine.
+
+        Parameters
+        ----------
+        ts : path or sequence
+          Sequence of input file paths.
+        **kwds : dict
+          Raven parameters, as for `run`.
+
+        Returns
+        -------
+        xr.DataArray
+          Simulated outflows, with the same layout as `q_sim` after a Raven run.
+        """
+        if not hasattr(self, '_emulate') or isinstance(self, Ostrich):
+            raise TypeError("No vectorized engine is available for {}.".format(self.__class__.__name__))
+
+        ts, pdict, nloops = self._parse_kwds(ts, kwds)
+
+        self.rvt.update(self._assign_files(tuple(map(Path, ts))))
+        self.check_units()
+        self.check_inputs()
+
+        # Parameters and basin attributes. When both vary, they are paired as in `run`.
+        pdim = self._pdim if nloops > 1 else None
+        params = np.array([self.rvp.params if p[0] is None else p for p in pdict['params']], dtype=float)
+        basins = slice(None) if pdim == 'nbasins' else slice(0, 1)
+        attrs = {key: np.array([getattr(self.rvh, key) if v is None else v for v in pdict[key][basins]], dtype=float)
+                 for key in ['area', 'latitude', 'longitude', 'elevation'] if hasattr(self.rvh, key)}
+        nc_index = pdict['nc_index'][basins]
+
+        rvi = self.rvi
+        time, forcing = engines.read_forcing(self.rvt, rvi.start_date, rvi.duration,
+                                             None if nc_index[0] is None else nc_index.astype(int))
+        q = self._emulate(params, self._derived_arrays(params), forcing, time, **attrs)
+
+        if pdim == 'nbasins' and len(params) > 1:
+            q = q[range(nloops), :, range(nloops)][np.newaxis].transpose(0, 2, 1)
+
+        # Prepend the initial outflow, as Raven writes the state at the start date.
+        q = np.concatenate([np.zeros_like(q[:, :1]), q], axis=1)
+        times = [time[0] + dt.timedelta(days=float(rvi.time_step) * i) for i in range(q.shape[1])]
+
+        attrs = {'long_name': 'Simulated outflows', 'units': 'm**3 s**-1'}
+        if pdim == 'params':
+            return xr.DataArray(q, dims=('params', 'time', 'nbasins'), coords={'time': times}, name='q_sim',
+                                attrs=attrs)
+        return xr.DataArray(q[0], dims=('time', 'nbasins'), coords={'time': times}, name='q_sim', attrs=attrs)
+
+    def _derived_arrays(self, params):
+        """Return the derived parameters of all parameter sets at once.
+
+        `derived_parameters` is evaluated with each parameter holding an array of its values across parameter sets, so
+        that derived parameters are arrays of shape (params,). The model configuration is left unchanged.
+
+        Parameters
+        ----------
+        params : array
+          Model parameters, shape (params, nparams).
+        """
+        saved = self.rvp.params, copy.deepcopy(self.rvd), copy.deepcopy(self.rvc)
+        try:
+            self.rvp.params = self.params(*np.asarray(params, dtype=float).T)
+            self.derived_parameters()
+            return dict(self.rvd.items())
+        finally:
+            self.rvp.params, self.rvd, self.rvc = saved
 
     def __call__(self, ts, overwrite=False, **kwds):
+        self.profile.reset()
         self.setup(overwrite)
-        procs = self.run(ts, overwrite, **kwds)
+        self.run(ts, overwrite, **kwds)
+        self._parse_run_results()
+
+    async def arun(self, ts, overwrite=False, progress=None, **kwds):
+        """Asynchronous counterpart of calling the model.
 
-        for proc in procs:
-            proc.wait()
-            # Julie: For debugging
-            # for line in iter(proc.stdout.readline, b''):
-            #    print(line)
+        The simulations are launched as asyncio subprocesses, so that a single event loop can drive many models
+        concurrently. Each model instance should only run one simulation batch at a time.
+
+        Parameters
+        ----------
+        ts : path or sequence
+          Sequence of input file paths. Symbolic links to those files will be created in the model directory.
+        overwrite : bool
+          Whether or not to overwrite existing model and output files.
+        progress : callable
+          Function called with the run index and its progress percentage as reported by the executable.
+        **kwds : dict
+          Raven parameters used to fill configuration file templates.
+
+        Example
+        -------
+        >>> m = GR4JCN()
+        >>> await m.arun(ts, start_date=dt.datetime(2000, 1, 1), area=1000, params=(0.529, -3.396, 407, 1.07, 17, .94))
+        """
+        self.profile.reset()
+        self.setup(overwrite)
+        jobs = self._prepare_runs(ts, overwrite, **kwds)
+        with self.profile.phase('run', children=True):
+            self.run_results = await arun_processes(jobs, max_processes=self.max_processes,
+                                                    callback=self._run_completed,
+                                                    progress=self._track_progress(len(jobs), progress))
+        self._store_cache()
+        self._parse_run_results()
+
+    def _parse_run_results(self):
+        """Parse the simulation outputs, printing the model errors if they cannot be found."""
         try:
-            self.parse_results()
+            with self.profile.phase('parse_results'):
+                self.parse_results()
 
         except UserWarning as e:
             err = self.parse_errors()
+            err += ''.join(r.stderr for r in self.run_results if r.returncode)
             msg = """
         **************************************************************
         Path : {dir}
@@ -442,6 +807,8 @@ class Raven:
 
     def parse_results(self, path=None):
         """Store output files in the self.outputs dictionary."""
+        self._close_datasets()
+
         # Output files default names. The actual output file names will be composed of the run_name and the default
         # name.
         path = path or self.exec_path
@@ -462,9 +829,12 @@ class Raven:
 
             fns.sort()
             self.ind_outputs[key] = fns
-            self.outputs[key] = self._merge_output(fns, pattern[1:])
+            with self.profile.phase('merge_output'):
+                self.outputs[key] = self._merge_output(fns, pattern[1:])
 
-        self.outputs['rv_config'] = self._merge_output(self.rvs, 'rv.zip')
+        with self.profile.phase('merge_output'):
+            self.outputs['rv_config'] = self._merge_output(self.rvs, 'rv.zip')
+        self._collect_outputs()
 
     def _merge_output(self, files, name):
         """Merge multiple output files into one if possible, otherwise return a list of files.
@@ -479,14 +849,18 @@ class Raven:
         outfn = self.final_path / name
 
         if name.endswith('.nc') and not isinstance(self, raven.models.RavenMultiModel):
-            ds = [xr.open_dataset(fn) for fn in files]
+            # Add the members that were not written as they completed, such as those served from the cache.
+            if self.zarr:
+                stores = [self._write_member(fn, name) for fn in files]
+                if stores[0] is not None and stores[0].complete:
+                    return stores[0].path
+
             try:
-                # We aggregate along the pdim dimensions.
-                out = xr.concat(ds, self._pdim, data_vars='different')
-                out.to_netcdf(outfn)
-                return outfn
+                # We aggregate along the pdim dimensions, one member at a time.
+                return merge_netcdf(files, outfn, self._pdim)
             except (ValueError, KeyError):
-                pass
+                if outfn.exists():
+                    outfn.unlink()
 
         # Let's zip the files that could not be merged.
         outfn = outfn.with_suffix('.zip')
@@ -526,23 +900,23 @@ class Raven:
         ncvars = {}
         for fn in fns:
             if '.nc' in fn.suffix:
-                with xr.open_dataset(fn) as ds:
-                    for var, alt_names in self._variable_names.items():
-                        # Check that the emulator is expecting that variable.
-                        if var not in self.rvt.keys():
-                            continue
-
-                        # Check if any alternate variable name is in the file.
-                        for alt_name in alt_names:
-                            if alt_name in ds.data_vars:
-                                ncvars[var] = dict(var=var,
-                                                   path=fn,
-                                                   var_name=alt_name,
-                                                   dimensions=ds[alt_name].dims,
-                                                   units=ds[alt_name].attrs.get("units"),
-                                                   )
-
-                                break
+                meta = forcing_metadata(fn)
+                for var, alt_names in self._variable_names.items():
+                    # Check that the emulator is expecting that variable.
+                    if var not in self.rvt.keys():
+                        continue
+
+                    # Check if any alternate variable name is in the file.
+                    for alt_name in alt_names:
+                        if alt_name in meta.variables:
+                            ncvars[var] = dict(var=var,
+                                               path=fn,
+                                               var_name=alt_name,
+                                               dimensions=meta.variables[alt_name].dims,
+                                               units=meta.variables[alt_name].units,
+                                               )
+
+                            break
         return ncvars
 
     def _get_output(self, pattern, path):
@@ -573,10 +947,13 @@ class Raven:
           The first datetime of the forcing files.
         end : datetime
           The last datetime of the forcing files.
-        """
 
-        ds = xr.open_mfdataset(fns, combine="by_coords")
-        return ds.indexes['time'][0], ds.indexes['time'][-1]
+        Notes
+        -----
+        Time bounds are read from the forcing metadata index, so files are only opened the first time they are seen.
+        """
+        meta = [forcing_metadata(fn) for fn in fns]
+        return min(m.start for m in meta if m.start is not None), max(m.end for m in meta if m.end is not None)
 
     def handle_date_defaults(self, ts):
 
@@ -595,12 +972,23 @@ class Raven:
     def rvs(self):
         return self._rvs
 
+    @property
+    def timings(self):
+        """Resources used by the last call, as a JSON-serializable dictionary.
+
+        `phases` maps each phase (`setup`, `assign_files`, `dump_rv`, `link`, `run`, `cache`, `parse_results`,
+        `merge_output`) to its number of `calls`, `wall_time` and `cpu_time` in seconds and `bytes_written`. `runs`
+        lists the `index`, `returncode`, `wall_time`, `cpu_time` and `bytes_written` of each run of the executable. See
+        `Profile`.
+        """
+        return self.profile.as_dict()
+
     @property
     def q_sim(self):
         """Return a view of the hydrograph time series.
 
-        This view will be overwritten by successive calls to `run`. To make a copy of this DataArray that will
-        persist in memory, use `q_sim.copy(deep=True)`.
+        This view will be overwritten by successive calls to `run`. To keep this DataArray in memory, use
+        `snapshot().q_sim`.
         """
         if isinstance(self.hydrograph, list):
             return [h.q_sim for h in self.hydrograph]
@@ -612,23 +1000,61 @@ class Raven:
         """Return a view of the current output file.
 
         If the model is run multiple times, hydrograph will point to the latest version. To store the results of
-        multiple runs, either create different model instances or explicitly copy the file to another disk location.
+        multiple runs, either create different model instances, take a `snapshot` or explicitly copy the file to another
+        disk location.
         """
-        if self.outputs['hydrograph'].suffix == '.nc':
-            return xr.open_dataset(self.outputs['hydrograph'])
-        elif self.outputs['hydrograph'].suffix == '.zip':
-            return [xr.open_dataset(fn) for fn in self.ind_outputs['hydrograph']]
-        else:
-            raise ValueError
+        return self._open_output('hydrograph')
 
     @property
     def storage(self):
-        if self.outputs['storage'].suffix == '.nc':
-            return xr.open_dataset(self.outputs['storage'])
-        elif self.outputs['storage'].suffix == '.zip':
-            return [xr.open_dataset(fn) for fn in self.ind_outputs['storage']]
-        else:
-            raise ValueError
+        return self._open_output('storage')
+
+    def snapshot(self, key='hydrograph'):
+        """Return an output dataset loaded in memory, with read-only arrays.
+
+        Unlike `hydrograph` or `storage`, the snapshot persists when the model runs again. It is read once from the
+        output file, without the additional copy made by `copy(deep=True)`. The arrays of `hydrograph` or `storage`
+        remain writeable, but values already loaded from them are shared with the snapshot, so changes made to them
+        show in the snapshot.
+
+        Parameters
+        ----------
+        key : {'hydrograph', 'storage'}
+          Output name.
+
+        Returns
+        -------
+        xr.Dataset or list
+          The output dataset, or a list of datasets for outputs that could not be merged.
+        """
+        out = self._open_output(key)
+        if isinstance(out, list):
+            return [_freeze(ds) for ds in out]
+        return _freeze(out)
+
+    def _open_output(self, key):
+        """Return the lazily opened dataset of an output, or a list of datasets for outputs that could not be merged.
+
+        Datasets are opened on first access, and closed when outputs are parsed again.
+        """
+        if key not in self._datasets:
+            fn = self.outputs[key]
+            if fn.suffix == '.nc':
+                self._datasets[key] = xr.open_dataset(fn)
+            elif fn.suffix == '.zarr':
+                self._datasets[key] = xr.open_zarr(str(fn))
+            elif fn.suffix == '.zip':
+                self._datasets[key] = [xr.open_dataset(f) for f in self.ind_outputs[key]]
+            else:
+                raise ValueError
+        return self._datasets[key]
+
+    def _close_datasets(self):
+        """Close the lazily opened output datasets."""
+        for out in self._datasets.values():
+            for ds in (out if isinstance(out, list) else [out, ]):
+                ds.close()
+        self._datasets = {}
 
     @property
     def solution(self):
@@ -698,6 +1124,15 @@ class Raven:
                     raise ValueError("{} not found in files.".format(var))
 
 
+class CalibrationStart(NamedTuple):
+    """Outcome of one of the independent calibrations launched by `Ostrich.multistart`."""
+    seed: int
+    obj_func: float
+    params: tuple
+    trajectory: np.ndarray  # Model evaluations (run, objective function, parameters) as written in OstModel0.txt.
+    model: "Ostrich"
+
+
 class Ostrich(Raven):
     """Wrapper for OSTRICH calibration of RAVEN hydrological model
 
@@ -716,11 +1151,14 @@ class Ostrich(Raven):
       The rv configuration files + Ostrict ostIn.txt
     tpl
       The Ostrich templates
+    starts
+      The `CalibrationStart` of each calibration launched by the last call to `multistart`.
 
     """
     identifier = 'generic-ostrich'
     _rvext = ('rvi', 'rvp', 'rvc', 'rvh', 'rvt', 'txt')
     txt = RV()
+    starts = ()
 
     @property
     def model_path(self):
@@ -745,6 +1183,11 @@ class Ostrich(Raven):
         """This is the main executable."""
         return self.exec_path
 
+    @property
+    def progress_file(self):
+        """Path to the file where Ostrich reports its progress."""
+        return self.exec_path / 'OstProgress0.txt'
+
     @property
     def proc_path(self):
         """Path to Ostrich parallel process directory."""
@@ -776,15 +1219,146 @@ class Ostrich(Raven):
         At each Ostrich loop, configuration files (original and created from templates are copied into model/.
 
         """
+        with self.profile.phase('setup'):
+            Raven.setup(self, overwrite)
+
+            os.makedirs(str(self.final_path), exist_ok=True)
+
+            self.write_ostrich_runs_raven()
+            self.write_save_best()
+
+            # Create symbolic link to executable
+            link(self.ostrich_exec, self.cmd)
+
+    def calibrate(self, ts, overwrite=False, batch_size=None, **kwds):
+        """Calibrate the model with the native Python driver instead of the OSTRICH executable.
+
+        Candidate parameter sets are evaluated in batches by a pool of `max_processes` worker processes, each running
+        Raven in its own copy of the model directory. The calibration history is written in the OSTRICH output format,
+        so results are accessed as after calling the model.
+
+        Parameters
+        ----------
+        ts : path or sequence
+          Sequence of input file paths.
+        overwrite : bool
+          Whether or not to overwrite existing model and output files.
+        batch_size : int
+          Number of DDS candidates evaluated simultaneously. Defaults to the number of worker processes.
+        **kwds : dict
+          Raven and Ostrich parameters, as for calling the model. `algorithm` can be DDS or SCEUA.
+
+        Returns
+        -------
+        Calibration
+          The calibration driver, whose `history` holds the parameter values and cost of each evaluation.
+
+        Example
+        -------
+        >>> m = GR4JCN_OST()
+        >>> m.calibrate(ts, start_date=dt.datetime(1954, 1, 1), duration=208, area=4250.6, elevation=843.0,
+        ...             latitude=54.4848, longitude=-123.3659, lowerBounds=low, upperBounds=high, algorithm='DDS',
+        ...             random_seed=0, max_iterations=10)
+        >>> m.calibrated_params
+        """
+        from .calibration import Calibration
+
         Raven.setup(self, overwrite)
+        self._prepare_runs(ts, overwrite, **kwds)
 
-        os.makedirs(str(self.final_path), exist_ok=True)
+        calibration = Calibration(self, max_processes=self.max_processes or default_max_processes())
+        calibration.run(batch_size=batch_size)
+        self.parse_results()
+        return calibration
 
-        self.write_ostrich_runs_raven()
-        self.write_save_best()
+    def multistart(self, ts, seeds, overwrite=False, **kwds):
+        """Launch independent calibrations with different random seeds and keep the best one.
 
-        # Create symbolic link to executable
-        os.symlink(self.ostrich_exec, str(self.cmd))
+        Each calibration runs in its own work directory `workdir/multistart/seed-<seed>`, with at most `max_processes`
+        OSTRICH instances running simultaneously. Once all calibrations have completed, the outputs of the one with the
+        lowest objective function are stored in `outputs`, so results are accessed as after calling the model.
+
+        Parameters
+        ----------
+        ts : path or sequence
+          Sequence of input file paths.
+        seeds : int or sequence
+          Random seeds of the calibrations, or their number. Given a number `n`, the seeds are `random_seed`,
+          `random_seed + 1`, ..., `random_seed + n - 1` if `random_seed` is given or already assigned, and drawn at
+          random otherwise.
+        overwrite : bool
+          Whether or not to overwrite existing model and output files.
+        **kwds : dict
+          Raven and Ostrich parameters, as for calling the model.
+
+        Returns
+        -------
+        list
+          The `CalibrationStart` of each seed, holding its objective function, calibrated parameters and the parameter
+          values and objective function of each model evaluation. Calibrations that failed have an infinite objective
+          function.
+
+        Example
+        -------
+        >>> m = GR4JCN_OST()
+        >>> starts = m.multistart(ts, seeds=4, start_date=dt.datetime(1954, 1, 1), duration=208, area=4250.6,
+        ...                       elevation=843.0, latitude=54.4848, longitude=-123.3659, lowerBounds=low,
+        ...                       upperBounds=high, algorithm='DDS', random_seed=0, max_iterations=10)
+        >>> m.obj_func == min(s.obj_func for s in starts)
+        True
+        """
+        seed = kwds.pop('random_seed', getattr(self.txt, '_random_seed', None))
+        if np.ndim(seeds) == 0:
+            if seed is None or seed < 0:
+                seed = np.random.randint(0, 2 ** 31 - seeds)
+            seeds = range(seed, seed + seeds)
+        seeds = [int(s) for s in seeds]
+        if len(set(seeds)) != len(seeds) or min(seeds) < 0:
+            raise ValueError("Random seeds should be distinct non-negative integers: {}".format(seeds))
+
+        # Configure one model copy per seed in its own work directory.
+        self.starts = ()
+        self._close_datasets()
+        self.profile.reset()
+        models, jobs = [], []
+        for seed in seeds:
+            model = copy.deepcopy(self)
+            model.workdir = self.workdir / 'multistart' / 'seed-{}'.format(seed)
+            model.exec_path = model.workdir / 'exec'
+            model.final_path = model.workdir / model.final_dir
+            model.outputs, model.ind_outputs = {}, {}
+            model._scratch = None
+            model.profile = self.profile
+
+            model.setup(overwrite)
+            jobs.extend(model._prepare_runs(ts, overwrite, random_seed=seed, **copy.deepcopy(kwds)))
+            models.append(model)
+
+        with self.profile.phase('run', children=True):
+            self.run_results = run_processes(jobs, max_processes=self.max_processes, callback=self._run_completed,
+                                             progress=self._track_progress(len(jobs)))
+
+        starts = []
+        for seed, model, result in zip(seeds, models, self.run_results):
+            model.run_results = [result, ]
+            try:
+                model._parse_run_results()
+            except UserWarning:
+                starts.append(CalibrationStart(seed, np.inf, None, np.empty((0, 0)), model))
+                continue
+
+            trajectory = np.loadtxt(model.outputs['params_seq'], skiprows=1, ndmin=2)
+            starts.append(CalibrationStart(seed, model.obj_func, model.calibrated_params, trajectory, model))
+
+        best = min(starts, key=lambda s: s.obj_func)
+        if not np.isfinite(best.obj_func):
+            raise UserWarning("All {} calibrations failed.".format(len(starts)))
+
+        self._close_datasets()
+        self.outputs = dict(best.model.outputs)
+        self.ind_outputs = dict(best.model.ind_outputs)
+        self.starts = starts
+        return starts
 
     def parse_results(self):
         """Store output files in the self.outputs dictionary."""
@@ -801,6 +1375,7 @@ class Ostrich(Raven):
             self.outputs[key] = self._get_output(pattern, path=self.exec_path)[0]
 
         self.outputs['calibparams'] = ', '.join(map(str, self.calibrated_params))
+        self._collect_outputs()
 
     def parse_errors(self):
         try:
@@ -859,6 +1434,22 @@ class Ostrich(Raven):
         return np.loadtxt(self.outputs['params_seq'], skiprows=1)[-1, 2:]
 
 
+def _freeze(ds):
+    """Return a copy of a dataset loaded in memory, with read-only arrays.
+
+    The copy holds read-only views of the loaded arrays, which may be shared with the cached dataset `ds`. The arrays
+    of `ds` remain writeable.
+    """
+    out = ds.copy(deep=False).load()
+    for var in out.variables.values():
+        if isinstance(var, xr.IndexVariable) or not isinstance(var.data, np.ndarray):
+            continue
+        view = var.data.view()
+        view.flags.writeable = False
+        var.data = view
+    return out
+
+
 def get_diff_level(files):
     """Return the lowest hierarchical file parts level at which there are differences among file paths."""
 
@@ -867,6 +1458,21 @@ def get_diff_level(files):
             return i
 
 
+def link(src, dst):
+    """Create a symbolic link to `src`, unless `dst` already links to it.
+
+    Existing files are kept, while links to another target are replaced.
+    """
+    dst = Path(dst)
+    if dst.is_symlink():
+        if os.readlink(str(dst)) == str(src):
+            return
+        dst.unlink()
+    elif dst.exists():
+        return
+    os.symlink(str(src), str(dst))
+
+
 def make_executable(fn):
     """Make file executable."""
     st = os.stat(fn)
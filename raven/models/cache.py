@@ -0,0 +1,160 @@
+"""
+Result cache
+============
+
+On-disk, content-addressed store of simulation outputs.
+
+Simulations are identified by a hash of their rendered configuration files, a fingerprint of their forcing files and
+the version of the executable. When an identical simulation is requested again, its outputs are copied from the cache
+instead of launching the executable. The cache size is bounded, and the least recently used entries are evicted first.
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+
+class ResultCache:
+    """Least recently used cache of simulation outputs stored on disk.
+
+    Parameters
+    ----------
+    path : str, Path
+      Directory storing the cache entries. It can be shared by multiple processes.
+    max_size : int
+      Maximum total size of the cached files, in bytes.
+
+    Usage
+    -----
+    >>> model = GR4JCN()
+    >>> model.cache = ResultCache('/tmp/raven-cache', max_size=2**30)
+    >>> model(ts, params=...)  # Launches Raven and caches the outputs.
+    >>> model(ts, params=..., overwrite=True)  # Identical simulation, outputs are served from the cache.
+    >>> model.cache.stats
+    {'hits': 1, 'misses': 1, 'evictions': 0}
+    """
+
+    def __init__(self, path, max_size=2 ** 30):
+        self.path = Path(path)
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        os.makedirs(str(self.path), exist_ok=True)
+
+    @staticmethod
+    def key(contents, forcings=(), version=""):
+        """Return the cache key of a simulation.
+
+        Parameters
+        ----------
+        contents : sequence
+          Rendered content of each configuration file.
+        forcings : sequence
+          Paths to the forcing files. Their path, size and modification time are part of the key.
+        version : str
+          Version of the executable.
+        """
+        h = hashlib.sha256()
+        h.update(str(version).encode())
+        for content in contents:
+            h.update(b"\0")
+            h.update(content.encode())
+
+        for fn in forcings:
+            st = os.stat(str(fn))
+            h.update("\0{}:{}:{}".format(Path(fn).resolve(), st.st_size, st.st_mtime_ns).encode())
+
+        return h.hexdigest()
+
+    def _entry(self, key):
+        return self.path / key[:2] / key
+
+    def __contains__(self, key):
+        return self._entry(key).exists()
+
+    def get(self, key, dest):
+        """Copy the outputs stored under `key` to directory `dest`.
+
+        Returns
+        -------
+        bool
+          True if the entry was found, False otherwise.
+        """
+        entry = self._entry(key)
+        try:
+            fns = list(entry.iterdir())
+        except OSError:
+            self.misses += 1
+            return False
+
+        os.makedirs(str(dest), exist_ok=True)
+        for fn in fns:
+            shutil.copy2(str(fn), str(Path(dest) / fn.name))
+
+        # Mark the entry as recently used.
+        os.utime(str(entry))
+        self.hits += 1
+        return True
+
+    def put(self, key, src):
+        """Store the files in directory `src` under `key`, then evict old entries if the cache is too large."""
+        entry = self._entry(key)
+        if entry.exists():
+            return
+
+        os.makedirs(str(entry.parent), exist_ok=True)
+
+        # Copy to a temporary directory first so that concurrent readers never see an incomplete entry.
+        tmp = Path(tempfile.mkdtemp(dir=str(self.path), prefix=".tmp-"))
+        for fn in Path(src).iterdir():
+            if fn.is_file():
+                shutil.copy2(str(fn), str(tmp / fn.name))
+
+        try:
+            os.rename(str(tmp), str(entry))
+        except OSError:  # Another process stored the same entry in the meantime.
+            shutil.rmtree(str(tmp), ignore_errors=True)
+
+        self.evict()
+
+    def entries(self):
+        """Return a list of (last access time, size, path) for each entry, least recently used first."""
+        out = []
+        for entry in self.path.glob("??/*"):
+            try:
+                size = sum(fn.stat().st_size for fn in entry.iterdir())
+                out.append((entry.stat().st_mtime, size, entry))
+            except OSError:  # Entry evicted by another process.
+                continue
+
+        out.sort()
+        return out
+
+    @property
+    def size(self):
+        """Total size of the cached files, in bytes."""
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        """Remove least recently used entries until the cache size is below `max_size`."""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in entries:
+            if total <= self.max_size:
+                break
+            shutil.rmtree(str(entry), ignore_errors=True)
+            total -= size
+            self.evictions += 1
+
+    def clear(self):
+        """Remove all entries."""
+        for _, _, entry in self.entries():
+            shutil.rmtree(str(entry), ignore_errors=True)
+
+    @property
+    def stats(self):
+        """Hit, miss and eviction counters."""
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
@@ -0,0 +1,557 @@
+"""
+Calibration
+===========
+
+Native Python calibration of Ostrich configurations, as an alternative to launching the OSTRICH executable.
+
+OSTRICH runs a shell script for every evaluation of the objective function, which copies the configuration files
+and launches Raven. The driver in this module reads the same `ostIn.txt` configuration, but evaluates batches of
+candidate parameter sets in a pool of worker processes. Each worker prepares its own copy of the model directory once,
+then for each candidate writes the configuration files from the templates and launches Raven directly.
+
+The calibration history is written in the OSTRICH output format (`OstModel0.txt` and `OstOutput0.txt`), and the
+outputs of the best simulation are saved in the final directory, so that `Ostrich.parse_results` and the properties
+derived from it work unchanged.
+
+Algorithms
+----------
+
+dds : Dynamically dimensioned search (Tolson and Shoemaker, 2007).
+sceua : Shuffled complex evolution (Duan et al., 1993).
+"""
+import csv
+import multiprocessing
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+
+
+class TiedParam(NamedTuple):
+    """Parameter computed from other parameters, as defined in the `BeginTiedParams` block."""
+    name: str
+    params: tuple
+    kind: str
+    coeffs: tuple
+
+
+class ResponseVar(NamedTuple):
+    """Value read from a model output file, as defined in the `BeginResponseVars` block."""
+    name: str
+    filename: str
+    keyword: str
+    line: int
+    column: int
+    token: str
+
+
+class TiedResponseVar(NamedTuple):
+    """Weighted sum of response variables, as defined in the `BeginTiedRespVars` block."""
+    name: str
+    variables: tuple
+    weights: tuple
+
+
+class OstConfig(NamedTuple):
+    """Content of an OSTRICH configuration file."""
+    algorithm: str
+    names: tuple
+    low: tuple
+    high: tuple
+    tied: tuple
+    file_pairs: tuple
+    responses: tuple
+    tied_responses: tuple
+    cost: str
+    max_iterations: int
+    perturbation: float = 0.2
+    random_seed: int = None
+
+
+def _blocks(txt):
+    """Return the lines of each `Begin...`/`End...` block and the top-level lines, stripped of comments."""
+    blocks = {}
+    top = []
+    current = None
+    for line in txt.splitlines():
+        line = line.split('#')[0].strip()
+        if not line:
+            continue
+        if line.startswith('Begin'):
+            current = blocks.setdefault(line[5:], [])
+        elif line.startswith('End') and current is not None:
+            current = None
+        elif current is not None:
+            current.append(line)
+        else:
+            top.append(line)
+    return blocks, top
+
+
+def parse_ostin(fn):
+    """Return the `OstConfig` of an OSTRICH configuration file.
+
+    Only the options used by Raven calibrations are supported: GCOP objective function, linear and ratio tied
+    parameters, and response variables read from delimited output files.
+
+    Parameters
+    ----------
+    fn : str, Path
+      Path to the rendered `ostIn.txt` file.
+    """
+    blocks, top = _blocks(Path(fn).read_text())
+    options = dict(line.split(None, 1) for line in top if len(line.split(None, 1)) == 2)
+
+    names, low, high = [], [], []
+    for line in blocks.get('Params', []):
+        name, _, lo, hi = line.split()[:4]
+        names.append(name)
+        low.append(float(lo))
+        high.append(float(hi))
+
+    tied = []
+    for line in blocks.get('TiedParams', []):
+        items = line.split()
+        n = int(items[1])
+        params = tuple(items[2:2 + n])
+        kind = items[2 + n]
+        coeffs = tuple(float(c) for c in items[3 + n:] if c != 'free')
+        tied.append(TiedParam(items[0], params, kind, coeffs))
+
+    file_pairs = tuple(tuple(item.strip() for item in line.split(';')) for line in blocks.get('FilePairs', []))
+
+    responses = []
+    for line in blocks.get('ResponseVars', []):
+        head, tail = line.split(';')
+        name, filename = head.split()
+        keyword, row, col, token = tail.split()
+        responses.append(ResponseVar(name, filename, keyword, int(row), int(col), token.strip("'\"")))
+
+    tied_responses = []
+    for line in blocks.get('TiedRespVars', []):
+        items = line.split()
+        n = int(items[1])
+        tied_responses.append(TiedResponseVar(items[0], tuple(items[2:2 + n]),
+                                              tuple(float(w) for w in items[3 + n:])))
+
+    cost = dict(line.split(None, 1) for line in blocks.get('GCOP', []))['CostFunction']
+
+    # Algorithm settings may be found in any algorithm block.
+    settings = {}
+    for key, lines in blocks.items():
+        if key.endswith('Alg') or key == 'SCEUA':
+            settings.update(line.split(None, 1) for line in lines if len(line.split(None, 1)) == 2)
+
+    seed = options.get('RandomSeed')
+    return OstConfig(algorithm=options.get('ProgramType', 'DDS'),
+                     names=tuple(names),
+                     low=tuple(low),
+                     high=tuple(high),
+                     tied=tuple(tied),
+                     file_pairs=file_pairs,
+                     responses=tuple(responses),
+                     tied_responses=tuple(tied_responses),
+                     cost=cost,
+                     max_iterations=int(settings.get('MaxIterations', settings.get('Budget', 100))),
+                     perturbation=float(settings.get('PerturbationValue', 0.2)),
+                     random_seed=None if seed is None else int(seed.split()[0]))
+
+
+def tied_values(tied, values):
+    """Return the values of the parameters and of the tied parameters.
+
+    Parameters
+    ----------
+    tied : sequence
+      `TiedParam` definitions.
+    values : dict
+      Parameter values keyed by name.
+    """
+    out = dict(values)
+    for t in tied:
+        x = [out[p] for p in t.params]
+        c = t.coeffs
+        if t.kind == 'linear' and len(x) == 1:
+            out[t.name] = c[0] * x[0] + c[1]
+        elif t.kind == 'linear' and len(x) == 2:
+            out[t.name] = c[0] * x[0] * x[1] + c[1] * x[1] + c[2] * x[0] + c[3]
+        elif t.kind == 'ratio':
+            out[t.name] = (c[0] * x[0] + c[1]) / (c[2] * x[-1] + c[3])
+        else:
+            raise NotImplementedError("Tied parameters of type {} are not supported.".format(t.kind))
+    return out
+
+
+class Evaluator:
+    """Objective function evaluation in a dedicated copy of the model directory.
+
+    Parameters
+    ----------
+    config : OstConfig
+      Calibration configuration.
+    exec_path : Path
+      Directory holding the templates and the `model` subdirectory prepared for OSTRICH.
+    path : Path
+      Directory where the model directory is copied.
+    cmd : sequence
+      Raven command, relative to `path`.
+    """
+
+    def __init__(self, config, exec_path, path, cmd):
+        self.config = config
+        self.path = Path(path)
+        self.cmd = [str(c) for c in cmd]
+
+        shutil.copytree(str(Path(exec_path) / 'model'), str(self.path / 'model'), symlinks=True)
+
+        # Templates are read once and compiled into a single substitution. Longer names are matched first, so that
+        # par_x1 does not match the beginning of par_x10.
+        self.templates = [((Path(exec_path) / tpl).read_text(), target) for tpl, target in config.file_pairs]
+        names = sorted(config.names + tuple(t.name for t in config.tied), key=len, reverse=True)
+        self.pattern = re.compile('|'.join(map(re.escape, names)))
+
+    def write(self, values):
+        """Write the configuration files for a parameter set, returning the values of all parameters."""
+        values = tied_values(self.config.tied, dict(zip(self.config.names, values)))
+        text = {name: '{:.12g}'.format(v) for name, v in values.items()}
+        for tpl, target in self.templates:
+            (self.path / 'model' / target).write_text(self.pattern.sub(lambda m: text[m.group(0)], tpl))
+        return values
+
+    def responses(self):
+        """Read the response variables and return the cost function value."""
+        out = {}
+        for r in self.config.responses:
+            lines = (self.path / r.filename).read_text().splitlines()
+            start = 0
+            if r.keyword != 'OST_NULL':
+                start = next(i for i, line in enumerate(lines) if r.keyword in line)
+            row = next(csv.reader([lines[start + r.line]], delimiter=r.token))
+            out[r.name] = float(row[r.column - 1])
+
+        for t in self.config.tied_responses:
+            out[t.name] = sum(w * out[v] for v, w in zip(t.variables, t.weights))
+
+        return out[self.config.cost]
+
+    def __call__(self, values):
+        """Return the cost function value of a parameter set. Failed simulations have an infinite cost."""
+        self.write(values)
+        for r in self.config.responses:
+            fn = self.path / r.filename
+            if fn.exists():
+                fn.unlink()
+
+        subprocess.run(self.cmd, cwd=str(self.path), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            return self.responses()
+        except (OSError, IndexError, StopIteration, ValueError):
+            return np.inf
+
+
+_evaluator = None
+
+
+def _init_worker(config, exec_path, cmd):
+    """Prepare the model directory of a worker process."""
+    global _evaluator
+    path = tempfile.mkdtemp(prefix='processor_', dir=str(exec_path))
+    _evaluator = Evaluator(config, exec_path, path, cmd)
+
+
+def _evaluate(values):
+    return _evaluator(values)
+
+
+def dds(evaluate, low, high, max_evaluations, perturbation=0.2, batch_size=1, random_state=None):
+    """Dynamically dimensioned search.
+
+    The search starts from the best of a few random parameter sets. At each iteration, candidates are generated by
+    perturbing a random subset of the parameters of the current best solution, the size of the subset decreasing as the
+    evaluation budget is used. Candidates are evaluated in batches.
+
+    Parameters
+    ----------
+    evaluate : callable
+      Function taking an array of parameter sets of shape (n, nparams), and returning their cost, shape (n,).
+    low, high : array
+      Parameter bounds.
+    max_evaluations : int
+      Evaluation budget.
+    perturbation : float
+      Standard deviation of perturbations, as a fraction of the parameter range.
+    batch_size : int
+      Number of candidates evaluated simultaneously.
+    random_state : np.random.RandomState
+      Random number generator.
+
+    Returns
+    -------
+    x : array
+      Best parameter set.
+    f : float
+      Best cost.
+
+    References
+    ----------
+    Tolson, B. A. and Shoemaker, C. A. (2007). Dynamically dimensioned search algorithm for computationally efficient
+    watershed model calibration. Water Resources Research, 43, W01413. doi:10.1029/2005WR004723.
+    """
+    rng = random_state or np.random.RandomState()
+    low, high = np.asarray(low, dtype=float), np.asarray(high, dtype=float)
+    span = high - low
+    n = len(low)
+
+    # Initial solutions
+    ninit = int(min(max(5, round(0.005 * max_evaluations)), max_evaluations))
+    x0 = low + rng.uniform(size=(ninit, n)) * span
+    f0 = evaluate(x0)
+    best = int(np.argmin(f0))
+    xbest, fbest = x0[best], f0[best]
+
+    i = ninit
+    while i < max_evaluations:
+        size = min(batch_size, max_evaluations - i)
+        cand = np.repeat(xbest[np.newaxis], size, axis=0)
+        for k in range(size):
+            # Probability of perturbing each parameter decreases with the number of evaluations.
+            p = 1 - np.log(i + k + 1) / np.log(max_evaluations)
+            perturb = rng.uniform(size=n) < p
+            if not perturb.any():
+                perturb[rng.randint(n)] = True
+
+            x = cand[k] + perturbation * span * rng.standard_normal(n) * perturb
+
+            # Reflect at the bounds, or set to the bound if reflection is outside the range.
+            x = np.where(x < low, low + (low - x), x)
+            x = np.where(x > high, high - (x - high), x)
+            cand[k] = np.clip(x, low, high)
+
+        f = evaluate(cand)
+        k = int(np.argmin(f))
+        if f[k] <= fbest:
+            xbest, fbest = cand[k], f[k]
+        i += size
+
+    return xbest, fbest
+
+
+def sceua(evaluate, low, high, max_evaluations, complexes=None, random_state=None):
+    """Shuffled complex evolution.
+
+    The population is partitioned into complexes that evolve independently by competitive simplex steps, then are
+    shuffled. Each evolution step is evaluated as a batch across all complexes.
+
+    Parameters
+    ----------
+    evaluate : callable
+      Function taking an array of parameter sets of shape (n, nparams), and returning their cost, shape (n,).
+    low, high : array
+      Parameter bounds.
+    max_evaluations : int
+      Evaluation budget.
+    complexes : int
+      Number of complexes. Defaults to the number of parameters, at least 2.
+    random_state : np.random.RandomState
+      Random number generator.
+
+    Returns
+    -------
+    x : array
+      Best parameter set.
+    f : float
+      Best cost.
+
+    References
+    ----------
+    Duan, Q. Y., Gupta, V. K. and Sorooshian, S. (1993). Shuffled complex evolution approach for effective and
+    efficient global minimization. Journal of Optimization Theory and Applications, 76(3), 501-521.
+    """
+    rng = random_state or np.random.RandomState()
+    low, high = np.asarray(low, dtype=float), np.asarray(high, dtype=float)
+    span = high - low
+    n = len(low)
+
+    ngs = complexes or max(2, n)
+    npg = 2 * n + 1  # Points per complex
+    nps = n + 1  # Points per simplex
+    npt = ngs * npg
+
+    x = low + rng.uniform(size=(min(npt, max_evaluations), n)) * span
+    f = evaluate(x)
+    neval = len(x)
+    if neval < npt:
+        best = int(np.argmin(f))
+        return x[best], f[best]
+
+    # Triangular probability of selecting each point of a sorted complex.
+    prob = 2. * (npg - np.arange(npg)) / (npg * (npg + 1))
+
+    while neval < max_evaluations:
+        order = np.argsort(f)
+        x, f = x[order], f[order]
+
+        # Partition the population into complexes: complex k holds points k, k + ngs, k + 2 ngs, ...
+        cx = [x[k::ngs].copy() for k in range(ngs)]
+        cf = [f[k::ngs].copy() for k in range(ngs)]
+
+        for _ in range(npg):
+            if neval >= max_evaluations:
+                break
+
+            # Select a simplex in each complex and reflect its worst point through the centroid of the others.
+            simplex = [np.sort(rng.choice(npg, size=nps, replace=False, p=prob)) for _ in range(ngs)]
+            worst = [s[-1] for s in simplex]
+            centroid = np.array([cx[k][s[:-1]].mean(axis=0) for k, s in enumerate(simplex)])
+            xw = np.array([cx[k][w] for k, w in enumerate(worst)])
+            fw = np.array([cf[k][w] for k, w in enumerate(worst)])
+
+            new = 2 * centroid - xw
+            outside = ((new < low) | (new > high)).any(axis=1)
+            new[outside] = low + rng.uniform(size=(outside.sum(), n)) * span
+            fnew = evaluate(new)
+            neval += ngs
+
+            # Contraction towards the centroid if the reflection is not an improvement, then mutation.
+            for step in ('contraction', 'mutation'):
+                retry = fnew > fw
+                if not retry.any() or neval >= max_evaluations:
+                    break
+                if step == 'contraction':
+                    new[retry] = (centroid[retry] + xw[retry]) / 2.
+                else:
+                    new[retry] = low + rng.uniform(size=(retry.sum(), n)) * span
+                fnew[retry] = evaluate(new[retry])
+                neval += int(retry.sum())
+
+            for k in range(ngs):
+                cx[k][worst[k]], cf[k][worst[k]] = new[k], fnew[k]
+                order = np.argsort(cf[k])
+                cx[k], cf[k] = cx[k][order], cf[k][order]
+
+        # Shuffle the complexes
+        x, f = np.concatenate(cx), np.concatenate(cf)
+
+    best = int(np.argmin(f))
+    return x[best], f[best]
+
+
+ALGORITHMS = {'DDS': dds, 'SCEUA': sceua}
+
+
+class Calibration:
+    """Calibration of an Ostrich configuration with a pool of worker processes.
+
+    Parameters
+    ----------
+    model : Ostrich
+      Model whose configuration files, templates and `ostIn.txt` have been written to its `exec_path`.
+    max_processes : int
+      Number of worker processes.
+
+    Attributes
+    ----------
+    history : list
+      (parameter values, cost) of each evaluation, in order.
+    """
+
+    def __init__(self, model, max_processes=1):
+        self.model = model
+        self.max_processes = max_processes
+        self.config = parse_ostin(model.exec_path / 'ostIn.txt')
+        self.history = []
+
+        # Raven command launched from a worker directory, as in the ostrich-runs-raven.sh script.
+        self.cmd = ['./model/raven', './model/{}'.format(model.name), '-o', './model/output/']
+
+    def evaluate(self, pool, x):
+        """Evaluate a batch of parameter sets and record them in the history."""
+        x = np.atleast_2d(x)
+        f = np.array(pool.map(_evaluate, list(x)), dtype=float)
+        self.history.extend(zip(x, f))
+        return f
+
+    def run(self, algorithm=None, max_iterations=None, random_seed=None, batch_size=None):
+        """Run the calibration and write the OSTRICH output files.
+
+        Parameters
+        ----------
+        algorithm : {'DDS', 'SCEUA'}
+          Optimization algorithm. Defaults to the `ProgramType` of the configuration.
+        max_iterations : int
+          Evaluation budget. Defaults to the `MaxIterations` of the configuration.
+        random_seed : int
+          Random number generator seed. Defaults to the `RandomSeed` of the configuration.
+        batch_size : int
+          Number of DDS candidates evaluated simultaneously. Defaults to the number of worker processes.
+
+        Returns
+        -------
+        x : array
+          Best parameter set.
+        f : float
+          Best cost.
+        """
+        cfg = self.config
+        algorithm = (algorithm or cfg.algorithm).upper()
+        if algorithm not in ALGORITHMS:
+            raise NotImplementedError("Calibration algorithm {} is not supported.".format(algorithm))
+
+        seed = cfg.random_seed if random_seed is None else random_seed
+        rng = np.random.RandomState(seed)
+        budget = max_iterations or cfg.max_iterations
+
+        kwds = {'random_state': rng}
+        if algorithm == 'DDS':
+            kwds.update(perturbation=cfg.perturbation, batch_size=batch_size or self.max_processes)
+
+        self.history = []
+        initargs = (cfg, self.model.exec_path, self.cmd)
+        with multiprocessing.Pool(self.max_processes, initializer=_init_worker, initargs=initargs) as pool:
+            x, f = ALGORITHMS[algorithm](lambda xs: self.evaluate(pool, xs), cfg.low, cfg.high, budget, **kwds)
+
+        self.save_best(x)
+        self.write_history(algorithm, seed, budget, x, f)
+        return x, f
+
+    def save_best(self, x):
+        """Run the best parameter set and copy its configuration and outputs to the final directory."""
+        path = Path(tempfile.mkdtemp(prefix='best_', dir=str(self.model.exec_path)))
+        evaluator = Evaluator(self.config, self.model.exec_path, path, self.cmd)
+        evaluator(x)
+
+        final = self.model.final_path
+        os.makedirs(str(final), exist_ok=True)
+        for fn in list((path / 'model').glob('*.rv?')) + list((path / 'model' / 'output').iterdir()):
+            if fn.is_file():
+                shutil.copy(str(fn), str(final / fn.name))
+
+    def write_history(self, algorithm, seed, budget, x, f):
+        """Write the evaluations in `OstModel0.txt` and the optimal parameter set in `OstOutput0.txt`."""
+        cfg = self.config
+        exec_path = self.model.exec_path
+
+        # The last line holds the optimal parameter set, as in OSTRICH outputs.
+        lines = ['Run   obj.function   ' + '   '.join(cfg.names)]
+        for i, (xi, fi) in enumerate(self.history + [(x, f)]):
+            lines.append('{:<5d} {:.6E}   '.format(i, fi) + '   '.join('{:.6E}'.format(v) for v in xi))
+        (exec_path / 'OstModel0.txt').write_text('\n'.join(lines) + '\n')
+
+        values = tied_values(cfg.tied, dict(zip(cfg.names, x)))
+        width = max(map(len, values))
+        out = ['Ostrich calibration performed by the raven Python driver',
+               '',
+               'Random number seed: {}'.format(seed),
+               'Budget:             {}'.format(budget),
+               'Algorithm:          {}'.format(algorithm),
+               '',
+               'Optimal Parameter Set',
+               '{:<{w}} : {:.6E}'.format('Objective Function', f, w=width)]
+        out.extend('{:<{w}} : {:.6E}'.format(name, v, w=width) for name, v in values.items())
+        out.extend(['', 'Number of model evaluations: {}'.format(len(self.history) + 1), ''])
+        (exec_path / 'OstOutput0.txt').write_text('\n'.join(out))
@@ -5,6 +5,7 @@ import xarray as xr
 from raven.models import Raven, Ostrich
 from .rv import RV, RVT, RVI, RVC, Ost, RavenNcData, MonthlyAverage
 from .state import HRUStateVariables, BasinStateVariables
+from . import engines
 
 nc = RavenNcData
 std_vars = ("pr", "rainfall", "prsn", "tasmin", "tasmax", "tas", "evspsbl", "water_volume_transport_in_river_channel")
@@ -51,6 +52,13 @@ class GR4JCN(Raven):
 
             self.rvc.hru_state = HRUStateVariables(soil0=soil0, soil1=soil1)
 
+    def _emulate(self, params, derived, forcing, time, area, latitude, **attrs):
+        return engines.gr4jcn(params, forcing, time.dayofyear, area, latitude,
+                              rain_snow_fraction=self.rvi.rain_snow_fraction,
+                              evaporation=self.rvi.evaporation,
+                              soil0=self.rvc.soil0,
+                              soil1=self.rvc.soil1)
+
 
 class GR4JCN_OST(Ostrich, GR4JCN):
     _p = Path(__file__).parent / 'ostrich-gr4j-cemaneige'
@@ -88,6 +96,14 @@ class MOHYSE(Raven):
     def derived_parameters(self):
         self.rvd['par_rezi_x10'] = 1.0 / self.rvp.params.par_x10
 
+    def _emulate(self, params, derived, forcing, time, area, latitude, **attrs):
+        hru = self.rvc.hru_state
+        return engines.mohyse(params, derived, forcing, time.dayofyear, area, latitude,
+                              rain_snow_fraction=self.rvi.rain_snow_fraction,
+                              evaporation=self.rvi.evaporation,
+                              soil0=hru.soil0,
+                              soil1=hru.soil1)
+
 
 class MOHYSE_OST(Ostrich, MOHYSE):
     _p = Path(__file__).parent / 'ostrich-mohyse'
@@ -141,6 +157,13 @@ class HMETS(GR4JCN):
             soil1 = self.rvd['PHREATIC_hlf'] if self.rvc.soil1 is None else self.rvc.soil1
             self.rvc.hru_state = HRUStateVariables(soil0=soil0, soil1=soil1)
 
+    def _emulate(self, params, derived, forcing, time, area, latitude, **attrs):
+        return engines.hmets(params, derived, forcing, time.dayofyear, area, latitude,
+                             rain_snow_fraction=self.rvi.rain_snow_fraction,
+                             evaporation=self.rvi.evaporation,
+                             soil0=self.rvc.soil0,
+                             soil1=self.rvc.soil1)
+
 
 class HMETS_OST(Ostrich, HMETS):
     _p = Path(__file__).parent / 'ostrich-hmets'
@@ -212,6 +235,12 @@ class HBVEC(GR4JCN):
         if self.rvc.basin_state is None:
             self.rvc.basin_state = BasinStateVariables(qout=(self.rvc.qout,))
 
+    def _emulate(self, params, derived, forcing, time, area, latitude, **attrs):
+        return engines.hbvec(params, derived, forcing, time, area, latitude,
+                             rain_snow_fraction=self.rvi.rain_snow_fraction,
+                             evaporation=self.rvi.evaporation,
+                             soil2=self.rvc.soil2)
+
     # TODO: Support index specification and unit changes.
     def _monthly_average(self):
 
@@ -0,0 +1,692 @@
+"""
+Vectorized engines
+==================
+
+In-process NumPy implementations of emulated Raven models.
+
+Calibration and regionalization need thousands of short simulations, for which writing configuration files and
+launching the Raven executable dominates the cost. The engines in this module reproduce the hydrological processes
+configured in the model templates as array computations, simulating many parameter sets and basins at once. States
+are arrays of shape (params, nbasins), and the time loop is the only Python loop.
+
+The Raven executable remains the reference implementation. Engines follow the order of the `:HydrologicProcesses`
+block of the templates, but small numerical differences with Raven are expected.
+
+Functions
+---------
+
+read_forcing : Load forcing time series from the files assigned to the model rvt.
+gr4jcn : GR4J + CemaNeige.
+hmets : HMETS.
+mohyse : MOHYSE.
+hbvec : HBV-EC.
+"""
+import numpy as np
+import xarray as xr
+from scipy.special import gammainc
+
+from .rv import RavenNcData
+
+# Latent heat of vaporization [MJ/kg]
+LH_VAPOR = 2.45
+
+# Solar constant [MJ/m2/min]
+SOLAR_CONSTANT = 0.0820
+
+
+def read_forcing(rvt, start, duration, nc_index=None):
+    """Return the forcing time series of the variables configured in `rvt`.
+
+    Parameters
+    ----------
+    rvt : RVT
+      Model rvt, whose `RavenNcData` items have been assigned to files.
+    start : datetime
+      Simulation start date.
+    duration : int
+      Number of time steps.
+    nc_index : sequence
+      Index of each basin along the spatial dimension of the forcing files. Ignored for 1D series.
+
+    Returns
+    -------
+    time : pd.DatetimeIndex
+      Time steps of the forcing.
+    forcing : dict
+      Arrays of shape (nbasins, time), keyed by variable. As with Raven, values are not converted, only the linear
+      transform is applied.
+    """
+    time = None
+    forcing = {}
+    nc_index = np.atleast_1d(0 if nc_index is None else nc_index)
+
+    for var, nc in rvt.items():
+        if not isinstance(nc, RavenNcData) or nc.path is None:
+            continue
+
+        with xr.open_dataset(nc.path) as ds:
+            da = ds[nc.var_name].sel(time=slice(start, None)).isel(time=slice(0, duration))
+            if da.sizes['time'] < duration:
+                raise ValueError("Forcing for {} does not cover the simulation period.".format(var))
+
+            # Move the time dimension last and select each basin along the spatial dimension.
+            space = [d for d in da.dims if d != 'time']
+            values = da.transpose(*space, 'time').values.reshape(-1, duration)
+            if len(values) > 1:
+                values = values[nc_index]
+
+            if time is None:
+                time = da.indexes['time']
+
+        if nc._linear_transform is not None:
+            slope, intercept = nc._linear_transform
+            values = values * slope + intercept
+
+        forcing[var] = values.astype(float)
+
+    return time, forcing
+
+
+def precip_partition(forcing, rain_snow_fraction, transition_temp=0.):
+    """Return rain and snow fluxes, shape (nbasins, time).
+
+    Parameters
+    ----------
+    forcing : dict
+      Forcing arrays, as returned by `read_forcing`, with temperatures completed by `temperatures`.
+    rain_snow_fraction : str
+      Raven rain snow partitioning method.
+    transition_temp : float
+      Rain snow transition temperature [C].
+    """
+    if 'rainfall' in forcing and 'prsn' in forcing:
+        return forcing['rainfall'], forcing['prsn']
+
+    pr = forcing['pr']
+    if rain_snow_fraction == 'RAINSNOW_DATA':
+        snow = forcing.get('prsn', np.zeros_like(pr))
+        return pr - snow, snow
+
+    tmin, tmax = forcing['tasmin'], forcing['tasmax']
+    if rain_snow_fraction == 'RAINSNOW_DINGMAN':
+        # Linear transition between the minimum and maximum daily temperature.
+        with np.errstate(divide='ignore', invalid='ignore'):
+            frac = np.where(tmax > tmin, (tmax - transition_temp) / (tmax - tmin),
+                            (forcing['tas'] > transition_temp).astype(float))
+    elif rain_snow_fraction == 'RAINSNOW_HBV':
+        # Linear transition over a 2 degree interval centered on the transition temperature.
+        frac = (forcing['tas'] - (transition_temp - 1.)) / 2.
+    else:
+        raise NotImplementedError("Rain snow partitioning {} is not implemented.".format(rain_snow_fraction))
+
+    frac = np.clip(frac, 0, 1)
+    return pr * frac, pr * (1 - frac)
+
+
+def temperatures(forcing):
+    """Complete forcing with daily minimum, maximum and average temperatures."""
+    if 'tas' not in forcing:
+        forcing['tas'] = (forcing['tasmin'] + forcing['tasmax']) / 2.
+    forcing.setdefault('tasmin', forcing['tas'])
+    forcing.setdefault('tasmax', forcing['tas'])
+    return forcing
+
+
+def extraterrestrial_radiation(latitude, doy):
+    """Return daily extraterrestrial radiation [MJ/m2/d], shape (nbasins, time).
+
+    Parameters
+    ----------
+    latitude : array
+      Latitude of each basin [deg].
+    doy : array
+      Day of year of each time step.
+    """
+    phi = np.radians(np.atleast_1d(latitude).astype(float))[:, np.newaxis]
+    angle = 2 * np.pi * np.asarray(doy) / 365.
+    dr = 1 + 0.033 * np.cos(angle)
+    decl = 0.409 * np.sin(angle - 1.39)
+    ws = np.arccos(np.clip(-np.tan(phi) * np.tan(decl), -1, 1))
+    sun = ws * np.sin(phi) * np.sin(decl) + np.cos(phi) * np.cos(decl) * np.sin(ws)
+    return 24 * 60 / np.pi * SOLAR_CONSTANT * dr * sun
+
+
+def pet(forcing, evaporation, latitude, doy):
+    """Return potential evapotranspiration [mm/d], shape (nbasins, time).
+
+    Parameters
+    ----------
+    forcing : dict
+      Forcing arrays, with temperatures completed by `temperatures`.
+    evaporation : str
+      Raven evaporation method.
+    latitude : array
+      Latitude of each basin [deg].
+    doy : array
+      Day of year of each time step.
+    """
+    if evaporation == 'PET_DATA':
+        return forcing['evspsbl']
+
+    if evaporation == 'PET_OUDIN':
+        ra = extraterrestrial_radiation(latitude, doy)
+        return np.maximum(ra / LH_VAPOR * (forcing['tas'] + 5.) / 100., 0)
+
+    if evaporation == 'PET_MOHYSE':
+        # For a unit MOHYSE_PET_COEFF, which is a model parameter: scale the result by the coefficient.
+        phi = np.radians(np.atleast_1d(latitude).astype(float))[:, np.newaxis]
+        decl = 0.41 * np.cos(2 * np.pi * (np.asarray(doy) - 172) / 365.)
+        ws = np.arccos(np.clip(-np.tan(phi) * np.tan(decl), -1, 1))
+        tas = forcing['tas']
+        return ws / np.pi * np.exp(17.3 * tas / (238. + tas))
+
+    raise NotImplementedError("Evaporation method {} is not implemented.".format(evaporation))
+
+
+def gr4j_unit_hydrographs(x4):
+    """Return the ordinates of the GR4J unit hydrographs for each value of x4, padded with zeros.
+
+    Returns
+    -------
+    uh1, uh2 : array
+      Arrays of shape (params, n), where n is the number of ordinates of the longest hydrograph.
+    """
+    x4 = np.asarray(x4, dtype=float)[:, np.newaxis]
+    t = np.arange(int(np.ceil(2 * x4.max())) + 1)
+
+    sh1 = np.where(t < x4, (t / x4) ** 2.5, 1.)
+    sh2 = np.where(t < x4, .5 * (t / x4) ** 2.5, np.where(t < 2 * x4, 1 - .5 * np.clip(2 - t / x4, 0, None) ** 2.5, 1.))
+    return np.diff(sh1, axis=1), np.diff(sh2, axis=1)
+
+
+def gamma_unit_hydrograph(shape, rate, max_size=None):
+    """Return the ordinates of gamma distribution unit hydrographs, normalized to sum to one.
+
+    As in Raven, hydrographs are truncated after 4.5 shape^0.6 / rate days.
+
+    Parameters
+    ----------
+    shape : array
+      Shape parameter of the gamma distribution, shape (params,).
+    rate : array
+      Rate parameter of the gamma distribution [1/d], shape (params,).
+    max_size : int
+      Maximum number of ordinates.
+
+    Returns
+    -------
+    array
+      Unit hydrographs, shape (params, n), where n is the number of ordinates of the longest hydrograph.
+    """
+    shape = np.asarray(shape, dtype=float)[:, np.newaxis]
+    rate = np.asarray(rate, dtype=float)[:, np.newaxis]
+    length = 4.5 * shape ** 0.6 / rate
+    size = max(int(np.ceil(length.max())), 1)
+    if max_size is not None:
+        size = min(size, max_size)
+
+    t = np.arange(size + 1)
+    uh = np.diff(gammainc(shape, rate * np.minimum(t, length)), axis=1)
+    return uh / uh.sum(axis=1, keepdims=True)
+
+
+def triangular_unit_hydrograph(time_conc, time_to_peak):
+    """Return the ordinates of triangular unit hydrographs, padded with zeros.
+
+    Parameters
+    ----------
+    time_conc : array
+      Time of concentration, i.e. the base of the triangle [d], shape (params,).
+    time_to_peak : array
+      Time to peak [d], shape (params,).
+
+    Returns
+    -------
+    array
+      Unit hydrographs, shape (params, n), where n is the number of ordinates of the longest hydrograph.
+    """
+    tc = np.asarray(time_conc, dtype=float)[:, np.newaxis]
+    tp = np.asarray(time_to_peak, dtype=float)[:, np.newaxis]
+    t = np.arange(int(np.ceil(tc.max())) + 1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cdf = np.where(t >= tc, 1., np.where(t < tp, t ** 2 / (tc * tp), 1 - (tc - t) ** 2 / (tc * (tc - tp))))
+    return np.diff(cdf, axis=1)
+
+
+def _convolve(store, inflow, uh):
+    """Add inflow to a convolution store and return the outflow of the current time step.
+
+    The store, of shape (params, nbasins, n), is shifted in place by one time step.
+    """
+    store += inflow[..., np.newaxis] * uh[:, np.newaxis, :]
+    out = store[..., 0].copy()
+    store[..., :-1] = store[..., 1:]
+    store[..., -1] = 0
+    return out
+
+
+def _column(params):
+    """Return parameter arrays of shape (params, 1), to broadcast against states of shape (params, nbasins)."""
+    return (np.asarray(p, dtype=float)[:, np.newaxis] for p in np.atleast_2d(params).T)
+
+
+def gr4jcn(params, forcing, doy, area, latitude, rain_snow_fraction="RAINSNOW_DINGMAN", evaporation="PET_OUDIN",
+           soil0=None, soil1=15., melt_factor=7.73):
+    """Simulate streamflow with GR4J + CemaNeige, as configured in the raven-gr4j-cemaneige templates.
+
+    Parameters
+    ----------
+    params : array
+      Parameters, shape (params, 6): GR4J_X1 [m], GR4J_X2 [mm/d], GR4J_X3 [mm], GR4J_X4 [d], CEMANEIGE_X1 [mm],
+      CEMANEIGE_X2 [-].
+    forcing : dict
+      Forcing arrays of shape (nbasins, time), as returned by `read_forcing`.
+    doy : array
+      Day of year of each time step.
+    area : array
+      Area of each basin [km2].
+    latitude : array
+      Latitude of each basin [deg].
+    rain_snow_fraction : str
+      Rain snow partitioning method.
+    evaporation : str
+      Evaporation method.
+    soil0 : float
+      Initial production store level [mm]. Defaults to half its capacity.
+    soil1 : float
+      Initial routing store level [mm].
+    melt_factor : float
+      Degree-day melt factor [mm/d/C].
+
+    Returns
+    -------
+    array
+      Simulated outflows [m3/s], shape (params, time, nbasins).
+    """
+    params = np.atleast_2d(np.asarray(params, dtype=float))
+    forcing = temperatures(dict(forcing))
+    rain, snow = precip_partition(forcing, rain_snow_fraction)
+    tas = forcing['tas']
+    evap = pet(forcing, evaporation, latitude, doy)
+
+    # Parameters, shape (params, 1) to broadcast against states of shape (params, nbasins).
+    x1, x2, x3, x4, cn1, cn2 = (p[:, np.newaxis] for p in params.T)
+    x1 = x1 * 1000.  # Soil thickness [m] to store capacity [mm]
+    g_thresh = 0.9 * cn1  # Snow cover threshold
+
+    uh1, uh2 = gr4j_unit_hydrographs(x4[:, 0])
+
+    npar, nbas = len(params), rain.shape[0]
+    shape = (npar, nbas)
+    prod = np.broadcast_to(x1 / 2. if soil0 is None else soil0, shape).copy()
+    rout = np.full(shape, float(soil1))
+    snowpack = np.zeros(shape)
+    snow_temp = np.zeros(shape)
+    conv1 = np.zeros(shape + uh1.shape[-1:])
+    conv2 = np.zeros(shape + uh2.shape[-1:])
+
+    q = np.empty((npar, rain.shape[1], nbas))
+    for t in range(rain.shape[1]):
+        # Snow temperature evolution and CemaNeige snow balance
+        snow_temp = np.minimum(snow_temp + (1 - cn2) * (tas[:, t] - snow_temp), 0)
+        snowpack = snowpack + snow[:, t]
+        potmelt = np.where((snow_temp >= 0) & (tas[:, t] > 0), np.minimum(melt_factor * tas[:, t], snowpack), 0)
+        melt = (0.9 * np.minimum(snowpack / g_thresh, 1) + 0.1) * potmelt
+        snowpack = snowpack - melt
+
+        # Open water evaporation from ponded water
+        ponded = rain[:, t] + melt
+        pn = np.maximum(ponded - evap[:, t], 0)
+        en = np.maximum(evap[:, t] - ponded, 0)
+
+        # Infiltration to the production store
+        tn = np.tanh(pn / x1)
+        ps = x1 * (1 - (prod / x1) ** 2) * tn / (1 + prod / x1 * tn)
+        prod = prod + ps
+
+        # Soil evaporation
+        te = np.tanh(en / x1)
+        es = np.minimum(prod * (2 - prod / x1) * te / (1 + (1 - prod / x1) * te), prod)
+        prod = prod - es
+
+        # Percolation
+        perc = prod * (1 - (1 + (4. / 9. * prod / x1) ** 4) ** -0.25)
+        prod = prod - perc
+        pr = perc + pn - ps
+
+        # Split and convolution through unit hydrographs
+        q9 = _convolve(conv1, 0.9 * pr, uh1)
+        q1 = _convolve(conv2, 0.1 * pr, uh2)
+
+        # Groundwater exchange
+        rout = rout + q9
+        rout = np.maximum(rout + x2 * (rout / x3) ** 3.5, 0)
+        qd = np.maximum(q1 + x2 * (rout / x3) ** 3.5, 0)
+
+        # Routing store baseflow
+        qr = rout * (1 - (1 + (rout / x3) ** 4) ** -0.25)
+        rout = rout - qr
+
+        q[:, t] = qr + qd
+
+    # mm/d to m3/s
+    return q * np.atleast_1d(area).astype(float) * 1000. / 86400.
+
+
+def hmets(params, derived, forcing, doy, area, latitude, rain_snow_fraction="RAINSNOW_DATA", evaporation="PET_OUDIN",
+          soil0=None, soil1=None):
+    """Simulate streamflow with HMETS, as configured in the raven-hmets templates.
+
+    Parameters
+    ----------
+    params : array
+      Parameters, shape (params, 21), in the order of `HMETS.params`.
+    derived : dict
+      Derived parameters, as computed by `HMETS.derived_parameters`, arrays of shape (params,).
+    forcing : dict
+      Forcing arrays of shape (nbasins, time), as returned by `read_forcing`.
+    doy : array
+      Day of year of each time step.
+    area : array
+      Area of each basin [km2].
+    latitude : array
+      Latitude of each basin [deg].
+    rain_snow_fraction : str
+      Rain snow partitioning method.
+    evaporation : str
+      Evaporation method.
+    soil0, soil1 : float
+      Initial topsoil and phreatic store levels [mm]. Default to half their capacity.
+
+    Returns
+    -------
+    array
+      Simulated outflows [m3/s], shape (params, time, nbasins).
+    """
+    params = np.atleast_2d(np.asarray(params, dtype=float))
+    forcing = temperatures(dict(forcing))
+    rain, snow = precip_partition(forcing, rain_snow_fraction)
+    tas = forcing['tas']
+    evap = pet(forcing, evaporation, latitude, doy)
+
+    (shape1, rate1, shape2, rate2, kf_min, _, t_melt, aggradation, swi_min, _, swi_reduct, t_refreeze, kf_refreeze,
+     refreeze_exp, pet_corr, runoff_coeff, perc, k1, k2, _, _) = _column(params)
+    kf_max, swi_max, top, phreatic = _column(np.column_stack([derived['SUM_MELT_FACTOR'], derived['SUM_SNOW_SWI'],
+                                                              1000. * derived['TOPSOIL_m'],
+                                                              1000. * derived['PHREATIC_m']]))
+
+    # Raven holds at most 50 convolution stores.
+    uh1 = gamma_unit_hydrograph(shape1[:, 0], rate1[:, 0], max_size=50)
+    uh2 = gamma_unit_hydrograph(shape2[:, 0], rate2[:, 0], max_size=50)
+
+    npar, nbas = len(params), rain.shape[0]
+    shape = (npar, nbas)
+    s0 = np.broadcast_to(derived['TOPSOIL_hlf'][:, np.newaxis] if soil0 is None else soil0, shape).astype(float)
+    s1 = np.broadcast_to(derived['PHREATIC_hlf'][:, np.newaxis] if soil1 is None else soil1, shape).astype(float)
+    swe, liq, cum_melt = np.zeros(shape), np.zeros(shape), np.zeros(shape)
+    conv1 = np.zeros(shape + uh1.shape[-1:])
+    conv2 = np.zeros(shape + uh2.shape[-1:])
+
+    q = np.empty((npar, rain.shape[1], nbas))
+    for t in range(rain.shape[1]):
+        ta = tas[:, t]
+
+        # Snow balance: refreeze, melt with a factor increasing with cumulative melt, and liquid water retention
+        # decreasing with cumulative melt.
+        refreeze = np.minimum(kf_refreeze * np.clip(t_refreeze - ta, 0, None) ** refreeze_exp, liq)
+        kf = np.minimum(kf_min * (1 + aggradation * cum_melt), kf_max)
+        melt = np.minimum(kf * np.clip(ta - t_melt, 0, None), swe + refreeze)
+        swe = swe + refreeze - melt
+        liq = liq - refreeze + melt
+        cum_melt = np.where(swe > 0, cum_melt + melt, 0)
+        swi = np.maximum(swi_min, swi_max * (1 - swi_reduct * cum_melt))
+        ponded = np.maximum(liq - swi * swe, 0)
+        liq = liq - ponded
+
+        # Precipitation, with rain on snow held as liquid water
+        on_snow = swe > 0
+        liq = liq + np.where(on_snow, rain[:, t], 0)
+        ponded = ponded + np.where(on_snow, 0, rain[:, t])
+        swe = swe + snow[:, t]
+
+        # Infiltration: surface and delayed runoff proportional to the topsoil saturation
+        sat = np.clip(s0 / top, 0, 1)
+        surface = runoff_coeff * sat * ponded
+        delayed = runoff_coeff * sat ** 2 * ponded
+        s0 = s0 + ponded - surface - delayed
+        overflow = np.maximum(s0 - top, 0)
+        s0 = s0 - overflow
+        delayed = delayed + overflow
+
+        # Interflow and percolation from the topsoil
+        interflow = k1 * s0
+        recharge = perc * s0
+        s0 = s0 - interflow - recharge
+        s1 = s1 + recharge
+        overflow = np.maximum(s1 - phreatic, 0)
+        s1 = s1 - overflow
+        delayed = delayed + overflow
+
+        # Soil evaporation
+        s0 = s0 - np.minimum(pet_corr * evap[:, t], s0)
+
+        # Convolution of surface and delayed runoff, and baseflow from the phreatic store
+        base = k2 * s1
+        s1 = s1 - base
+        q[:, t] = _convolve(conv1, surface, uh1) + _convolve(conv2, delayed, uh2) + interflow + base
+
+    # mm/d to m3/s
+    return q * np.atleast_1d(area).astype(float) * 1000. / 86400.
+
+
+def mohyse(params, derived, forcing, doy, area, latitude, rain_snow_fraction="RAINSNOW_DATA",
+           evaporation="PET_MOHYSE", soil0=0., soil1=0.):
+    """Simulate streamflow with MOHYSE, as configured in the raven-mohyse templates.
+
+    Parameters
+    ----------
+    params : array
+      Parameters, shape (params, 10), in the order of `MOHYSE.params`.
+    derived : dict
+      Derived parameters, as computed by `MOHYSE.derived_parameters`, arrays of shape (params,).
+    forcing : dict
+      Forcing arrays of shape (nbasins, time), as returned by `read_forcing`.
+    doy : array
+      Day of year of each time step.
+    area : array
+      Area of each basin [km2].
+    latitude : array
+      Latitude of each basin [deg].
+    rain_snow_fraction : str
+      Rain snow partitioning method.
+    evaporation : str
+      Evaporation method. With PET_MOHYSE, the PET coefficient is the first model parameter.
+    soil0, soil1 : float
+      Initial topsoil and groundwater store levels [mm].
+
+    Returns
+    -------
+    array
+      Simulated outflows [m3/s], shape (params, time, nbasins).
+    """
+    params = np.atleast_2d(np.asarray(params, dtype=float))
+    forcing = temperatures(dict(forcing))
+    rain, snow = precip_partition(forcing, rain_snow_fraction)
+    tas = forcing['tas']
+    evap = pet(forcing, evaporation, latitude, doy)
+
+    pet_coeff, aet_coeff, melt_factor, t_melt, top, perc, k0, k1, gamma_shape, _ = _column(params)
+    if evaporation != 'PET_MOHYSE':
+        pet_coeff = np.ones_like(pet_coeff)
+    top = top * 1000.  # Soil thickness [m] to store capacity [mm]
+    ground = 10. * 1000.
+
+    uh = gamma_unit_hydrograph(gamma_shape[:, 0], derived['par_rezi_x10'])
+
+    npar, nbas = len(params), rain.shape[0]
+    shape = (npar, nbas)
+    s0 = np.full(shape, float(soil0))
+    s1 = np.full(shape, float(soil1))
+    swe = np.zeros(shape)
+    conv = np.zeros(shape + uh.shape[-1:])
+
+    q = np.empty((npar, rain.shape[1], nbas))
+    for t in range(rain.shape[1]):
+        # Direct evaporation from rainfall, the remaining demand applies to the soil.
+        e = pet_coeff * evap[:, t]
+        direct = np.minimum(rain[:, t], e)
+        e = e - direct
+
+        # Soil evaporation, linear in the topsoil storage
+        s0 = s0 - np.minimum(np.minimum(e, aet_coeff * s0), s0)
+
+        # Degree-day snow melt
+        melt = np.minimum(melt_factor * np.clip(tas[:, t] - t_melt, 0, None), swe)
+        swe = swe - melt + snow[:, t]
+
+        # Infiltration, with HBV_BETA = 1
+        ponded = melt + rain[:, t] - direct
+        infil = ponded * (1 - np.clip(s0 / top, 0, 1))
+        s0 = s0 + infil
+
+        # Interflow, percolation and baseflow
+        interflow = k0 * s0
+        recharge = np.minimum(perc * s0, ground - s1)
+        s0 = s0 - interflow - recharge
+        s1 = s1 + recharge
+        base = k1 * s1
+        s1 = s1 - base
+
+        q[:, t] = _convolve(conv, ponded - infil + interflow + base, uh)
+
+    # mm/d to m3/s
+    return q * np.atleast_1d(area).astype(float) * 1000. / 86400.
+
+
+def hbvec(params, derived, forcing, time, area, latitude, rain_snow_fraction="RAINSNOW_HBV",
+          evaporation="PET_FROMMONTHLY", soil2=0.50657):
+    """Simulate streamflow with HBV-EC, as configured in the raven-hbv-ec templates.
+
+    Glacier processes, lake evaporation and orographic corrections are not simulated: the templates describe a
+    single non-glacier, non-lake HRU at the gauge elevation, for which they have no effect.
+
+    Parameters
+    ----------
+    params : array
+      Parameters, shape (params, 21), in the order of `HBVEC.params`.
+    derived : dict
+      Derived parameters, as computed by `HBVEC.derived_parameters`, arrays of shape (params,), and the
+      `MonthlyAverage` of temperature and evaporation.
+    forcing : dict
+      Forcing arrays of shape (nbasins, time), as returned by `read_forcing`.
+    time : pd.DatetimeIndex
+      Time steps.
+    area : array
+      Area of each basin [km2].
+    latitude : array
+      Latitude of each basin [deg].
+    rain_snow_fraction : str
+      Rain snow partitioning method. The transition temperature is the first model parameter.
+    evaporation : str
+      Evaporation method. With PET_FROMMONTHLY, the monthly average evaporation is scaled by the ratio of the daily to
+      the monthly average temperature.
+    soil2 : float
+      Initial slow reservoir level [mm].
+
+    Returns
+    -------
+    array
+      Simulated outflows [m3/s], shape (params, time, nbasins).
+    """
+    params = np.atleast_2d(np.asarray(params, dtype=float))
+    forcing = temperatures(dict(forcing))
+    tas = forcing['tas']
+    doy = time.dayofyear
+
+    if evaporation == 'PET_FROMMONTHLY':
+        month = np.asarray(time.month) - 1
+        mae = np.asarray(derived['monthly_ave_evaporation'].data, dtype=float)[month]
+        mat = np.asarray(derived['monthly_ave_temperature'].data, dtype=float)[month]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            evap = np.where(mat > 0, mae * np.clip(tas, 0, None) / mat, 0)
+    else:
+        evap = pet(forcing, evaporation, latitude, doy)
+
+    (t_trans, melt_factor, kf_refreeze, swi, porosity, field_cap, beta, perc, k_fast, k_slow, _, _, _, _, _,
+     max_rise, top, forest_corr, _, _, _) = _column(params)
+    exponent = np.asarray(derived['one_plus_par_x15'], dtype=float)[:, np.newaxis]
+    smax = top * 1000. * porosity
+    tension = field_cap * smax
+
+    # Seasonal melt factor, with a minimum of 2.2 mm/d/K at the winter solstice
+    season = .5 * (1 - np.cos(2 * np.pi * (np.asarray(doy) - 81) / 365.))
+
+    uh = triangular_unit_hydrograph(params[:, 10], derived['par_x11_half'])
+
+    npar, nbas = len(params), tas.shape[0]
+    shape = (npar, nbas)
+    s0, fast = np.zeros(shape), np.zeros(shape)
+    slow = np.full(shape, float(soil2))
+    swe, liq = np.zeros(shape), np.zeros(shape)
+    conv = np.zeros(shape + uh.shape[-1:])
+
+    q = np.empty((npar, tas.shape[1], nbas))
+    for t in range(tas.shape[1]):
+        ta = tas[:, t]
+
+        # Rain snow partitioning over a 2 degree interval centered on the transition temperature
+        frac = np.clip((ta - (t_trans - 1.)) / 2., 0, 1)
+        if 'rainfall' in forcing and 'prsn' in forcing:
+            rain, snow = forcing['rainfall'][:, t], forcing['prsn'][:, t]
+        else:
+            rain, snow = forcing['pr'][:, t] * frac, forcing['pr'][:, t] * (1 - frac)
+
+        # Refreeze of liquid water in the snowpack
+        refreeze = np.minimum(kf_refreeze * np.clip(-ta, 0, None), liq)
+        liq = liq - refreeze
+        swe = swe + refreeze
+
+        # Precipitation, with 12 percent intercepted by the forest canopy and evaporated at the potential rate
+        rain, snow = rain * 0.88, snow * 0.88
+        on_snow = swe > 0
+        liq = liq + np.where(on_snow, rain, 0)
+        ponded = np.where(on_snow, 0, rain)
+        swe = swe + snow
+
+        # Snow melt, with a forest correction, and overflow of liquid water above the irreducible saturation
+        ma = (2.2 + (melt_factor - 2.2) * season[t]) * forest_corr
+        melt = np.minimum(ma * np.clip(ta, 0, None), swe)
+        swe = swe - melt
+        liq = liq + melt
+        overflow = np.maximum(liq - swi * swe, 0)
+        liq = liq - overflow
+        ponded = ponded + overflow
+
+        # Infiltration, runoff being flushed to the fast reservoir
+        infil = ponded * (1 - np.clip(s0 / smax, 0, 1) ** beta)
+        s0 = s0 + infil
+        fast = fast + ponded - infil
+
+        # Soil evaporation, suppressed under snow
+        aet = np.where(swe > 0, 0, evap[:, t] * np.clip(s0 / tension, 0, 1))
+        s0 = s0 - np.minimum(aet, s0)
+
+        # Capillary rise from the fast reservoir
+        rise = np.minimum(max_rise * (1 - np.clip(s0 / smax, 0, 1)), fast)
+        s0 = s0 + rise
+        fast = fast - rise
+
+        # Percolation and baseflow
+        recharge = np.minimum(perc, fast)
+        fast = fast - recharge
+        slow = slow + recharge
+        qf = np.minimum(k_fast * fast ** exponent, fast)
+        fast = fast - qf
+        qs = k_slow * slow
+        slow = slow - qs
+
+        q[:, t] = _convolve(conv, qf + qs, uh)
+
+    # mm/d to m3/s
+    return q * np.atleast_1d(area).astype(float) * 1000. / 86400.
@@ -0,0 +1,62 @@
+"""
+Forcing metadata
+================
+
+Process-wide index of the metadata of forcing netCDF files: variable names, dimensions, units and time bounds.
+
+Setting up a simulation only needs the structure of the forcing files, not their data. Metadata is read once per file
+and cached by path, modification time and size, so that parallel simulations and repeated runs over the same forcing
+archive do not open the files again. A file that is modified is read anew.
+"""
+from functools import lru_cache
+from pathlib import Path
+from types import MappingProxyType
+from typing import NamedTuple
+
+import xarray as xr
+
+
+class VariableMetadata(NamedTuple):
+    """Dimensions and units of a netCDF variable."""
+    dims: tuple
+    units: str = None
+
+
+class ForcingMetadata(NamedTuple):
+    """Metadata of a forcing file."""
+    path: Path
+    variables: dict
+    start: object = None
+    end: object = None
+
+
+def forcing_metadata(fn):
+    """Return the `ForcingMetadata` of a netCDF file, reading the file only if it is not already indexed.
+
+    Parameters
+    ----------
+    fn : str, Path
+      Path to the netCDF file.
+    """
+    fn = Path(fn).resolve()
+    st = fn.stat()
+    return _read_metadata(str(fn), st.st_mtime_ns, st.st_size)
+
+
+@lru_cache(maxsize=1024)
+def _read_metadata(path, mtime, size):
+    """Read the metadata of a netCDF file. The modification time and size are only used as cache keys."""
+    with xr.open_dataset(path) as ds:
+        variables = {name: VariableMetadata(da.dims, da.attrs.get("units")) for name, da in ds.data_vars.items()}
+
+        start = end = None
+        if 'time' in ds.indexes:
+            time = ds.indexes['time']
+            start, end = time[0], time[-1]
+
+    return ForcingMetadata(Path(path), MappingProxyType(variables), start, end)
+
+
+def clear_index():
+    """Empty the forcing metadata index."""
+    _read_metadata.cache_clear()
@@ -0,0 +1,210 @@
+"""
+Output merging
+==============
+
+Aggregate the netCDF outputs of parallel simulations into a single file along the parallel dimension (`params` or
+`nbasins`), holding at most one variable of one member in memory at any time.
+
+The output file is preallocated from the structure of the first member, then each member's slab is copied in turn.
+Variables are treated as `xr.concat(..., data_vars='different')` would: variables holding the parallel dimension, as
+well as those whose values differ among members, are concatenated along it, while identical variables are written once.
+
+Outputs can also be aggregated in a chunked Zarr store (`ZarrEnsemble`), filled as each member completes. Since members
+are written before all of them are known, every data variable along time is stored along the parallel dimension.
+"""
+import hashlib
+from pathlib import Path
+
+import numpy as np
+
+
+def merge_netcdf(files, outfn, dim):
+    """Merge netCDF files along dimension `dim`, one member at a time.
+
+    Parameters
+    ----------
+    files : sequence
+      Paths to the netCDF files of each member, all with the same variables and dimensions.
+    outfn : str, Path
+      Path to the merged output file.
+    dim : str
+      Name of the dimension along which members are concatenated. If the files do not hold this dimension, it is
+      created.
+
+    Returns
+    -------
+    Path
+      `outfn`
+
+    Notes
+    -----
+    The layout of the output depends on which variables differ among members, so the merge starts once all members
+    have completed, and members are read twice: once to compare the variables without `dim`, and once to copy them to
+    the output. Variables holding `dim` are only read in the second pass, and other variables are only read in the
+    first pass until they are found to differ. If members do not hold `dim`, all their variables need comparing, so
+    those that differ, such as `q_sim`, are read once more for the first two members. Use `ZarrEnsemble` to write
+    members as they complete.
+
+    Raises
+    ------
+    ValueError
+      If there are no members or if members have different dimensions.
+    KeyError
+      If members have different variables.
+    """
+    import netCDF4 as nc
+
+    if not files:
+        raise ValueError("No files to merge.")
+
+    with nc.Dataset(str(files[0])) as ds:
+        dims = {name: (None if d.isunlimited() else len(d)) for name, d in ds.dimensions.items()}
+        shapes = {name: len(d) for name, d in ds.dimensions.items() if name != dim}
+        variables = list(ds.variables)
+        checked = [name for name in variables if dim not in ds.variables[name].dimensions]
+
+    # First pass: find the extent of each member along `dim` and the variables without `dim` that differ among
+    # members. Variables holding `dim` are always concatenated, and are not read. A variable is no longer read once it
+    # is known to differ.
+    sizes = []
+    digests = {}
+    concat = set()
+    for fn in files:
+        with nc.Dataset(str(fn)) as ds:
+            ds.set_auto_maskandscale(False)
+            if {name: len(d) for name, d in ds.dimensions.items() if name != dim} != shapes:
+                raise ValueError("Dimensions of {} do not match those of {}.".format(fn, files[0]))
+
+            sizes.append(len(ds.dimensions[dim]) if dim in ds.dimensions else 1)
+            for name in checked:
+                if name in concat:
+                    continue
+                digest = _digest(ds.variables[name][:])
+                if digests.setdefault(name, digest) != digest:
+                    concat.add(name)
+
+    offsets = np.cumsum([0, ] + sizes)
+
+    # Second pass: preallocate the output from the first member's structure and copy each member's slab.
+    with nc.Dataset(str(files[0])) as tpl, nc.Dataset(str(outfn), 'w') as out:
+        out.setncatts({key: tpl.getncattr(key) for key in tpl.ncattrs()})
+        out.set_auto_maskandscale(False)
+
+        for name, size in dims.items():
+            if name == dim and size is not None:
+                size = int(offsets[-1])
+            out.createDimension(name, size)
+        if dim not in dims:
+            out.createDimension(dim, int(offsets[-1]))
+
+        for name in variables:
+            var = tpl.variables[name]
+            vdims = var.dimensions
+            if dim not in vdims and name in concat:
+                vdims = (dim, ) + vdims
+
+            attrs = {key: var.getncattr(key) for key in var.ncattrs()}
+            fill = attrs.pop('_FillValue', None)
+            ovar = out.createVariable(name, var.datatype, vdims, fill_value=fill)
+            ovar.setncatts(attrs)
+
+        for i, fn in enumerate(files):
+            with nc.Dataset(str(fn)) as ds:
+                ds.set_auto_maskandscale(False)
+                for name in variables:
+                    ovar = out.variables[name]
+                    if dim not in ovar.dimensions:
+                        if i == 0:
+                            ovar[:] = ds.variables[name][:]
+                        continue
+
+                    values = ds.variables[name][:]
+                    key = [slice(None)] * len(ovar.dimensions)
+                    key[ovar.dimensions.index(dim)] = slice(offsets[i], offsets[i + 1])
+                    if dim not in ds.variables[name].dimensions:
+                        values = np.expand_dims(values, 0).repeat(sizes[i], axis=0)
+                    ovar[tuple(key)] = values
+
+    return outfn
+
+
+def _digest(values):
+    """Return a hash of an array's content."""
+    values = np.asarray(values)
+    if values.dtype.kind == 'O':
+        return hashlib.sha1(repr(values.tolist()).encode()).hexdigest()
+    return hashlib.sha1(np.ascontiguousarray(values).tobytes()).hexdigest() + str(values.shape)
+
+
+class ZarrEnsemble:
+    """Chunked Zarr store aggregating the netCDF outputs of parallel simulations along dimension `dim`.
+
+    The store is created from the structure of the first member written, then each member fills its own slab, so
+    members can be added in any order as simulations complete. Data variables holding `dim` or `time` are chunked along
+    both dimensions, other variables are written once from the first member. Requires `zarr`.
+
+    Parameters
+    ----------
+    path : str, Path
+      Path to the Zarr store. An existing store is replaced.
+    dim : str
+      Name of the dimension along which members are stored. If member files do not hold this dimension, it is created.
+    size : int
+      Number of members.
+    time_chunk : int
+      Chunk size along the time dimension.
+    """
+
+    def __init__(self, path, dim, size, time_chunk=3650):
+        self.path = Path(path)
+        self.dim = dim
+        self.size = size
+        self.time_chunk = time_chunk
+        self.written = set()  # Indices of the members written in the store.
+
+    @property
+    def complete(self):
+        """Whether all members have been written."""
+        return len(self.written) == self.size
+
+    def write(self, fn, index):
+        """Write the member stored in netCDF file `fn` at position `index` along `dim`."""
+        import xarray as xr
+
+        with xr.open_dataset(str(fn)) as ds:
+            member = self._member(ds)
+            if not self.written:
+                self._create(member)
+
+            slab = member.drop_vars([name for name, var in member.variables.items() if self.dim not in var.dims])
+            slab.to_zarr(str(self.path), region={self.dim: slice(index, index + 1)})
+
+        self.written.add(index)
+
+    def _member(self, ds):
+        """Return the member dataset, with `dim` added to the data variables along time that do not hold it."""
+        for name in list(ds.data_vars):
+            if 'time' in ds[name].dims and self.dim not in ds[name].dims:
+                ds[name] = ds[name].expand_dims(self.dim)
+
+        for name, var in list(ds.variables.items()):
+            var.encoding = {key: val for key, val in var.encoding.items() if key in ('units', 'calendar')}
+
+            # Store strings with variable length, since their width may differ among members.
+            if self.dim in var.dims and var.dtype.kind in 'SU':
+                ds[name] = var.astype(object)
+        return ds
+
+    def _create(self, member):
+        """Create the store, writing the variables without `dim` and the metadata of the other ones."""
+        import xarray as xr
+
+        static = [name for name, var in member.variables.items() if self.dim not in var.dims]
+        lazy = member.drop_vars(static).chunk().isel({self.dim: np.zeros(self.size, dtype=int)})
+        tpl = xr.merge([member[static], lazy], combine_attrs='override')
+        tpl.attrs = member.attrs
+
+        chunks = {self.dim: 1, 'time': self.time_chunk}
+        encoding = {name: {'chunks': tuple(min(chunks.get(d, n), n) for d, n in zip(var.dims, var.shape))}
+                    for name, var in lazy.variables.items()}
+        tpl.to_zarr(str(self.path), mode='w', compute=False, encoding=encoding)
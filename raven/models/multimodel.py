@@ -54,8 +54,8 @@ class RavenMultiModel(Raven):
             out.extend(m.rvs)
         return out
 
-    def run(self, ts, overwrite=False, **kwds):
-        """Run model.
+    def _prepare_runs(self, ts, overwrite=False, **kwds):
+        """Prepare the runs of every model.
 
         Parameters
         ----------
@@ -72,13 +72,17 @@ class RavenMultiModel(Raven):
         for m in self._models:
             p[m.identifier] = kwds.pop(m.identifier, None)
 
-        procs = []
+        jobs = []
+        self._cache_entries = []
         for m in self._models:
             # Add params to kwds if passed in run.
             kw = kwds.copy()
             if p[m.identifier]:
                 kw['params'] = p[m.identifier]
 
-            procs.extend(m.run(ts, **kw))
+            m.cache = self.cache
+            m.profile = self.profile
+            jobs.extend(m._prepare_runs(ts, **kw))
+            self._cache_entries.extend(m._cache_entries)
 
-        return procs
+        return jobs
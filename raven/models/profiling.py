@@ -0,0 +1,139 @@
+"""
+Profiling
+=========
+
+Record the resources used by the phases of a model run (writing configuration files, launching the executable, parsing
+and merging outputs, etc.) and by each run of the model executable.
+
+For each phase, the wall time, the CPU time and the number of bytes written are accumulated over all the times the phase
+is entered. The CPU time of phases launching executables includes the time spent by the child processes, and their bytes
+written include the files written by the runs. Phases can be nested, in which case the outer phase includes the inner
+one. Entering a phase that is already running, e.g. `setup` calling its parent class' `setup`, is not counted twice.
+"""
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def children_cpu_time():
+    """Return the CPU time used by the child processes that have completed, or 0 if it is not available."""
+    if resource is None:
+        return 0.
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def process_bytes_written():
+    """Return the number of bytes written by the current process, or None if it is not available."""
+    try:
+        import psutil
+        io = psutil.Process().io_counters()
+    except (ImportError, AttributeError, OSError):
+        return None
+    return getattr(io, 'write_chars', io.write_bytes)
+
+
+def bytes_written(path, since):
+    """Return the total size of the files under `path` modified after time `since` (seconds since the epoch)."""
+    total = 0
+    for fn in Path(path).rglob('*'):
+        try:
+            stat = fn.lstat()
+        except OSError:
+            continue
+        if fn.is_file() and not fn.is_symlink() and stat.st_mtime >= since:
+            total += stat.st_size
+    return total
+
+
+class Profile:
+    """Wall time, CPU time and bytes written by each phase of a model run, and by each run of the executable.
+
+    Example
+    -------
+    >>> p = Profile()
+    >>> with p.phase('dump_rv'):
+    ...     write_files()
+    >>> p.as_dict()['phases']['dump_rv']['wall_time']
+    """
+
+    def __init__(self):
+        self.phases = {}
+        self.runs = []
+        self._active = set()
+
+    def reset(self):
+        """Clear the recorded phases and runs."""
+        self.phases = {}
+        self.runs = []
+        self._active = set()
+
+    def _sample(self, children):
+        cpu = time.process_time() + (children_cpu_time() if children else 0.)
+        return time.perf_counter(), cpu, process_bytes_written()
+
+    @contextmanager
+    def phase(self, name, children=False):
+        """Context manager recording the resources used by phase `name`.
+
+        Parameters
+        ----------
+        name : str
+          Phase name.
+        children : bool
+          Whether the phase launches child processes, whose CPU time and runs' bytes written are added to the phase.
+        """
+        if name in self._active:
+            yield
+            return
+
+        self._active.add(name)
+        nruns = len(self.runs)
+        start = self._sample(children)
+        try:
+            yield
+        finally:
+            end = self._sample(children)
+            self._active.discard(name)
+
+            stats = self.phases.setdefault(name, dict(calls=0, wall_time=0., cpu_time=0., bytes_written=0))
+            stats['calls'] += 1
+            stats['wall_time'] += end[0] - start[0]
+            stats['cpu_time'] += end[1] - start[1]
+            if None in (start[2], end[2], stats['bytes_written']):
+                stats['bytes_written'] = None
+            else:
+                stats['bytes_written'] += end[2] - start[2]
+                if children:
+                    stats['bytes_written'] += sum(run['bytes_written'] for run in self.runs[nruns:])
+
+    def add_run(self, result, bytes_written=0):
+        """Record the resources used by a run of the model executable.
+
+        Parameters
+        ----------
+        result : RunResult
+          Outcome of the run, including its wall and CPU time.
+        bytes_written : int
+          Size of the files written by the run.
+        """
+        self.runs.append(dict(index=result.index, returncode=result.returncode, wall_time=result.wall_time,
+                              cpu_time=result.cpu_time, bytes_written=bytes_written))
+
+    def as_dict(self):
+        """Return the recorded phases and runs as a JSON-serializable dictionary.
+
+        Returns
+        -------
+        dict
+          `phases` maps each phase name to its number of `calls`, `wall_time` and `cpu_time` in seconds and
+          `bytes_written`. `runs` lists the `index`, `returncode`, `wall_time`, `cpu_time` and `bytes_written` of each
+          run of the executable, in order of completion.
+        """
+        return dict(phases={name: dict(stats) for name, stats in self.phases.items()},
+                    runs=[dict(run) for run in self.runs])
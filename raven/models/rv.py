@@ -1,10 +1,13 @@
 import six
 import datetime as dt
 import collections
+import re
+import string
 from pathlib import Path
 from xclim.core.units import units
 from xclim.core.units import units2pint
-from . state import HRUStateVariables, BasinStateVariables
+from . state import HRUStates, BasinStates
+from .solution import read_solution
 
 # Can be removed when xclim is pinned above 0.14
 units.define("deg_C = degC")
@@ -48,8 +51,17 @@ evaporation_options = ("PET_CONSTANT", "PET_PENMAN_MONTEITH", "PET_PENMAN_COMBIN
 
 state_variables = ()
 
+# Template tags, such as {run_name} or {params.GR4J_X1}.
+tag_pattern = re.compile(r"{([\.\w]+)}")
+_formatter = string.Formatter()
+
 
 class RVFile:
+    """Configuration file template.
+
+    The template is parsed once when its content is set, so that rendering it repeatedly only fills the tags, and
+    writing it leaves the file on disk untouched if its content would not change.
+    """
 
     def __init__(self, fn):
         """Read the content."""
@@ -64,7 +76,6 @@ class RVFile:
         # Whether extension indicates an Ostrich template file.
         self.is_tpl = fn.suffix in ['.tpl', '.txt']
 
-        self.content = ""
         self.content = fn.read_text()
 
     def _store_ext(self, fn):
@@ -74,26 +85,61 @@ class RVFile:
             msg = "\nFile {} does not look like a valid Raven/Ostrich config file.".format(fn)
             raise ValueError(msg) from e
 
+    @property
+    def content(self):
+        """Template content."""
+        return self._content
+
+    @content.setter
+    def content(self, value):
+        self._content = value
+        self._tags = tag_pattern.findall(value)
+
+        # Split the template into (literal text, field name, conversion, format spec) slots. Malformed templates and
+        # nested format specs are left for `str.format` to handle when rendered.
+        try:
+            self._slots = [(text, name, conv, spec) for text, name, spec, conv in _formatter.parse(value)]
+        except ValueError:
+            self._slots = None
+        else:
+            if any(spec and '{' in spec for _, _, _, spec in self._slots):
+                self._slots = None
+
     def rename(self, name):
         self.stem = name
 
+    def render(self, **kwds):
+        """Return the content with template tags filled with the given values."""
+        if not kwds:
+            return self._content
+        if self._slots is None:
+            return self._content.format_map(kwds)
+
+        out = []
+        for text, name, conv, spec in self._slots:
+            out.append(text)
+            if name is not None:
+                obj = _formatter.get_field(name, (), kwds)[0]
+                out.append(format(_formatter.convert_field(obj, conv), spec))
+        return ''.join(out)
+
     def write(self, path, **kwds):
+        """Write the rendered template in directory `path`, unless the file already holds the same content."""
         fn = (path / self.stem).with_suffix(self.suffixes)
+        data = self.render(**kwds).encode()
+        try:
+            if fn.stat().st_size == len(data) and fn.read_bytes() == data:
+                return fn
+        except OSError:
+            pass
 
-        content = self.content
-        if kwds:
-            content = content.format(**kwds)
-
-        fn.write_text(content)
+        fn.write_bytes(data)
         return fn
 
     @property
     def tags(self):
         """Return a list of tags within the templates."""
-        import re
-        pattern = re.compile(r"{([\.\w]+)}")
-
-        return pattern.findall(self.content)
+        return list(self._tags)
 
 
 class RV(collections.Mapping):
@@ -547,9 +593,15 @@ class RVI(RV):
 
 
 class RVC(RV):
+    """Initial conditions.
+
+    The states of all HRUs and basins are stored in columnar containers, available as `hru_states` and
+    `basin_states`, while `hru_state` and `basin_state` get and set the state of the first HRU and basin.
+    """
+
     def __init__(self, **kwargs):
-        self._hru_state = {}
-        self._basin_state = {}
+        self._hru_state = HRUStates(index=[])
+        self._basin_state = BasinStates(index=[])
 
         # This is a hack to make sure the txt_hru_state and txt_basin_state are picked up to fill the rv templates.
         self._txt_hru_state = ""
@@ -565,61 +617,59 @@ class RVC(RV):
         path : string
           `solution.rvc` content.
         """
+        solution = read_solution(rvc)
+        self._hru_state = HRUStates.from_table(solution.hru_state)
+        self._basin_state = BasinStates.from_records(solution.basin_state)
 
-        data = parse_solution(rvc)
-        for index, params in data['HRUStateVariableTable']['data'].items():
-            self._hru_state[index] = HRUStateVariables(*params)
+    @property
+    def hru_states(self):
+        """States of all HRUs."""
+        return self._hru_state
 
-        for index, raw in data["BasinStateVariables"]["BasinIndex"].items():
-            params = {k.lower(): v for (k, v) in raw.items()}
-            self._basin_state[index] = BasinStateVariables(**params)
+    @hru_states.setter
+    def hru_states(self, value):
+        self._hru_state = value
 
-        return
+    @property
+    def basin_states(self):
+        """States of all basins."""
+        return self._basin_state
+
+    @basin_states.setter
+    def basin_states(self, value):
+        self._basin_state = value
 
     @property
     def hru_state(self):
-        return self._hru_state.get(1)
+        return self._hru_state.record(1)
 
     @hru_state.setter
     def hru_state(self, value):
-        self._hru_state[1] = value
+        if value is None:
+            self._hru_state.drop(1)
+        else:
+            self._hru_state.set(1, value)
 
     @property
     def basin_state(self):
-        return self._basin_state.get(1)
+        return self._basin_state.record(1)
 
     @basin_state.setter
     def basin_state(self, value):
-        self._basin_state[1] = value
+        if value is None:
+            self._basin_state.drop(1)
+        else:
+            self._basin_state.set(1, value)
 
     @property
     def txt_hru_state(self):
         """Return HRU state values."""
-        txt = []
-        for index, data in self._hru_state.items():
-            txt.append(f"{index}," + ",".join(map(repr, data)))
-
-        return "\n".join(txt)
+        return self._hru_state.to_text()
 
     @property
     def txt_basin_state(self):
         """Return basin state variables."""
-        pat = """
-              :BasinIndex {index},{name}
-                :ChannelStorage, {channelstorage}
-                :RivuletStorage, {rivuletstorage}
-                :Qout,{nsegs},{qout},{qoutlast}
-                :Qlat,{nQlatHist},{qlat},{qlatlast}
-                :Qin ,{nQinHist}, {qin}
-            """
-        txt = []
-        for index, data in self._basin_state.items():
-            txt.append(pat.format(**data._asdict(),
-                                  nsegs=len(data.qout),
-                                  nQlatHist=len(data.qlat),
-                                  nQinHist=len(data.qin))
-                       )
-        return "\n".join(txt).replace('[', '').replace(']', '')
+        return self._basin_state.to_text()
 
 
 class Ost(RV):
@@ -0,0 +1,274 @@
+"""
+Scheduler
+=========
+
+Launch model executables in subprocesses while bounding the number of processes running simultaneously.
+
+Simulations are queued and started as slots free up. Each run's exit code, standard error, wall time and CPU time are
+collected in a `RunResult`, and an optional callback is notified as soon as a run completes.
+
+`run_processes` blocks until all runs are completed, while `arun_processes` is a coroutine driving the subprocesses
+from an asyncio event loop, so that many simulations can be awaited concurrently without tying up threads. Both read
+the progress files of running jobs, and `ProgressTracker` aggregates the progress of parallel runs into an overall
+percentage.
+"""
+import asyncio
+import os
+import re
+import subprocess
+import tempfile
+import time
+from collections import deque
+from pathlib import Path
+from typing import NamedTuple
+
+from raven import config
+from .profiling import children_cpu_time
+
+_progress_pattern = re.compile(r'progress"?\s*:\s*(\d+)', re.IGNORECASE)
+
+
+class Job(NamedTuple):
+    """Command to launch, the directory in which to launch it, and the progress file it writes to, if any."""
+    cmd: list
+    cwd: str
+    progress_file: str = None
+
+
+class RunResult(NamedTuple):
+    """Outcome of a single model run."""
+    index: int
+    cmd: list
+    cwd: str
+    returncode: int
+    stderr: str
+    wall_time: float = None  # Seconds elapsed between the launch and the end of the run.
+    cpu_time: float = None  # CPU seconds used by the process and its children.
+
+
+def default_max_processes():
+    """Return the default number of simultaneous processes, the CPU count capped by `config.max_parallel_processes`."""
+    return max(1, min(os.cpu_count() or 1, config.max_parallel_processes))
+
+
+def run_processes(jobs, max_processes=None, callback=None, poll_interval=0.05, progress=None, progress_interval=0.5):
+    """Run commands in subprocesses, with at most `max_processes` of them running at the same time.
+
+    Parameters
+    ----------
+    jobs : sequence
+      Sequence of `Job` or (cmd, cwd) tuples, where `cmd` is the list of command arguments and `cwd` the directory in
+      which the command is launched.
+    max_processes : int
+      Maximum number of simultaneous processes. Defaults to `default_max_processes()`.
+    callback : callable
+      Function called with the `RunResult` of each run as soon as it finishes.
+    poll_interval : float
+      Time in seconds between checks on the running processes.
+    progress : callable
+      Function called with the job index and its progress percentage whenever the job's progress file reports a
+      new value.
+    progress_interval : float
+      Time in seconds between reads of the progress files.
+
+    Returns
+    -------
+    list
+      The `RunResult` of each job, in the order of `jobs`.
+    """
+    max_processes = max_processes or default_max_processes()
+    if max_processes < 1:
+        raise ValueError("The maximum number of processes should be a positive integer: {}".format(max_processes))
+
+    queue = deque(enumerate(Job(*job) for job in jobs))
+    results = [None] * len(queue)
+    running = {}
+    progress_files = {}
+    last_progress = {}
+    last_read = 0
+
+    try:
+        while queue or running:
+            # Fill free slots with queued jobs.
+            while queue and len(running) < max_processes:
+                i, (cmd, cwd, progress_file) = queue.popleft()
+                err = tempfile.TemporaryFile()
+                proc = subprocess.Popen(list(map(str, cmd)), cwd=str(cwd), stdout=subprocess.DEVNULL, stderr=err)
+                running[i] = (proc, err, cmd, cwd, time.perf_counter())
+                if progress_file is not None:
+                    progress_files[i] = progress_file
+
+            if progress is not None and time.perf_counter() - last_read >= progress_interval:
+                last_read = time.perf_counter()
+                for i in running:
+                    value = read_progress(progress_files[i]) if i in progress_files else None
+                    if value is not None and value != last_progress.get(i):
+                        last_progress[i] = value
+                        progress(i, value)
+
+            # Processes are reaped one at a time, so that the increase in the children's CPU time is that of the run.
+            done = []
+            for i, (proc, *_) in running.items():
+                cpu = children_cpu_time()
+                if proc.poll() is not None:
+                    done.append((i, children_cpu_time() - cpu))
+
+            for i, cpu in done:
+                proc, err, cmd, cwd, start = running.pop(i)
+                err.seek(0)
+                stderr = err.read().decode('utf-8', errors='replace')
+                err.close()
+
+                results[i] = RunResult(i, cmd, cwd, proc.returncode, stderr, time.perf_counter() - start, cpu)
+                if callback is not None:
+                    callback(results[i])
+
+            if not done:
+                time.sleep(poll_interval)
+
+    finally:
+        # Do not leave orphan processes behind if we're interrupted.
+        for proc, err, *_ in running.values():
+            proc.kill()
+            proc.wait()
+            err.close()
+
+    return results
+
+
+async def arun_processes(jobs, max_processes=None, callback=None, progress=None, poll_interval=0.5):
+    """Coroutine running commands in subprocesses, with at most `max_processes` of them running at the same time.
+
+    Parameters
+    ----------
+    jobs : sequence
+      Sequence of `Job` or (cmd, cwd) tuples.
+    max_processes : int
+      Maximum number of simultaneous processes. Defaults to `default_max_processes()`.
+    callback : callable
+      Function called with the `RunResult` of each run as soon as it finishes.
+    progress : callable
+      Function called with the job index and its progress percentage whenever the job's progress file reports a
+      new value.
+    poll_interval : float
+      Time in seconds between reads of the progress files.
+
+    Returns
+    -------
+    list
+      The `RunResult` of each job, in the order of `jobs`.
+
+    Notes
+    -----
+    Cancelling the coroutine kills the running subprocesses. Since subprocesses are reaped by the event loop's child
+    watcher, the CPU time of runs completing at the same time may be attributed to only one of them.
+    """
+    max_processes = max_processes or default_max_processes()
+    if max_processes < 1:
+        raise ValueError("The maximum number of processes should be a positive integer: {}".format(max_processes))
+
+    semaphore = asyncio.Semaphore(max_processes)
+    cpu = [children_cpu_time()]  # Children's CPU time at the last completion.
+
+    async def _run(i, job):
+        async with semaphore:
+            start = time.perf_counter()
+            proc = await asyncio.create_subprocess_exec(*map(str, job.cmd), cwd=str(job.cwd),
+                                                        stdout=asyncio.subprocess.DEVNULL,
+                                                        stderr=asyncio.subprocess.PIPE)
+            watcher = None
+            if progress is not None and job.progress_file is not None:
+                watcher = asyncio.ensure_future(_watch_progress(i, job.progress_file, progress, poll_interval))
+
+            try:
+                _, stderr = await proc.communicate()
+            except asyncio.CancelledError:
+                proc.kill()
+                await proc.wait()
+                raise
+            finally:
+                if watcher is not None:
+                    watcher.cancel()
+
+        now = children_cpu_time()
+        result = RunResult(i, job.cmd, job.cwd, proc.returncode, stderr.decode('utf-8', errors='replace'),
+                           time.perf_counter() - start, now - cpu[0])
+        cpu[0] = now
+        if callback is not None:
+            callback(result)
+        return result
+
+    return list(await asyncio.gather(*(_run(i, Job(*job)) for i, job in enumerate(jobs))))
+
+
+async def _watch_progress(index, fn, progress, poll_interval):
+    """Call `progress` with the job index and percentage every time the progress file reports a new value."""
+    last = None
+    while True:
+        value = read_progress(fn)
+        if value is not None and value != last:
+            progress(index, value)
+            last = value
+        await asyncio.sleep(poll_interval)
+
+
+class ProgressTracker:
+    """Aggregate the progress of parallel runs into an overall percentage, reported at a limited rate.
+
+    Parameters
+    ----------
+    njobs : int
+      Number of runs.
+    callback : callable
+      Function called with the overall progress percentage, the mean of the runs' progress, when it changes.
+    min_interval : float
+      Minimum time in seconds between two calls to `callback`, except for the call reporting that all runs completed.
+    """
+
+    def __init__(self, njobs, callback, min_interval=1.):
+        self.njobs = njobs
+        self.callback = callback
+        self.min_interval = min_interval
+        self.values = {}
+        self.reported = None
+        self._last = None
+
+    @property
+    def percent(self):
+        """Overall progress percentage."""
+        return int(sum(self.values.values()) / self.njobs) if self.njobs else 100
+
+    def update(self, index, value):
+        """Set the progress percentage of run `index`."""
+        self.values[index] = max(value, self.values.get(index, 0))
+        self._report()
+
+    def completed(self, result):
+        """Set the run stored in `RunResult` `result` as completed."""
+        self.update(result.index, 100)
+
+    def _report(self):
+        percent = self.percent
+        now = time.perf_counter()
+        if percent == self.reported:
+            return
+        if percent < 100 and self._last is not None and now - self._last < self.min_interval:
+            return
+
+        self.reported, self._last = percent, now
+        self.callback(percent)
+
+
+def read_progress(fn):
+    """Return the progress percentage stored in a Raven or Ostrich progress file, or None if it is not available.
+
+    The file is overwritten continuously by the executable, so it may be missing or incomplete when read.
+    """
+    try:
+        txt = Path(fn).read_text()
+    except (OSError, UnicodeDecodeError):
+        return None
+
+    match = _progress_pattern.search(txt)
+    if match:
+        return int(match.group(1))
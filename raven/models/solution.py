@@ -0,0 +1,147 @@
+"""
+Solution files
+==============
+
+Bulk reader and writer for Raven solution files (`solution.rvc`), storing the end-of-run state of a simulation.
+
+The HRU state table is loaded at once into a NumPy structured array holding an `index` field followed by one field per
+state variable, named as in `HRUStateVariables` (`SOIL[0]` becomes `soil0`). Basin states are stored as
+`BasinStateVariables`. Unlike `parse_solution`, which builds nested dictionaries line by line, the cost of reading and
+writing a solution grows with the number of HRUs only through NumPy conversions.
+"""
+import io
+import re
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+
+from .state import BasinStateVariables, BasinStates
+
+
+class Solution(NamedTuple):
+    """Content of a solution file."""
+    hru_state: np.ndarray  # Structured array with an `index` field and one field per state variable.
+    basin_state: list  # BasinStateVariables for each basin.
+    attributes: tuple = ()  # State variable names, as written in the file.
+    units: tuple = ()
+    timestamp: str = None
+
+
+_timestamp = re.compile(r":TimeStamp\s+(.*?)\s*$", re.MULTILINE)
+
+
+def field_name(attribute):
+    """Return the field name of a state variable, e.g. `soil0` for `SOIL[0]`."""
+    return attribute.lower().replace('[', '').replace(']', '')
+
+
+def _block(txt, name, start=0):
+    """Return the lines between `:name` and `:Endname`, and the position of the block end in `txt`."""
+    i = txt.find(":" + name, start)
+    if i < 0:
+        return "", start
+    i = txt.find("\n", i) + 1
+    j = txt.index(":End" + name, i)
+    return txt[i:j], j
+
+
+def read_solution(rvc):
+    """Read a solution file.
+
+    Parameters
+    ----------
+    rvc : str or Path
+      Path to the solution file, or its content.
+
+    Returns
+    -------
+    Solution
+      The HRU state table as a structured array, and the basin states.
+    """
+    txt = rvc.read_text() if isinstance(rvc, Path) else rvc
+    match = _timestamp.search(txt)
+    timestamp = match.group(1) if match else None
+
+    # HRU state table, starting with the :Attributes and :Units header lines.
+    table, end = _block(txt, "HRUStateVariableTable")
+    header = {}
+    table = table.lstrip()
+    while table.startswith(':'):
+        line, _, table = table.partition("\n")
+        key, *values = line.strip()[1:].split(',')
+        header[key] = tuple(v.strip() for v in values)
+        table = table.lstrip()
+
+    attributes = header.get('Attributes', ())
+    values = np.loadtxt(io.StringIO(table), delimiter=',', ndmin=2).reshape(-1, len(attributes) + 1)
+
+    names = [field_name(a) for a in attributes]
+    hru_state = np.empty(len(values), dtype=[('index', int)] + [(name, float) for name in names])
+    hru_state['index'] = values[:, 0]
+    for i, name in enumerate(names, 1):
+        hru_state[name] = values[:, i]
+
+    # Basin states
+    basin_state = []
+    basins, _ = _block(txt, "BasinStateVariables", end)
+    for block in re.split(r"^\s*:BasinIndex\s+", basins, flags=re.MULTILINE)[1:]:
+        index, *lines = block.strip().splitlines()
+        i, name = index.split(',', 1)
+        attrs = {}
+        for line in lines:
+            key, *values = line.strip()[1:].split(',')
+            attrs[key.strip().lower()] = [float(v) for v in values]
+
+        basin_state.append(BasinStateVariables(index=int(i), name=name.strip(),
+                                               channelstorage=attrs['channelstorage'][0],
+                                               rivuletstorage=attrs['rivuletstorage'][0],
+                                               qout=attrs['qout'][1:-1], qoutlast=attrs['qout'][-1],
+                                               qlat=attrs['qlat'][1:-1], qlatlast=attrs['qlat'][-1],
+                                               qin=attrs['qin'][1:]))
+
+    return Solution(hru_state, basin_state, attributes, header.get('Units', ()), timestamp)
+
+
+def format_hru_state(hru_state):
+    """Return the rows of the HRU state table, one line per HRU starting with its index."""
+    names = [name for name in hru_state.dtype.names if name != 'index']
+    values = np.column_stack([hru_state[name] for name in names]).astype(float).tolist()
+    return '\n'.join(f"{index}," + ",".join(map(repr, row)) for index, row in zip(hru_state['index'].tolist(), values))
+
+
+def format_basin_state(basin_state):
+    """Return the basin state blocks."""
+    return BasinStates.from_records(basin_state).to_text()
+
+
+def write_solution(solution, fn):
+    """Write a solution file.
+
+    Parameters
+    ----------
+    solution : Solution
+      Solution content. If `attributes` are not given, they are built from the field names of the HRU state table.
+    fn : str or Path
+      Output file path.
+
+    Returns
+    -------
+    Path
+      `fn`
+    """
+    names = [name for name in solution.hru_state.dtype.names if name != 'index']
+    attributes = solution.attributes or tuple(re.sub(r"(\d+)$", r"[\1]", n).upper() for n in names)
+
+    lines = []
+    if solution.timestamp:
+        lines.append(":TimeStamp {}".format(solution.timestamp))
+    lines += [":HRUStateVariableTable", ":Attributes," + ",".join(attributes)]
+    if solution.units:
+        lines.append(":Units," + ",".join(solution.units))
+    lines += [format_hru_state(solution.hru_state), ":EndHRUStateVariableTable",
+              ":BasinStateVariables", format_basin_state(solution.basin_state), ":EndBasinStateVariables", ""]
+
+    fn = Path(fn)
+    fn.write_text("\n".join(lines))
+    return fn
@@ -9,9 +9,16 @@ Implemented using typing.NamedTuple
 
 Use _replace to update individual values.
 
+The states of many HRUs or basins are stored in columnar containers holding one array per state variable:
+
+* HRUStates
+* BasinStates
+
 """
 from typing import NamedTuple
 
+import numpy as np
+
 
 class HRUStateVariables(NamedTuple):
     """Initial condition for a given HRU."""
@@ -142,3 +149,244 @@ class BasinStateVariables(NamedTuple):
     qlat: tuple = (0, 0, 0)
     qlatlast: float = 0
     qin: tuple = 20 * (0,)
+
+
+class StateArrays:
+    """Columnar container of state variables for a set of entities, holding one array per variable.
+
+    Entities are identified by their `index`. Scalar variables are stored as 1D arrays, and variables holding a series
+    of values (e.g. `qin`) as 2D arrays, or as object arrays if the number of values differs among entities. Columns
+    are accessed by name and can be modified in place, while integer positions, slices, masks and position arrays
+    select a subset of entities::
+
+        states = HRUStates(index=range(1, 1001), soil0=50)
+        states['soil1'][:10] = 15
+        states.update(soil0=25, where=states['index'] > 500)
+        subset = states[::2]
+
+    Parameters
+    ----------
+    index : sequence
+      Entity indices.
+    **columns
+      Values of state variables, broadcast to all entities. Variables not given are set to their default value.
+    """
+    _record = None  # NamedTuple class holding the state variables of a single entity.
+
+    def __init__(self, index=(1,), **columns):
+        self.index = np.array(index, dtype=int, ndmin=1)
+
+        unknown = set(columns) - set(self.fields)
+        if unknown:
+            raise ValueError("Unknown state variables: {}".format(", ".join(sorted(unknown))))
+
+        self._columns = {}
+        for name in self.fields:
+            self[name] = columns.get(name, self._record._field_defaults[name])
+
+    @property
+    def fields(self):
+        """Names of state variables."""
+        return tuple(name for name in self._record._fields if name != 'index')
+
+    @classmethod
+    def from_records(cls, records, index=None):
+        """Create a container from a sequence of state records, e.g. `HRUStateVariables`.
+
+        If `index` is not given, it is read from the records' `index` field or set to 1, 2, ..., n.
+        """
+        records = list(records)
+        if index is None:
+            if 'index' in cls._record._fields:
+                index = [r.index for r in records]
+            else:
+                index = range(1, len(records) + 1)
+
+        columns = dict(zip(cls._record._fields, zip(*records))) if records else {}
+        columns.pop('index', None)
+        return cls(index=index, **columns)
+
+    def __len__(self):
+        return len(self.index)
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            if key == 'index':
+                return self.index
+            return self._columns[key]
+
+        if isinstance(key, (int, np.integer)):
+            key = slice(key, key + 1 or None)
+
+        out = self.__class__.__new__(self.__class__)
+        out.index = self.index[key]
+        out._columns = {name: col[key] for name, col in self._columns.items()}
+        return out
+
+    def __setitem__(self, key, value):
+        if key == 'index':
+            self.index = np.array(value, dtype=int, ndmin=1)
+        elif key in self.fields:
+            self._columns[key] = self._column(key, value)
+        else:
+            raise KeyError(key)
+
+    def _column(self, name, value):
+        """Return `value` as an array with one element or row per entity."""
+        n = len(self.index)
+        if self._record.__annotations__[name] is str:
+            return np.array(np.broadcast_to(np.array(value, dtype=object), (n,)))
+
+        if self._record.__annotations__[name] is not tuple:
+            try:
+                return np.array(np.broadcast_to(np.asarray(value, dtype=float), (n,)))
+            except ValueError:
+                # Array-valued states, e.g. one value per parameter set, are stored as one object per entity.
+                values = value if isinstance(value, (list, tuple)) and len(value) == n else [value] * n
+                a = np.empty(n, dtype=object)
+                for i, v in enumerate(values):
+                    a[i] = v
+                return a
+
+        try:
+            a = np.asarray(value, dtype=float)
+        except ValueError:
+            # Number of values differs among entities.
+            a = np.empty(n, dtype=object)
+            a[:] = [np.asarray(v, dtype=float) for v in value]
+            return a
+
+        if a.ndim < 2:
+            a = np.broadcast_to(np.atleast_1d(a), (n, a.size))
+        return np.array(a)
+
+    def update(self, values=None, where=None, **columns):
+        """Assign values to state variables in bulk.
+
+        Parameters
+        ----------
+        values : dict, optional
+          Values keyed by state variable name.
+        where : slice, array, optional
+          Positions or boolean mask of entities to update. Defaults to all entities.
+        **columns
+          Values keyed by state variable name.
+        """
+        columns = dict(values or {}, **columns)
+        for name, value in columns.items():
+            if where is None:
+                self[name] = value
+            else:
+                self[name][where] = value
+
+    def position(self, index):
+        """Return the position of the entity with the given index, or None if there is none."""
+        pos = np.flatnonzero(self.index == index)
+        return int(pos[0]) if len(pos) else None
+
+    def record(self, index):
+        """Return the state of the entity with the given index as a record, or None if there is none."""
+        i = self.position(index)
+        if i is None:
+            return None
+
+        values = {}
+        for name, col in self._columns.items():
+            array_valued = col.dtype == object and self._record.__annotations__[name] is float
+            values[name] = col[i] if array_valued else _item(col[i])
+        if 'index' in self._record._fields:
+            values['index'] = int(self.index[i])
+        return self._record(**values)
+
+    def records(self):
+        """Iterate over the state records of all entities."""
+        for index in self.index.tolist():
+            yield self.record(index)
+
+    def set(self, index, record):
+        """Set the state of the entity with the given index from a record, appending the entity if needed."""
+        i = self.position(index)
+        if i is None:
+            new = self.from_records([record], index=[index])
+            self.index = np.concatenate([self.index, new.index])
+            for name in self.fields:
+                self._columns[name] = _concat(self._columns[name], new[name])
+            return
+
+        for name in self.fields:
+            value = getattr(record, name)
+            col = self._columns[name]
+            if (col.ndim == 2 and np.shape(value) != col.shape[1:]) or (col.dtype == float and np.ndim(value)):
+                values = list(col)
+                values[i] = value
+                self[name] = values
+            else:
+                col[i] = value
+
+    def drop(self, index):
+        """Remove the entity with the given index."""
+        keep = self.index != index
+        out = self[keep]
+        self.index, self._columns = out.index, out._columns
+
+
+def _item(value):
+    """Return an array element as a Python object."""
+    return value.tolist() if isinstance(value, (np.ndarray, np.generic)) else value
+
+
+def _concat(a, b):
+    """Concatenate the columns of two sets of entities, storing series of different lengths in an object array."""
+    if a.ndim == b.ndim and a.shape[1:] == b.shape[1:]:
+        return np.concatenate([a, b])
+
+    out = np.empty(len(a) + len(b), dtype=object)
+    out[:] = [np.asarray(v, dtype=float) for v in list(a) + list(b)]
+    return out
+
+
+class HRUStates(StateArrays):
+    """Columnar container of HRU state variables. See `StateArrays`."""
+    _record = HRUStateVariables
+
+    @classmethod
+    def from_table(cls, table):
+        """Create a container from a structured array with an `index` field, as returned by `read_solution`."""
+        fields = [name for name in table.dtype.names if name in cls._record._fields]
+        return cls(index=table['index'], **{name: table[name] for name in fields})
+
+    def to_table(self):
+        """Return the states as a structured array with an `index` field and one field per state variable."""
+        table = np.empty(len(self), dtype=[('index', int)] + [(name, float) for name in self.fields])
+        table['index'] = self.index
+        for name in self.fields:
+            table[name] = self._columns[name]
+        return table
+
+    def to_text(self):
+        """Return the rows of the :HRUStateVariableTable, one line per HRU starting with its index."""
+        values = np.column_stack([self._columns[name] for name in self.fields]).tolist() if len(self) else []
+        return "\n".join(f"{index}," + ",".join(map(repr, row)) for index, row in zip(self.index.tolist(), values))
+
+
+class BasinStates(StateArrays):
+    """Columnar container of basin state variables. See `StateArrays`."""
+    _record = BasinStateVariables
+
+    def to_text(self):
+        """Return the :BasinIndex blocks of the :BasinStateVariables section."""
+        def join(values):
+            return ",".join(map(repr, np.asarray(values, dtype=float).tolist()))
+
+        out = []
+        c = self._columns
+        for i, index in enumerate(self.index.tolist()):
+            qout, qlat, qin = c['qout'][i], c['qlat'][i], c['qin'][i]
+            out.append("\n".join([
+                ":BasinIndex {},{}".format(index, c['name'][i]),
+                "  :ChannelStorage, {!r}".format(float(c['channelstorage'][i])),
+                "  :RivuletStorage, {!r}".format(float(c['rivuletstorage'][i])),
+                ":Qout,{},{},{!r}".format(len(qout), join(qout), float(c['qoutlast'][i])),
+                ":Qlat,{},{},{!r}".format(len(qlat), join(qlat), float(c['qlatlast'][i])),
+                ":Qin ,{},{}".format(len(qin), join(qin))]))
+        return "\n".join(out)
@@ -17,4 +17,12 @@ class OstrichProcess(RavenProcess):
     inputs = [wio.ts, wio.conf]
     outputs = [wio.calibration, wio.hydrograph, wio.storage,
                wio.solution, wio.diagnostics, wio.calibparams,
-               wio.rv_config]
+               wio.rv_config, wio.timings]
+    run_inputs = ('starts',)
+
+    def run(self, model, ts, kwds, starts=1):
+        """Launch the calibration, or `starts` independent calibrations keeping the best one."""
+        if starts > 1:
+            model.multistart(ts, seeds=starts, **kwds)
+        else:
+            model(ts=ts, **kwds)
@@ -68,6 +68,6 @@ class OstrichGR4JCemaNeigeProcess(OstrichProcess):
     inputs = [wio.ts, wio.nc_spec, lowerBounds, upperBounds, wio.algorithm, wio.max_iterations, wio.start_date,
               wio.end_date,
               wio.duration, wio.run_name, wio.name, wio.area, wio.latitude, wio.longitude, wio.elevation,
-              wio.random_seed, wio.suppress_output, wio.evaporation, wio.rain_snow_fraction]
+              wio.random_seed, wio.starts, wio.suppress_output, wio.evaporation, wio.rain_snow_fraction]
 
     keywords = ["Ostrich", "Calibration", "DDS"]
@@ -81,6 +81,6 @@ class OstrichMOHYSEProcess(OstrichProcess):
     inputs = [wio.ts, wio.nc_spec, lowerBounds, upperBounds, wio.algorithm,
               wio.max_iterations, wio.start_date, wio.end_date,
               wio.duration, wio.run_name, wio.name, wio.area, wio.latitude, wio.longitude, wio.elevation,
-              wio.random_seed, wio.suppress_output, wio.rain_snow_fraction, wio.evaporation]
+              wio.random_seed, wio.starts, wio.suppress_output, wio.rain_snow_fraction, wio.evaporation]
 
     keywords = ["Ostrich", "Calibration", "DDS"]
@@ -5,6 +5,7 @@ import json
 
 from pywps import Process, Format, LiteralOutput
 
+from raven import config as raven_config
 from raven.models import Raven
 from . import wpsio as wio
 
@@ -20,8 +21,11 @@ class RavenProcess(Process):
 
     tuple_inputs = {}
     inputs = [wio.ts, wio.nc_spec, wio.conf]
-    outputs = [wio.hydrograph, wio.storage, wio.solution, wio.diagnostics, wio.rv_config]
+    outputs = [wio.hydrograph, wio.storage, wio.solution, wio.diagnostics, wio.rv_config, wio.timings]
     model_cls = Raven
+    run_inputs = ()  # Inputs controlling how the model is launched, passed to `run` instead of the model config.
+    # Whether to run the model in a RAM-backed scratch directory, see `Raven.scratch`. Defaults to `config.wps_scratch`.
+    scratch = None
 
     def __init__(self):
 
@@ -38,13 +42,19 @@ class RavenProcess(Process):
         )
 
     def model(self, request):
-        return self.model_cls(workdir=self.workdir)
+        model = self.model_cls(workdir=self.workdir)
+        model.scratch = raven_config.wps_scratch if self.scratch is None else self.scratch
+        return model
 
     def _handler(self, request, response):
         response.update_status('PyWPS process {} started.'.format(self.identifier), 0)
 
         model = self.model(request)
 
+        # Report the overall progress of the simulations, as written by the executables in their progress files.
+        model.progress_callback = lambda percent: response.update_status(
+            'Running simulations: {}% completed.'.format(percent), int(5 + .9 * percent))
+
         # Model configuration
         if 'conf' in request.inputs:
             conf = request.inputs.pop('conf')
@@ -62,6 +72,8 @@ class RavenProcess(Process):
         for key, val in nc_spec.items():
             model.assign(key, val)
 
+        options = {name: request.inputs.pop(name)[0].data for name in self.run_inputs if name in request.inputs}
+
         # Parse all other input parameters
         kwds = defaultdict(list)
         for name, objs in request.inputs.items():
@@ -83,7 +95,7 @@ class RavenProcess(Process):
                     model.assign(name, data)
 
         # Launch model with input files
-        model(ts=ts, **kwds)
+        self.run(model, ts, kwds, **options)
 
         # Store output files name. If an output counts multiple files, they'll be zipped.
         for key in response.outputs.keys():
@@ -97,8 +109,15 @@ class RavenProcess(Process):
                         response.outputs[key].data_format = \
                             Format('application/zip', extension='.zip', encoding='base64')
 
+        if 'timings' in response.outputs:
+            response.outputs['timings'].data = json.dumps(model.timings)
+
         return response
 
+    def run(self, model, ts, kwds):
+        """Launch the model with the input files and parallel parameters."""
+        model(ts=ts, **kwds)
+
     @staticmethod
     def get_config(conf):
         """Return a dictionary storing the configuration files content."""
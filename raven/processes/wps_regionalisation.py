@@ -5,7 +5,7 @@ from pathlib import Path
 from pywps import ComplexInput, FORMATS
 from pywps import LiteralInput
 
-from raven.utilities import regionalize, read_gauged_properties, read_gauged_params
+from raven.utilities import regionalize, read_gauged_properties, read_gauged_params, gauged_mlr
 from . import wpsio as wio
 from .wps_raven import RavenProcess
 
@@ -151,10 +151,16 @@ class RegionalisationProcess(RavenProcess):
         ungauged_props = {key: properties[key] for key in properties}
         response.update_status('Gauged properties are read', 3)
 
+        # Reuse the regression fitted by previous requests for the same model, properties and NSE threshold.
+        mlr = None
+        if method == 'MLR' or 'RA' in method:
+            mlr = gauged_mlr(model_name, props.columns, min_NSE)
+
         qsim, ensemble = regionalize(method, model_name, nash, params,
                                      props, ungauged_props,
                                      size=ndonors,
                                      min_NSE=min_NSE,
+                                     mlr=mlr,
                                      ts=ts,
                                      **kwds)
         response.update_status('Computed regionalization', 99)
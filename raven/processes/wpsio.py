@@ -237,6 +237,13 @@ diagnostics = ComplexOutput('diagnostics', 'Performance diagnostic values',
                                                Format('application/zip', extension='.zip', encoding='base64')],
                             as_reference=True)
 
+timings = ComplexOutput('timings', 'Run timings',
+                        abstract="JSON dictionary of the wall time, CPU time and bytes written by each phase of the "
+                                 "model run (setup, writing configuration files, running the executable, parsing "
+                                 "and merging outputs) and by each run of the executable.",
+                        supported_formats=[FORMATS.JSON],
+                        as_reference=False)
+
 calibparams = LiteralOutput('calibparams', 'Calibrated prameters',
                             abstract='Comma separated list of parameters.',
                             data_type='string')
@@ -265,6 +272,14 @@ random_seed = LiteralInput('random_seed', 'Seed for random number generator',
                            default=-1,
                            min_occurs=0)
 
+starts = LiteralInput('starts', 'Number of independent calibration runs',
+                      abstract="Number of calibrations launched simultaneously with consecutive random seeds, starting "
+                               "at `random_seed` if it is set. The calibration with the best objective function is "
+                               "returned.",
+                      data_type='integer',
+                      default=1,
+                      min_occurs=0)
+
 calibration = ComplexOutput('calibration', 'Ostrich calibration output',
                             abstract="Output file from Ostrich calibration run.",
                             supported_formats=[FORMATS.TEXT],
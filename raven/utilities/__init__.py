@@ -1,2 +1,2 @@
-
-from .regionalization import regionalize, read_gauged_properties, read_gauged_params
+from .regionalization import regionalize, regionalize_batch, read_gauged_properties, read_gauged_params, DonorIndex, \
+    gauged_mlr
@@ -6,6 +6,7 @@ from typing import Sequence
 from typing import Tuple
 from typing import Union
 
+import numpy as np
 import pandas as pd
 from raven.utils import crs_sniffer, single_file_check
 from shapely.geometry import shape, Point
@@ -85,7 +86,113 @@ def feature_contains(
     return False
 
 
-def hydrobasins_upstream_ids(fid: str, df: pd.DataFrame) -> pd.Series:
+class UpstreamIndex:
+    """Index of the basins located upstream of each basin of a HydroBASINS network.
+
+    Basins are numbered in the order of a depth-first traversal of the network, going from each outlet to the basins
+    draining into it (listed by `NEXT_DOWN`). The basins upstream of any basin then form a contiguous run of this order,
+    starting at the basin itself, so that selecting them is a slice whatever the size of the network.
+
+    Parameters
+    ----------
+    ids : array_like
+      HYBAS_ID of each basin, in traversal order.
+    size : array_like
+      Number of basins in the run starting at each basin, that is the basin and its upstream contributors.
+    """
+
+    def __init__(self, ids, size):
+        self.ids = np.asarray(ids)
+        self.size = np.asarray(size)
+        self._pos = pd.Index(self.ids)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "UpstreamIndex":
+        """Build the index of a network.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+          Watershed attributes, including the `HYBAS_ID` and `NEXT_DOWN` of each basin. Basins whose `NEXT_DOWN` is not
+          in the table, such as the outlets of the network, are the roots of the traversal.
+
+        Returns
+        -------
+        UpstreamIndex
+        """
+        ids = df["HYBAS_ID"].to_numpy()
+        n = len(ids)
+
+        # Position of the downstream basin of each basin, or n for the roots.
+        down = pd.Index(ids).get_indexer(df["NEXT_DOWN"].to_numpy())
+        down[down < 0] = n
+
+        # Basins draining into each basin, as consecutive runs of `children`, the roots draining into n.
+        children = np.argsort(down, kind="stable")
+        start = np.searchsorted(down[children], np.arange(n + 2))
+
+        # Depth-first traversal, recording the order in which basins are visited and when their contributors are done.
+        # Entries ~k of the stack mark the end of the contributors of the basin visited k-th.
+        children, start = children.tolist(), start.tolist()
+        order = []
+        size = [0] * n
+        stack = children[start[n]:start[n + 1]]
+        while stack:
+            i = stack.pop()
+            if i < 0:
+                size[~i] = len(order) + i + 1
+                continue
+            stack.append(~len(order))
+            order.append(i)
+            stack.extend(children[start[i]:start[i + 1]])
+
+        if len(order) < n:
+            raise ValueError("The network has loops: {} basins do not drain into an outlet.".format(n - len(order)))
+
+        return cls(ids[order], np.array(size))
+
+    @classmethod
+    def load(cls, fn: Union[str, Path]) -> "UpstreamIndex":
+        """Load an index saved by `save`."""
+        with np.load(str(fn), allow_pickle=False) as data:
+            return cls(data["ids"], data["size"])
+
+    def save(self, fn: Union[str, Path]) -> None:
+        """Save the index to a NumPy `.npz` file."""
+        np.savez(str(fn), ids=self.ids, size=self.size)
+
+    def upstream(self, fid) -> np.ndarray:
+        """Return the HYBAS_ID of basin `fid` and of the basins located upstream of it."""
+        i = self._pos.get_loc(fid)
+        return self.ids[i:i + self.size[i]]
+
+
+def hydrobasins_upstream_index(df: pd.DataFrame, fn: Union[str, Path] = None) -> UpstreamIndex:
+    """Return the upstream index of a HydroBASINS network, loaded from file `fn` if it exists.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+      Watershed attributes, including `HYBAS_ID` and `NEXT_DOWN`.
+    fn : Union[str, Path]
+      Path to the `.npz` file storing the index of `df`. If it does not exist, the index is built and saved there. The
+      file should be named after the HydroBASINS release and domain the network is read from, since it is not rebuilt
+      when `df` changes.
+
+    Returns
+    -------
+    UpstreamIndex
+    """
+    if fn is not None and Path(fn).exists():
+        return UpstreamIndex.load(fn)
+
+    index = UpstreamIndex.from_frame(df)
+    if fn is not None:
+        index.save(fn)
+    return index
+
+
+def hydrobasins_upstream_ids(fid: str, df: pd.DataFrame, index: UpstreamIndex = None) -> pd.Series:
     """Return a list of hydrobasins features located upstream.
 
     Parameters
@@ -94,30 +201,23 @@ def hydrobasins_upstream_ids(fid: str, df: pd.DataFrame) -> pd.Series:
       HYBAS_ID of the downstream feature.
     df : pd.DataFrame
       Watershed attributes.
+    index : UpstreamIndex
+      Upstream index of the network, see `hydrobasins_upstream_index`. If None, it is built from `df`.
 
     Returns
     -------
     pd.Series
       Basins ids including `fid` and its upstream contributors.
     """
+    if index is None:
+        # Locate the downstream feature
+        ds = df.set_index("HYBAS_ID").loc[fid]
 
-    def upstream_ids(bdf, bid):
-        return bdf[bdf["NEXT_DOWN"] == bid]["HYBAS_ID"]
-
-    # Locate the downstream feature
-    ds = df.set_index("HYBAS_ID").loc[fid]
-
-    # Do a first selection on the main basin ID of the downstream feature.
-    sub = df[df["MAIN_BAS"] == ds["MAIN_BAS"]]
-
-    # Find upstream basins
-    up = [fid]
-    for b in up:
-        tmp = upstream_ids(sub, b)
-        if len(tmp):
-            up.extend(tmp)
+        # Do a first selection on the main basin ID of the downstream feature.
+        df = df[df["MAIN_BAS"] == ds["MAIN_BAS"]]
+        index = UpstreamIndex.from_frame(df)
 
-    return sub[sub["HYBAS_ID"].isin(up)]
+    return df[df["HYBAS_ID"].isin(index.upstream(fid))]
 
 
 def hydrobasins_aggregate(gdf: pd.DataFrame = None) -> pd.Series:
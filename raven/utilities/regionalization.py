@@ -2,11 +2,17 @@
 Tools for hydrological regionalization
 """
 
+import hashlib
+import os
+import tempfile
+from functools import lru_cache
 from pathlib import Path
+from typing import NamedTuple
 import numpy as np
 import pandas as pd
-import statsmodels.api as sm
 import xarray as xr
+from scipy.spatial import cKDTree
+from raven import config
 from raven.models import get_model
 from . import coords
 import logging
@@ -18,7 +24,7 @@ DATA_DIR = Path(__file__).parent.parent.parent / 'tests' / 'testdata' / 'regiona
 
 
 def regionalize(method, model, nash, params=None, props=None, target_props=None, size=5,
-                min_NSE=0.6, **kwds):
+                min_NSE=0.6, index=None, mlr=None, **kwds):
     """Perform regionalization for catchment whose outlet is defined by coordinates.
 
     Parameters
@@ -39,6 +45,12 @@ def regionalize(method, model, nash, params=None, props=None, target_props=None,
       Number of catchments to use in the regionalization.
     min_NSE : float
       Minimum calibration NSE value required to be considered as a donor.
+    index : DonorIndex
+      Donor index over `props` and `nash`, reused across calls to avoid building its trees for each target. If None,
+      an index is created for this call.
+    mlr : MLRFit
+      Regression of the model parameters over `props`, e.g. from `gauged_mlr`, reused across calls to avoid fitting it
+      for each target. Used by MLR and RA methods. If None, the regression is fitted for this call.
     kwds : {}
       Model configuration parameters, including the forcing files (ts).
 
@@ -81,32 +93,34 @@ def regionalize(method, model, nash, params=None, props=None, target_props=None,
                          basins. Please reduce the number of donor basins OR \
                          reduce the minimum NSE threshold.")
 
-    # Rank the matrix according to the similarity or distance.
-    if method in ['PS', 'PS_IDW', 'PS_IDW_RA']:  # Physical similarity
-        dist = similarity(filtered_prop, ungauged_properties)
-    else:  # Geographical distance.
-        dist = distance(filtered_prop, ungauged_properties)
-
-    # Series of distances for the first `size` best donors
-    sdist = dist.sort_values().iloc[:size]
+    # Series of distances for the first `size` best donors, according to the similarity or distance.
+    if index is None:
+        index = DonorIndex(props, nash)
+    ranking = 'similarity' if method in ['PS', 'PS_IDW', 'PS_IDW_RA'] else 'distance'
+    sdist = index.nearest(ungauged_properties, size, method=ranking, model=model, min_NSE=min_NSE)
 
     # Pick the donors' model parameters and catchment properties
     sparams = filtered_params.loc[sdist.index]
     sprop = filtered_prop.loc[sdist.index]
 
     # Get the list of parameters to run
-    reg_params = regionalization_params(method, sparams, sprop, ungauged_properties, filtered_params, filtered_prop)
+    if mlr is not None:
+        mlr = list(mlr.predict(ungauged_properties)[0]), mlr.r2
+    reg_params = regionalization_params(method, sparams, sprop, ungauged_properties, filtered_params, filtered_prop,
+                                        mlr=mlr)
 
-    # Run the model over all parameters and create ensemble DataArray
+    # Run the model over all parameters at once, as a parallel ensemble along the `params` dimension.
     m = get_model(model)()
-    qsims = []
-
-    for params in reg_params:
-        kwds['params'] = params
-        m(overwrite=True, **kwds)
-        qsims.append(m.q_sim.copy(deep=True))
+    kwds['params'] = np.atleast_2d(reg_params)
+    m(overwrite=True, **kwds)
 
-    qsims = xr.concat(qsims, dim=cr)
+    # Create ensemble DataArray
+    qsims = m.snapshot().q_sim
+    if 'params' in qsims.dims:
+        qsims = qsims.rename(params='realization')
+    else:
+        qsims = qsims.expand_dims('realization')
+    qsims = qsims.assign_coords(realization=cr)
 
     # 3. Aggregate runs into a single result -> dataset
     if method in ['MLR', 'SP', 'PS']:  # Average (one realization for MLR, so no effect).
@@ -138,6 +152,222 @@ def regionalize(method, model, nash, params=None, props=None, target_props=None,
     return qsim, ens
 
 
+def regionalize_batch(method, model, nash, params=None, props=None, targets=None, size=5, min_NSE=0.6, index=None,
+                      mlr=None, **kwds):
+    """Perform regionalization for multiple ungauged catchments at once.
+
+    Donors are selected for each target with a shared `DonorIndex`, and the multiple linear regression is fitted once
+    for all targets. The simulations of all targets and donors are then run as a single parallel ensemble.
+
+    Parameters
+    ----------
+    method : {'MLR', 'SP', 'PS', 'SP_IDW', 'PS_IDW', 'SP_IDW_RA', 'PS_IDW_RA'}
+      Name of the regionalization method to use.
+    model : {'HMETS', 'GR4JCN', 'MOHYSE'}
+      Model name.
+    nash : pd.Series
+      NSE values for the parameters of gauged catchments.
+    params : pd.DataFrame
+      Model parameters of gauged catchments.
+    props : pd.DataFrame
+      Properties of gauged catchments to be analyzed for the regionalization.
+    targets : pd.DataFrame
+      Properties of the ungauged catchments, one row per catchment, keyed by catchment ID.
+    size : int
+      Number of catchments to use in the regionalization of each target.
+    min_NSE : float
+      Minimum calibration NSE value required to be considered as a donor.
+    index : DonorIndex
+      Donor index over `props` and `nash`. If None, an index is created for this call.
+    mlr : MLRFit
+      Regression of the model parameters over `props`, e.g. from `gauged_mlr`. If None, it is fitted for this call.
+    kwds : {}
+      Model configuration parameters, including the forcing files (ts). Parallel parameters given as sequences with one
+      value per target, such as `nc_index`, `name`, `area`, `elevation`, `latitude` and `longitude`, are used for all
+      the donor simulations of their target. This way, targets can share a forcing file indexed by `nc_index`.
+
+    Returns
+    -------
+    (qsim, ensemble)
+    qsim : DataArray (target, time)
+      Multi-donor averaged predicted streamflow for each target.
+    ensemble : Dataset
+      q_sim : DataArray  (target, realization, time)
+        Ensemble of members based on number of donors.
+      parameter : DataArray (target, realization, param)
+        Parameters used to run the model.
+      donor : DataArray (target, realization)
+        ID of the donor catchment of each member. Undefined for MLR.
+      distance : DataArray (target, realization)
+        Distance or similarity between each target and its donors. Undefined for MLR.
+    """
+    ntargets = len(targets)
+    nreal = 1 if method == 'MLR' else size
+    cr = coords.realization(nreal)
+    cp = coords.param(model)
+    ct = xr.IndexVariable('target', data=targets.index.values, attrs={'long_name': 'Ungauged catchment ID'})
+
+    # Filter on NSE
+    valid = nash > min_NSE
+    filtered_params = params.where(valid).dropna()
+    filtered_prop = props.where(valid).dropna()
+
+    # Check to see if we have enough data, otherwise raise error
+    if len(filtered_prop) < size and method != 'MLR':
+        raise ValueError("Hydrological_model and minimum NSE threshold combination is too strict for the number of "
+                         "donor basins. Please reduce the number of donor basins OR reduce the minimum NSE threshold.")
+
+    # Fit the regression once, and estimate the parameters of all targets.
+    mlr_params, r2 = None, None
+    if method == 'MLR' or 'RA' in method:
+        if mlr is None:
+            mlr = fit_mlr(filtered_prop, filtered_params)
+        mlr_params, r2 = mlr.predict(targets), mlr.r2
+
+    # Select the donors and the parameters to run for each target.
+    if index is None:
+        index = DonorIndex(props, nash)
+    ranking = 'similarity' if method in ['PS', 'PS_IDW', 'PS_IDW_RA'] else 'distance'
+
+    reg_params, donors, dists = [], [], []
+    for i, (_, target) in enumerate(targets.iterrows()):
+        sdist = index.nearest(target, size, method=ranking, model=model, min_NSE=min_NSE)
+        mlr = None if mlr_params is None else (list(mlr_params[i]), r2)
+        reg_params.append(regionalization_params(method, filtered_params.loc[sdist.index],
+                                                 filtered_prop.loc[sdist.index], target, filtered_params,
+                                                 filtered_prop, mlr=mlr))
+        donors.append(sdist.index.values[:nreal])
+        dists.append(sdist.values[:nreal])
+
+    # Use the per-target parallel parameters for each of the target's donors.
+    m = get_model(model)()
+    for key in m._parallel_parameters:
+        val = kwds.get(key)
+        if key != 'params' and isinstance(val, (list, tuple, np.ndarray, pd.Series)) and len(val) == ntargets:
+            kwds[key] = np.repeat(np.asarray(val), nreal, axis=0)
+
+    # Run the model over all targets and donors at once, as a single parallel ensemble.
+    kwds['params'] = np.concatenate([np.atleast_2d(p) for p in reg_params])
+    m(overwrite=True, **kwds)
+
+    # Members are stored along the parallel dimension, `params` or `nbasins` if `nc_index` varies.
+    q = m.snapshot().q_sim
+    pdim = m._pdim if m._pdim in q.dims else 'member'
+    q = q.expand_dims(pdim) if pdim not in q.dims else q
+    q = q.transpose(pdim, 'time', ...)
+    qsims = xr.DataArray(q.values.reshape(ntargets, nreal, q.sizes['time']),
+                         dims=('target', 'realization', 'time'),
+                         coords={'target': ct, 'realization': cr, 'time': q.time},
+                         name=q.name, attrs=q.attrs)
+
+    dist_da = xr.DataArray(np.array(dists), dims=('target', 'realization'), coords={'target': ct, 'realization': cr},
+                           attrs={'long_name': 'Distance or similarity between the target and donor catchments'})
+
+    # Aggregate runs into a single result for each target
+    if method in ['MLR', 'SP', 'PS']:  # Average (one realization for MLR, so no effect).
+        qsim = qsims.mean(dim='realization', keep_attrs=True)
+    elif 'IDW' in method:
+        qsim = IDW(qsims, dist_da)
+    else:
+        raise ValueError('No matching algorithm for {}'.format(method))
+
+    param_da = xr.DataArray(np.array(reg_params, dtype=float).reshape(ntargets, nreal, len(cp)),
+                            dims=('target', 'realization', 'param'),
+                            coords={'target': ct, 'param': cp, 'realization': cr},
+                            attrs={'long_name': 'Model parameters used in the regionalization.'})
+
+    donor_da = xr.DataArray(np.array(donors), dims=('target', 'realization'),
+                            coords={'target': ct, 'realization': cr},
+                            attrs={'long_name': 'Donor catchment ID'})
+
+    data_vars = {'q_sim': qsims, 'parameter': param_da}
+    if method != 'MLR':
+        data_vars.update(donor=donor_da, distance=dist_da)
+
+    ens = xr.Dataset(data_vars=data_vars,
+                     attrs={"title": "Regionalization ensemble",
+                            "institution": "",
+                            "source": "RAVEN V.{} - {}".format(m.version, model),
+                            "history": "Created by raven regionalize_batch.",
+                            "references": "",
+                            "comment": "Regionalization method: {}".format(method)
+                            })
+
+    return qsim, ens
+
+
+def read_table(fn):
+    """Return a table of gauged catchments keyed by catchment ID, reading the file only if it changed.
+
+    Tables are cached in memory by path, modification time and size, so that successive requests share the tables
+    already read. If `config.table_cache_dir` is set, tables are also stored there as NumPy arrays, one per column,
+    from which other worker processes load them instead of parsing the CSV file again. A file that is modified is read
+    anew.
+
+    The returned DataFrame is shared by all callers and must not be modified.
+
+    Parameters
+    ----------
+    fn : str, Path
+      Path to the CSV file.
+    """
+    fn = Path(fn).resolve()
+    st = fn.stat()
+    return _read_table(str(fn), st.st_mtime_ns, st.st_size)
+
+
+@lru_cache(maxsize=32)
+def _read_table(path, mtime, size):
+    """Read a table from its binary copy or from the CSV file. The modification time and size are only cache keys."""
+    binary = None
+    if config.table_cache_dir:
+        key = hashlib.sha256("{}:{}:{}".format(path, mtime, size).encode()).hexdigest()[:16]
+        binary = Path(config.table_cache_dir) / "{}-{}.npz".format(Path(path).stem, key)
+        try:
+            return _load_table(binary)
+        except (OSError, KeyError, ValueError):
+            pass
+
+    table = pd.read_csv(path, index_col='ID')
+
+    if binary is not None:
+        try:
+            _save_table(table, binary)
+        except OSError as exc:
+            LOGGER.warning("Could not store table {} in {}: {}".format(path, binary, exc))
+
+    return table
+
+
+def _save_table(table, fn):
+    """Store a table in a `.npz` file, written atomically so that concurrent readers never see a partial file."""
+    arrays = {"c{}".format(i): np.asarray(table[c]) for i, c in enumerate(table.columns)}
+    arrays['index'] = np.asarray(table.index)
+
+    for key, values in arrays.items():
+        if values.dtype.kind == 'O':
+            if pd.isna(values).any():
+                # Missing values would not survive the conversion of text columns to fixed-width strings.
+                return
+            arrays[key] = values.astype(str)
+
+    fn.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=str(fn.parent), suffix='.npz', delete=False) as f:
+        np.savez(f, index_name=np.array(str(table.index.name)), columns=np.array(table.columns, dtype=str), **arrays)
+    os.replace(f.name, str(fn))
+
+
+def _load_table(fn):
+    with np.load(str(fn), allow_pickle=False) as data:
+        index = pd.Index(data['index'], name=str(data['index_name']))
+        return pd.DataFrame({c: data["c{}".format(i)] for i, c in enumerate(data['columns'])}, index=index)
+
+
+def clear_tables():
+    """Empty the in-memory cache of gauged catchment tables."""
+    _read_table.cache_clear()
+
+
 def read_gauged_properties(properties):
     """Return table of gauged catchments properties over North America.
 
@@ -146,10 +376,9 @@ def read_gauged_properties(properties):
     pd.DataFrame
       Catchment properties keyed by catchment ID.
     """
-    proptable = pd.read_csv(DATA_DIR / 'gauged_catchment_properties.csv',
-                            index_col='ID')
+    proptable = read_table(DATA_DIR / 'gauged_catchment_properties.csv')
 
-    return proptable[properties]
+    return proptable[list(properties)]
 
 
 def read_gauged_params(model):
@@ -163,10 +392,9 @@ def read_gauged_params(model):
       Model parameters keyed by catchment ID.
     """
 
-    params = pd.read_csv(DATA_DIR / '{}_parameters.csv'.format(model),
-                         index_col='ID')
+    params = read_table(DATA_DIR / '{}_parameters.csv'.format(model))
 
-    return params['NASH'], params.iloc[:, 1:]
+    return params['NASH'].copy(), params.iloc[:, 1:].copy()
 
 
 def haversine(lon1, lat1, lon2, lat2):
@@ -215,36 +443,149 @@ def distance(gauged, ungauged):
     return pd.Series(data=haversine(lons.values, lats.values, lon, lat), index=gauged.index)
 
 
-def similarity(gauged, ungauged, kind='ptp'):
-    """Return similarity measure between gauged and ungauged catchments.
+def spread(gauged, kind='ptp'):
+    """Return the spread of each catchment property, used to normalize property differences.
 
     Parameters
     ----------
     gauged : DataFrame
       Gauged catchment properties.
-    ungauged : DataFrame
-      Ungauged catchment properties
     kind : {'ptp', 'std', 'iqr'}
       Normalization method: peak to peak (maximum - minimum), standard deviation, interquartile range.
 
     """
-
     stats = gauged.describe()
 
     if kind == 'ptp':
-        spread = stats.loc['max'] - stats.loc['min']
+        return stats.loc['max'] - stats.loc['min']
     elif kind == 'std':
-        spread = stats.loc['std']
+        return stats.loc['std']
     elif kind == 'iqr':
-        spread = stats.loc['75%'] - stats.loc['25%']
+        return stats.loc['75%'] - stats.loc['25%']
+
+    raise ValueError("Unknown normalization method: {}".format(kind))
+
+
+def similarity(gauged, ungauged, kind='ptp'):
+    """Return similarity measure between gauged and ungauged catchments.
+
+    Parameters
+    ----------
+    gauged : DataFrame
+      Gauged catchment properties.
+    ungauged : DataFrame
+      Ungauged catchment properties
+    kind : {'ptp', 'std', 'iqr'}
+      Normalization method: peak to peak (maximum - minimum), standard deviation, interquartile range.
 
+    """
     d = ungauged.values - gauged.values
-    n = np.abs(d) / spread.values
+    n = np.abs(d) / spread(gauged, kind).values
     return pd.Series(data=n.sum(axis=1), index=gauged.index)
 
 
+def _unit_vectors(lon, lat):
+    """Return the cartesian coordinates of points on the unit sphere."""
+    lon, lat = np.radians(lon), np.radians(lat)
+    return np.stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)], axis=-1)
+
+
+class DonorIndex:
+    """Nearest donor search over gauged catchments.
+
+    Donors are ranked either by the great circle distance between catchment centroids, using a k-d tree over the
+    centroids on the unit sphere, or by physical similarity, using a k-d tree over properties normalized by their
+    spread with the Manhattan metric. Distances are identical to those returned by `distance` and `similarity`.
+
+    Trees are built on first use for each ranking, model and minimum NSE, over the catchments whose calibration NSE
+    exceeds the threshold, and reused by subsequent queries.
+
+    Parameters
+    ----------
+    props : pd.DataFrame
+      Properties of gauged catchments, keyed by catchment ID. Needs `longitude` and `latitude` columns for the
+      geographic distance.
+    nash : pd.Series or pd.DataFrame
+      NSE values for the parameters of gauged catchments, or a table with one column of NSE values per model.
+    kind : {'ptp', 'std', 'iqr'}
+      Normalization method of properties for the physical similarity, see `spread`.
+
+    Example
+    -------
+    >>> nash, params = read_gauged_params('GR4JCN')
+    >>> index = DonorIndex(read_gauged_properties(['latitude', 'longitude', 'area']), nash)
+    >>> index.nearest({'latitude': 54.5, 'longitude': -123.4, 'area': 4250.6}, 5, min_NSE=0.6)
+    """
+
+    def __init__(self, props, nash=None, kind='ptp'):
+        self.props = props
+        self.nash = nash
+        self.kind = kind
+        self._trees = {}
+
+    def donors(self, model=None, min_NSE=None):
+        """Return the properties of the catchments whose calibration NSE for `model` exceeds `min_NSE`."""
+        props = self.props.dropna()
+        if min_NSE is None or self.nash is None:
+            return props
+
+        nash = self.nash[model] if isinstance(self.nash, pd.DataFrame) else self.nash
+        return props[nash.reindex(props.index) > min_NSE]
+
+    def _tree(self, method, model, min_NSE):
+        key = (method, model, min_NSE)
+        if key not in self._trees:
+            donors = self.donors(model, min_NSE)
+            if method == 'distance':
+                scale = None
+                points = _unit_vectors(donors.longitude.values, donors.latitude.values)
+            elif method == 'similarity':
+                scale = spread(donors, self.kind).values
+                points = donors.values / scale
+            else:
+                raise ValueError("Unknown ranking method: {}".format(method))
+
+            self._trees[key] = (cKDTree(points), donors.index, scale)
+
+        return self._trees[key]
+
+    def nearest(self, target, size, method='distance', model=None, min_NSE=None):
+        """Return the `size` donors closest to the target catchment.
+
+        Parameters
+        ----------
+        target : pd.Series or dict
+          Properties of the ungauged catchment.
+        size : int
+          Number of donors.
+        method : {'distance', 'similarity'}
+          Ranking of donors, by geographic distance [km] or by physical similarity.
+        model : str
+          Model name, selecting the NSE column if `nash` holds one column per model.
+        min_NSE : float
+          Minimum calibration NSE value required to be considered as a donor.
+
+        Returns
+        -------
+        pd.Series
+          Distance from the target to each donor, in increasing order, keyed by catchment ID.
+        """
+        target = pd.Series(target)
+        tree, index, scale = self._tree(method, model, min_NSE)
+        k = min(size, tree.n)
+
+        if method == 'distance':
+            d, i = tree.query(_unit_vectors(target.longitude, target.latitude), k=k)
+            # Chord length on the unit sphere to great circle distance, as in `haversine`.
+            d = 6367 * 2 * np.arcsin(np.minimum(np.atleast_1d(d) / 2, 1))
+        else:
+            d, i = tree.query(target[self.props.columns].values.astype(float) / scale, k=k, p=1)
+
+        return pd.Series(data=np.atleast_1d(d), index=index[np.atleast_1d(i)])
+
+
 def regionalization_params(method, gauged_params, gauged_properties, ungauged_properties,
-                           filtered_params, filtered_prop):
+                           filtered_params, filtered_prop, mlr=None):
     """Return the model parameters to use for the regionalization.
 
     Parameters
@@ -261,6 +602,9 @@ def regionalization_params(method, gauged_params, gauged_properties, ungauged_pr
       DataFrame of parameters of all filtered catchments (size = all catchments with NSE > min_NSE)
     filtered_prop
       DataFrame of properties of all filtered catchments (size = all catchments with NSE > min_NSE)
+    mlr
+      Parameters estimated by the multiple linear regression for the ungauged catchment and R2 of the regression, as
+      returned by `multiple_linear_regression`. Computed if None.
 
     Returns
     -------
@@ -269,7 +613,9 @@ def regionalization_params(method, gauged_params, gauged_properties, ungauged_pr
     """
 
     if method == 'MLR' or 'RA' in method:
-        mlr_params, r2 = multiple_linear_regression(filtered_prop, filtered_params, ungauged_properties.to_frame().T)
+        if mlr is None:
+            mlr = multiple_linear_regression(filtered_prop, filtered_params, ungauged_properties.to_frame().T)
+        mlr_params, r2 = mlr
 
         if method == 'MLR':  # Return the multiple linear regression parameters.
             out = [mlr_params, ]
@@ -299,8 +645,9 @@ def IDW(qsims, dist):
     ----------
     qsims : DataArray
       Ensemble of hydrogram stacked along the `realization` dimension.
-    dist : pd.Series
-      Distance from catchment which generated each hydrogram to target catchment.
+    dist : pd.Series or DataArray
+      Distance from catchment which generated each hydrogram to target catchment. A DataArray with a `realization`
+      dimension holds the distances to several target catchments.
 
     Returns
     -------
@@ -309,18 +656,113 @@ def IDW(qsims, dist):
     """
 
     # In IDW, weights are 1 / distance
-    weights = xr.DataArray(1.0 / dist, dims='realization', coords={'realization': qsims.realization})
+    if isinstance(dist, xr.DataArray):
+        weights = 1.0 / dist
+    else:
+        weights = xr.DataArray(1.0 / dist, dims='realization', coords={'realization': qsims.realization})
 
     # Make weights sum to one
-    weights /= weights.sum(axis=0)
+    weights = weights / weights.sum(dim='realization')
 
     # Calculate weighted average.
-    out = qsims.dot(weights)
+    out = qsims.dot(weights, dims='realization')
     out.name = qsims.name
     out.attrs = qsims.attrs
     return out
 
 
+class MLRFit(NamedTuple):
+    """Multiple linear regression of model parameters over catchment properties."""
+    coef: np.ndarray  # Intercept followed by the coefficient of each property (1 + property, param).
+    r2: np.ndarray  # Adjusted R2 of the regression of each parameter.
+    properties: tuple  # Names of the properties, in the order of `coef`.
+    params: tuple  # Names of the parameters.
+
+    def predict(self, target):
+        """Return the parameters estimated for catchments with properties `target`.
+
+        Parameters
+        ----------
+        target : pd.DataFrame, pd.Series or dict
+          Properties of one ungauged catchment, or of several ungauged catchments, one per row.
+
+        Returns
+        -------
+        ndarray
+          Estimated parameters (catchment, param).
+        """
+        if not isinstance(target, pd.DataFrame):
+            target = pd.DataFrame([target])
+        x = np.asarray(target[list(self.properties)], dtype=float)
+        return self.coef[0] + x @ self.coef[1:]
+
+
+def fit_mlr(source, params):
+    """Fit the multiple linear regression of each model parameter over catchment properties.
+
+    All parameters are fitted at once by a single least squares solve.
+
+    Parameters
+    ----------
+    source : DataFrame
+      Properties of gauged catchments.
+    params : DataFrame
+      Model parameters of gauged catchments.
+
+    Returns
+    -------
+    MLRFit
+      Coefficients and adjusted R2 of the regression of each parameter.
+    """
+    x = np.column_stack([np.ones(len(source)), np.asarray(source, dtype=float)])
+    y = np.asarray(params, dtype=float)
+    coef, _, rank, _ = np.linalg.lstsq(x, y, rcond=None)
+
+    # Adjusted R2, with the degrees of freedom of the residuals given by the rank of the predictors.
+    n = len(y)
+    ssr = ((y - x @ coef) ** 2).sum(axis=0)
+    tss = ((y - y.mean(axis=0)) ** 2).sum(axis=0)
+    r2 = 1 - (n - 1) / (n - rank) * ssr / tss
+
+    return MLRFit(coef, r2, tuple(source.columns), tuple(params.columns))
+
+
+def gauged_mlr(model, properties, min_NSE=0.6):
+    """Return the regression of the parameters of `model` over `properties` of the gauged catchments.
+
+    The regression is fitted on the catchments whose calibration NSE exceeds `min_NSE`. Fits are cached for each model,
+    properties and minimum NSE, until the gauged catchment tables change.
+
+    Parameters
+    ----------
+    model : {'HMETS', 'GR4JCN', 'MOHYSE'}
+      Model name.
+    properties : sequence
+      Names of the catchment properties used as predictors.
+    min_NSE : float
+      Minimum calibration NSE value required to be considered in the regression.
+
+    Returns
+    -------
+    MLRFit
+      Coefficients and adjusted R2 of the regression of each parameter.
+    """
+    fns = ('gauged_catchment_properties.csv', '{}_parameters.csv'.format(model))
+    stats = [os.stat(str(DATA_DIR / fn)) for fn in fns]
+    key = tuple((st.st_mtime_ns, st.st_size) for st in stats)
+    return _gauged_mlr(model, tuple(properties), float(min_NSE), key)
+
+
+@lru_cache(maxsize=128)
+def _gauged_mlr(model, properties, min_NSE, key):
+    """Fit the regression on the gauged catchments. `key` identifies the version of the tables."""
+    nash, params = read_gauged_params(model)
+    props = read_gauged_properties(properties)
+
+    valid = nash > min_NSE
+    return fit_mlr(props.where(valid).dropna(), params.where(valid).dropna())
+
+
 def multiple_linear_regression(source, params, target):
     """
     Multiple Linear Regression for model parameters over catchment properties.
@@ -335,27 +777,19 @@ def multiple_linear_regression(source, params, target):
     params : DataFrame
       Model parameters of gauged catchments.
     target : DataFrame
-      Properties of the ungauged catchment.
+      Properties of the ungauged catchment, or of several ungauged catchments, one per row.
 
 
     Returns
     -------
     (mrl_params, r2)
-      A named tuple of the estimated model parameters and the R2 of the linear regression.
+      A named tuple of the estimated model parameters and the R2 of the linear regression. If `target` has more than
+      one row, the estimated parameters are an array (catchment, param).
     """
-    # Add constants to the gauged predictors
-    x = sm.add_constant(source)
-
-    # Add the constant 1 for the ungauged catchment predictors
-    predictors = sm.add_constant(target, prepend=True, has_constant='add')
-
-    # Perform regression for each parameter
-    regression = [sm.OLS(params[param].values, x).fit() for param in params]
+    fit = fit_mlr(source, params)
 
     # Perform prediction on each parameter based on the predictors
-    mlr_parameters = [r.predict(exog=predictors)[0] for r in regression]
-
-    # Extract the adjusted r_squared value for each parameter
-    r2 = [r.rsquared_adj for r in regression]
+    mlr_parameters = fit.predict(target)
+    mlr_parameters = list(mlr_parameters[0]) if len(target) == 1 else mlr_parameters
 
-    return mlr_parameters, r2
+    return mlr_parameters, fit.r2
@@ -0,0 +1,55 @@
+import os
+
+from raven.models.cache import ResultCache
+
+
+def make_outputs(path, content, size=10):
+    path.mkdir(parents=True, exist_ok=True)
+    (path / "run_Hydrographs.nc").write_text(content * size)
+    (path / "run_solution.rvc").write_text(content)
+    return path
+
+
+class TestResultCache:
+    def test_key(self, tmp_path):
+        ts = tmp_path / "ts.nc"
+        ts.write_text("forcing")
+
+        k1 = ResultCache.key(["a", "b"], [ts], "3.0")
+        assert k1 == ResultCache.key(["a", "b"], [ts], "3.0")
+        assert k1 != ResultCache.key(["a", "c"], [ts], "3.0")
+        assert k1 != ResultCache.key(["a", "b"], [ts], "3.1")
+
+        ts.write_text("modified forcing")
+        assert k1 != ResultCache.key(["a", "b"], [ts], "3.0")
+
+    def test_get_put(self, tmp_path):
+        cache = ResultCache(tmp_path / "cache")
+        src = make_outputs(tmp_path / "src", "x")
+        dest = tmp_path / "dest"
+
+        assert not cache.get("abcd", dest)
+        cache.put("abcd", src)
+        assert "abcd" in cache
+        assert cache.get("abcd", dest)
+        assert (dest / "run_Hydrographs.nc").read_text() == "x" * 10
+        assert cache.stats == {"hits": 1, "misses": 1, "evictions": 0}
+
+    def test_evict(self, tmp_path):
+        cache = ResultCache(tmp_path / "cache", max_size=25)
+        for i, key in enumerate(["aa01", "bb02"]):
+            cache.put(key, make_outputs(tmp_path / key, "x"))
+            os.utime(str(cache._entry(key)), (i, i))
+
+        # Access the oldest entry so that it becomes the most recently used.
+        assert cache.get("aa01", tmp_path / "dest")
+
+        cache.put("cc03", make_outputs(tmp_path / "cc03", "x"))
+        assert "aa01" in cache
+        assert "bb02" not in cache
+        assert "cc03" in cache
+        assert cache.evictions == 1
+        assert cache.size <= 25
+
+        cache.clear()
+        assert cache.size == 0
@@ -0,0 +1,110 @@
+import datetime as dt
+
+import numpy as np
+import pytest
+
+from raven.models import GR4JCN, GR4JCN_OST
+from raven.models.calibration import parse_ostin, tied_values, dds, sceua, TiedParam
+from .common import TESTDATA
+
+
+def sphere(x):
+    return ((np.atleast_2d(x) - 0.3) ** 2).sum(axis=1)
+
+
+def test_parse_ostin():
+    cfg = parse_ostin(TESTDATA['ostrich-gr4j-cemaneige'] / 'ostIn.txt')
+    assert cfg.algorithm == 'DDS'
+    assert cfg.names == ('par_x1', 'par_x2', 'par_x3', 'par_x4', 'par_x5', 'par_x6')
+    assert cfg.low == (0.01, -15, 10, 0, 1, 0)
+    assert cfg.high == (2.5, 10, 700, 7, 30, 1)
+    assert cfg.file_pairs[0] == ('raven-gr4j-salmon.rvp.tpl', 'raven-gr4j-salmon.rvp')
+    assert cfg.responses[0].column == 3
+    assert cfg.cost == 'NegNS'
+    assert cfg.max_iterations == 10
+    assert cfg.random_seed == 0
+
+
+def test_tied_values():
+    tied = (TiedParam('par_half_x1', ('par_x1',), 'linear', (500., 0.)),
+            TiedParam('par_sum', ('par_x1', 'par_x2'), 'linear', (0., 1., 1., 0.)),
+            TiedParam('par_rezi_x2', ('par_x2', 'par_x2'), 'ratio', (0., 1., 1., 0.)))
+    out = tied_values(tied, {'par_x1': 0.5, 'par_x2': 4.})
+    assert out['par_half_x1'] == 250
+    assert out['par_sum'] == 4.5
+    assert out['par_rezi_x2'] == 0.25
+
+
+@pytest.mark.parametrize("algorithm", [dds, sceua])
+def test_algorithms(algorithm):
+    calls = []
+
+    def evaluate(x):
+        calls.append(len(x))
+        return sphere(x)
+
+    rng = np.random.RandomState(0)
+    x, f = algorithm(evaluate, [-1] * 3, [1] * 3, 1000, random_state=rng)
+    assert f < 1e-2
+    np.testing.assert_allclose(x, 0.3, atol=0.1)
+    assert sum(calls) <= 1000 + 6
+
+
+def test_dds_batch():
+    calls = []
+
+    def evaluate(x):
+        calls.append(len(x))
+        return sphere(x)
+
+    x, f = dds(evaluate, [-1] * 3, [1] * 3, 100, batch_size=4, random_state=np.random.RandomState(0))
+    assert sum(calls) == 100
+    assert max(calls) == 5  # Initial solutions
+    assert calls[1:].count(4) == 23
+
+
+class TestGR4JCN_OST:
+    def test_calibrate(self):
+        ts = TESTDATA["ostrich-gr4j-cemaneige-nc-ts"]
+        model = GR4JCN_OST()
+        model.max_processes = 2
+        low = (0.01, -15.0, 10.0, 0.0, 1.0, 0.0)
+        high = (2.5, 10.0, 700.0, 7.0, 30.0, 1.0)
+
+        calibration = model.calibrate(
+            ts,
+            start_date=dt.datetime(1954, 1, 1),
+            duration=208,
+            area=4250.6,
+            elevation=843.0,
+            latitude=54.4848,
+            longitude=-123.3659,
+            lowerBounds=low,
+            upperBounds=high,
+            algorithm="DDS",
+            random_seed=0,
+            max_iterations=10,
+        )
+
+        assert len(calibration.history) == 10
+        assert len(model.optimized_parameters) == 6
+        np.testing.assert_almost_equal(model.obj_func, min(f for _, f in calibration.history), 4)
+        np.testing.assert_almost_equal(model.obj_func, -model.diagnostics["DIAG_NASH_SUTCLIFFE"], 4)
+
+        opt_para = model.calibrated_params
+        assert all(lo <= p <= hi for p, lo, hi in zip(opt_para, low, high))
+
+        gr4j = GR4JCN()
+        gr4j(
+            ts,
+            start_date=dt.datetime(1954, 1, 1),
+            duration=208,
+            area=4250.6,
+            elevation=843.0,
+            latitude=54.4848,
+            longitude=-123.3659,
+            params=opt_para,
+        )
+        np.testing.assert_almost_equal(
+            gr4j.diagnostics["DIAG_NASH_SUTCLIFFE"], model.diagnostics["DIAG_NASH_SUTCLIFFE"], 4
+        )
@@ -1,4 +1,7 @@
+import asyncio
 import datetime as dt
+import gc
+import json
 import os
 import tempfile
 
@@ -6,6 +9,7 @@ import numpy as np
 import xarray as xr
 import pytest
 
+import raven
 from raven.models import (
     Raven,
     GR4JCN,
@@ -17,6 +21,7 @@ from raven.models import (
     MOHYSE_OST,
     HBVEC_OST,
 )
+from raven.models.cache import ResultCache
 from raven.models.state import HRUStateVariables
 from .common import TESTDATA, _convert_2d
 import zipfile
@@ -158,6 +163,171 @@ class TestGR4JCN:
         )
         assert model.q_sim.isel(time=1).values[0] < qsim2.isel(time=1).values[0]
 
+    def test_reuse_workspace(self):
+        ts = TESTDATA["raven-gr4j-cemaneige-nc-ts"]
+        model = GR4JCN()
+        model.reuse_workspace = True
+        kwds = dict(
+            start_date=dt.datetime(2000, 1, 1),
+            end_date=dt.datetime(2002, 1, 1),
+            area=4250.6,
+            elevation=843.0,
+            latitude=54.4848,
+            longitude=-123.3659,
+        )
+        model(ts, params=(0.529, -3.396, 407.29, 1.072, 16.9, 0.947), **kwds)
+        qsim1 = model.q_sim.copy(deep=True)
+        mtime = {fn.name: fn.stat().st_mtime_ns for fn in model.rvs}
+
+        model(ts, params=(0.5289, -3.397, 407.3, 1.071, 16.89, 0.948), overwrite=True, **kwds)
+        qsim2 = model.q_sim.copy(deep=True)
+        assert qsim1.mean() != qsim2.mean()
+
+        # Only the parameters file changed.
+        assert mtime["raven-gr4j-cemaneige.rvh"] == model.rvs[-1].with_suffix(".rvh").stat().st_mtime_ns
+        assert mtime["raven-gr4j-cemaneige.rvp"] != model.rvs[-1].with_suffix(".rvp").stat().st_mtime_ns
+
+        # Outputs of the previous run are kept aside.
+        previous = list((model.workdir / "previous").rglob("*Hydrographs.nc"))
+        assert len(previous) == 1
+        with xr.open_dataset(previous[0]) as ds:
+            np.testing.assert_array_equal(ds.q_sim, qsim1)
+
+    def test_scratch(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(raven.config, "scratch_dir", str(tmp_path))
+        ts = TESTDATA["raven-gr4j-cemaneige-nc-ts"]
+        model = GR4JCN()
+        model.scratch = True
+        kwds = dict(
+            start_date=dt.datetime(2000, 1, 1),
+            end_date=dt.datetime(2002, 1, 1),
+            area=4250.6,
+            elevation=843.0,
+            latitude=54.4848,
+            longitude=-123.3659,
+            params=(0.529, -3.396, 407.29, 1.072, 16.9, 0.947),
+        )
+        model(ts, **kwds)
+
+        assert tmp_path in model.exec_path.parents
+        assert not (model.workdir / "exec").exists()
+        for key in ["hydrograph", "storage", "solution", "diagnostics"]:
+            assert model.outputs[key].parent == model.final_path
+            for fn in model.ind_outputs[key]:
+                assert tmp_path not in fn.parents and fn.exists()
+        np.testing.assert_almost_equal(model.diagnostics["DIAG_NASH_SUTCLIFFE"], -0.117301, 2)
+
+        # The scratch directory is removed along with the model.
+        scratch = model.exec_path.parent
+        del model
+        gc.collect()
+        assert not scratch.exists()
+
+        # Models run in their work directory when the scratch directory is too small.
+        monkeypatch.setattr(raven.config, "scratch_min_free", 2 ** 62)
+        model = GR4JCN()
+        model.scratch = True
+        with pytest.warns(UserWarning, match="scratch"):
+            model(ts, **kwds)
+        assert model.exec_path == model.workdir / "exec"
+
+    def test_snapshot(self):
+        ts = TESTDATA["raven-gr4j-cemaneige-nc-ts"]
+        model = GR4JCN()
+        kwds = dict(
+            start_date=dt.datetime(2000, 1, 1),
+            end_date=dt.datetime(2002, 1, 1),
+            area=4250.6,
+            elevation=843.0,
+            latitude=54.4848,
+            longitude=-123.3659,
+        )
+        model(ts, params=(0.529, -3.396, 407.29, 1.072, 16.9, 0.947), **kwds)
+
+        # Datasets are opened once.
+        hydrograph = model.hydrograph
+        assert model.hydrograph is hydrograph
+
+        snapshot = model.snapshot()
+        qsim1 = snapshot.q_sim
+        with pytest.raises(ValueError):
+            qsim1.values[0] = 0
+
+        # Outputs of the model itself remain writeable.
+        model.hydrograph.q_sim.values[0] = 0
+        model.q_sim.values[0] = 1
+
+        model(ts, params=(0.5289, -3.397, 407.3, 1.071, 16.89, 0.948), overwrite=True, **kwds)
+        assert model.hydrograph is not hydrograph
+        assert qsim1.mean() != model.q_sim.mean()
+        np.testing.assert_array_equal(qsim1, snapshot.q_sim)
+
+    def test_zarr(self):
+        pytest.importorskip("zarr")
+        ts = TESTDATA["raven-gr4j-cemaneige-nc-ts"]
+        model = GR4JCN()
+        model.zarr = True
+        model(
+            ts,
+            start_date=dt.datetime(2000, 1, 1),
+            end_date=dt.datetime(2002, 1, 1),
+            area=4250.6,
+            elevation=843.0,
+            latitude=54.4848,
+            longitude=-123.3659,
+            params=[[0.529, -3.396, 407.29, 1.072, 16.9, 0.947], [0.528, -3.4, 407.3, 1.07, 17, 0.95]],
+        )
+
+        assert model.outputs["hydrograph"].suffix == ".zarr"
+        assert model.outputs["storage"].suffix == ".zarr"
+        assert model.q_sim.dims == ("params", "time", "nbasins")
+        for i, fn in enumerate(sorted(model.ind_outputs["hydrograph"])):
+            with xr.open_dataset(fn) as ds:
+                np.testing.assert_array_equal(model.q_sim.isel(params=i), ds.q_sim)
+
+    def test_progress(self):
+        ts = TESTDATA["raven-gr4j-cemaneige-nc-ts"]
+        model = GR4JCN()
+        progress = []
+        model.progress_callback = progress.append
+        model(
+            ts,
+            start_date=dt.datetime(2000, 1, 1),
+            end_date=dt.datetime(2002, 1, 1),
+            area=4250.6,
+            elevation=843.0,
+            latitude=54.4848,
+            longitude=-123.3659,
+            params=[[0.529, -3.396, 407.29, 1.072, 16.9, 0.947], [0.528, -3.4, 407.3, 1.07, 17, 0.95]],
+        )
+
+        assert progress[-1] == 100
+        assert progress == sorted(progress)
+
+    def test_timings(self):
+        ts = TESTDATA["raven-gr4j-cemaneige-nc-ts"]
+        model = GR4JCN()
+        model(
+            ts,
+            start_date=dt.datetime(2000, 1, 1),
+            end_date=dt.datetime(2002, 1, 1),
+            area=4250.6,
+            elevation=843.0,
+            latitude=54.4848,
+            longitude=-123.3659,
+            params=[[0.529, -3.396, 407.29, 1.072, 16.9, 0.947], [0.528, -3.4, 407.3, 1.07, 17, 0.95]],
+        )
+
+        timings = model.timings
+        json.dumps(timings)
+        for phase in ["setup", "assign_files", "dump_rv", "link", "run", "parse_results", "merge_output"]:
+            assert timings["phases"][phase]["wall_time"] >= 0
+        assert timings["phases"]["dump_rv"]["calls"] == 2
+        assert timings["phases"]["run"]["wall_time"] >= max(r["wall_time"] for r in timings["runs"])
+
+        assert sorted(r["index"] for r in timings["runs"]) == [0, 1]
+        assert all(r["returncode"] == 0 and r["bytes_written"] > 0 for r in timings["runs"])
+
     def test_resume(self):
         ts = TESTDATA["raven-gr4j-cemaneige-nc-ts"]
         model_ab = GR4JCN()
@@ -286,6 +456,60 @@ class TestGR4JCN:
         z = zipfile.ZipFile(model.outputs["rv_config"])
         assert len(z.filelist) == 10
 
+    def test_arun(self):
+        ts = TESTDATA["raven-gr4j-cemaneige-nc-ts"]
+        kwds = dict(
+            start_date=dt.datetime(2000, 1, 1),
+            end_date=dt.datetime(2002, 1, 1),
+            area=4250.6,
+            elevation=843.0,
+            latitude=54.4848,
+            longitude=-123.3659,
+            suppress_output=False,
+        )
+        m1 = GR4JCN()
+        m2 = GR4JCN()
+
+        async def main():
+            await asyncio.gather(
+                m1.arun(ts, params=(0.529, -3.396, 407.29, 1.072, 16.9, 0.947), **kwds),
+                m2.arun(ts, params=[(0.529, -3.396, 407.29, 1.072, 16.9, 0.947),
+                                    (0.528, -3.4, 407.3, 1.07, 17, 0.95)], **kwds),
+            )
+
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(main())
+        loop.close()
+
+        np.testing.assert_almost_equal(m1.diagnostics["DIAG_NASH_SUTCLIFFE"], -0.117301, 2)
+        assert m2.hydrograph.dims["params"] == 2
+        assert all(r.returncode == 0 for r in m2.run_results)
+
+    def test_cache(self, tmp_path):
+        ts = TESTDATA["raven-gr4j-cemaneige-nc-ts"]
+        kwds = dict(
+            start_date=dt.datetime(2000, 1, 1),
+            end_date=dt.datetime(2002, 1, 1),
+            area=4250.6,
+            elevation=843.0,
+            latitude=54.4848,
+            longitude=-123.3659,
+            params=(0.529, -3.396, 407.29, 1.072, 16.9, 0.947),
+        )
+        model = GR4JCN()
+        model.cache = ResultCache(tmp_path / "cache")
+        model(ts, **kwds)
+        q1 = model.q_sim.copy(deep=True)
+        assert model.cache.stats["misses"] == 1
+
+        model(ts, overwrite=True, **kwds)
+        assert model.cache.stats["hits"] == 1
+        assert model.run_results == []
+        np.testing.assert_array_equal(model.q_sim, q1)
+
+        model(ts, overwrite=True, **dict(kwds, params=(0.528, -3.4, 407.3, 1.07, 17, 0.95)))
+        assert model.cache.stats["misses"] == 2
+
 
 class TestGR4JCN_OST:
     def test_simple(self):
@@ -360,6 +584,41 @@ class TestGR4JCN_OST:
             gr4j.diagnostics["DIAG_NASH_SUTCLIFFE"], d["DIAG_NASH_SUTCLIFFE"]
         )
 
+    def test_multistart(self):
+        ts = TESTDATA["ostrich-gr4j-cemaneige-nc-ts"]
+        model = GR4JCN_OST()
+        model.max_processes = 2
+        low = (0.01, -15.0, 10.0, 0.0, 1.0, 0.0)
+        high = (2.5, 10.0, 700.0, 7.0, 30.0, 1.0)
+
+        starts = model.multistart(
+            ts,
+            seeds=3,
+            start_date=dt.datetime(1954, 1, 1),
+            duration=208,
+            area=4250.6,
+            elevation=843.0,
+            latitude=54.4848,
+            longitude=-123.3659,
+            lowerBounds=low,
+            upperBounds=high,
+            algorithm="DDS",
+            random_seed=0,
+            max_iterations=10,
+        )
+
+        assert [s.seed for s in starts] == [0, 1, 2]
+        assert len({s.model.workdir for s in starts}) == 3
+        assert all(s.trajectory.shape[1] == 8 for s in starts)
+
+        # The seed 0 calibration is identical to the single start calibration.
+        np.testing.assert_almost_equal(starts[0].obj_func, -0.50717, 4)
+
+        best = min(starts, key=lambda s: s.obj_func)
+        assert model.obj_func == best.obj_func
+        np.testing.assert_almost_equal(model.calibrated_params, best.params)
+        np.testing.assert_almost_equal(model.diagnostics["DIAG_NASH_SUTCLIFFE"], -best.obj_func, 4)
+
 
 class TestHMETS:
     def test_simple(self):
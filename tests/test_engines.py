@@ -0,0 +1,166 @@
+import datetime as dt
+
+import numpy as np
+import pytest
+import xarray as xr
+
+from raven.models import Raven, GR4JCN, GR4JCN_OST, HMETS, MOHYSE, HBVEC, engines
+from .common import TESTDATA
+
+GR4JCN_PARAMS = (0.529, -3.396, 407.29, 1.072, 16.9, 0.947)
+
+HMETS_PARAMS = (9.5019, 0.2774, 6.3942, 0.6884, 1.2875, 5.4134, 2.3641, 0.0973, 0.0464, 0.1998, 0.0222, -1.0919,
+                2.6851, 0.3740, 1.0000, 0.4739, 0.0114, 0.0243, 0.0069, 310.7211, 916.1947)
+
+MOHYSE_PARAMS = (1.0, 0.0468, 4.2952, 2.658, 0.4038, 0.0621, 0.0273, 0.0453, 0.9039, 5.6167)
+
+HBVEC_PARAMS = (0.05984519, 4.072232, 2.001574, 0.03473693, 0.09985144, 0.506052, 3.438486, 38.32455, 0.4606565,
+                0.06303738, 2.277781, 4.873686, 0.5718813, 0.04505643, 0.877607, 18.94145, 2.036937, 0.4452843,
+                0.6771759, 1.141608, 1.024278)
+
+salmon = dict(
+    start_date=dt.datetime(2000, 1, 1),
+    end_date=dt.datetime(2002, 1, 1),
+    area=4250.6,
+    elevation=843.0,
+    latitude=54.4848,
+    longitude=-123.3659,
+)
+
+
+def nse(sim, obs):
+    return 1 - ((sim - obs) ** 2).sum() / ((obs - obs.mean()) ** 2).sum()
+
+
+def test_gr4j_unit_hydrographs():
+    uh1, uh2 = engines.gr4j_unit_hydrographs([1.072, 2.5])
+    np.testing.assert_allclose(uh1.sum(axis=1), 1)
+    np.testing.assert_allclose(uh2.sum(axis=1), 1)
+    assert uh1.shape == uh2.shape == (2, 5)
+
+
+def test_extraterrestrial_radiation():
+    ra = engines.extraterrestrial_radiation([0, 54.5], np.arange(1, 366))
+    assert ra.shape == (2, 365)
+    # Higher seasonal amplitude at high latitudes.
+    assert np.ptp(ra[1]) > np.ptp(ra[0])
+    assert (ra >= 0).all()
+
+
+def test_gamma_unit_hydrograph():
+    uh = engines.gamma_unit_hydrograph([9.5019, 0.9039], [0.2774, 1 / 5.6167])
+    np.testing.assert_allclose(uh.sum(axis=1), 1)
+    assert (uh >= 0).all()
+
+    uh = engines.gamma_unit_hydrograph([9.5019], [0.2774], max_size=50)
+    assert uh.shape == (1, 50)
+
+
+def test_triangular_unit_hydrograph():
+    uh = engines.triangular_unit_hydrograph([2.277781, 4.], [1.1388905, 1.])
+    np.testing.assert_allclose(uh.sum(axis=1), 1)
+    assert uh.shape == (2, 4)
+    assert uh[1].argmax() == 1
+
+
+def test_gr4jcn_engine_no_forcing():
+    n = 100
+    forcing = dict(pr=np.zeros((1, n)), tas=np.full((1, n), 10.), evspsbl=np.zeros((1, n)))
+    q = engines.gr4jcn([GR4JCN_PARAMS, GR4JCN_PARAMS], forcing, np.arange(n), area=[100.], latitude=[45.],
+                       evaporation="PET_DATA")
+    assert q.shape == (2, n, 1)
+    np.testing.assert_array_equal(q[0], q[1])
+
+    # Stores drain without forcing.
+    assert (np.diff(q[0, 10:, 0]) <= 0).all()
+
+
+@pytest.mark.parametrize("model", [Raven, GR4JCN_OST])
+def test_emulate_no_engine(model):
+    # Fails before reading any input.
+    with pytest.raises(TypeError):
+        model().emulate("missing.nc", params=GR4JCN_PARAMS, **salmon)
+
+
+class TestGR4JCN:
+    def test_emulate_vs_raven(self):
+        ts = TESTDATA["raven-gr4j-cemaneige-nc-ts"]
+
+        model = GR4JCN()
+        model(ts, params=GR4JCN_PARAMS, **salmon)
+        q_raven = model.q_sim
+
+        q = GR4JCN().emulate(ts, params=GR4JCN_PARAMS, **salmon)
+        assert q.dims == q_raven.dims
+        assert q.shape == q_raven.shape
+        np.testing.assert_array_equal(q.time, q_raven.time)
+
+        # Skip the spin-up period.
+        obs, sim = q_raven.values[60:, 0], q.values[60:, 0]
+        assert nse(sim, obs) > 0.9
+        np.testing.assert_allclose(sim.mean(), obs.mean(), rtol=0.1)
+
+    def test_emulate_parallel_params(self):
+        ts = TESTDATA["raven-gr4j-cemaneige-nc-ts"]
+        params = [GR4JCN_PARAMS, (0.528, -3.4, 407.3, 1.07, 17, 0.95)]
+
+        model = GR4JCN()
+        model(ts, params=params, **salmon)
+
+        q = GR4JCN().emulate(ts, params=params, **salmon)
+        assert q.dims == model.q_sim.dims == ("params", "time", "nbasins")
+        assert q.shape == model.q_sim.shape
+
+        for i in range(2):
+            assert nse(q.values[i, 60:, 0], model.q_sim.values[i, 60:, 0]) > 0.9
+
+
+@pytest.mark.parametrize("model, params, expected", [(HMETS, HMETS_PARAMS, -3.0132),
+                                                     (MOHYSE, MOHYSE_PARAMS, 0.194612),
+                                                     (HBVEC, HBVEC_PARAMS, 0.0186633)])
+class TestEngines:
+    """Expected values are the Nash-Sutcliffe efficiencies of Raven simulations in `test_emulators`."""
+
+    def test_emulate_nse(self, model, params, expected):
+        ts = TESTDATA["raven-gr4j-cemaneige-nc-ts"]
+        q = model().emulate(ts, params=params, **salmon)
+        assert q.dims == ("time", "nbasins")
+        assert not np.isnan(q).any()
+
+        with xr.open_dataset(ts) as ds:
+            obs = ds.qobs.sel(time=q.time).values
+        assert nse(q.values[:, 0], obs) == pytest.approx(expected, abs=0.1)
+
+    def test_emulate_vs_raven(self, model, params, expected):
+        ts = TESTDATA["raven-gr4j-cemaneige-nc-ts"]
+
+        m = model()
+        m(ts, params=params, **salmon)
+        q_raven = m.q_sim
+
+        q = model().emulate(ts, params=params, **salmon)
+        assert q.dims == q_raven.dims
+        assert q.shape == q_raven.shape
+        np.testing.assert_array_equal(q.time, q_raven.time)
+
+        # Skip the spin-up period.
+        obs, sim = q_raven.values[60:, 0], q.values[60:, 0]
+        assert nse(sim, obs) > 0.9
+        np.testing.assert_allclose(sim.mean(), obs.mean(), rtol=0.1)
+
+    def test_emulate_parallel_params(self, model, params, expected):
+        ts = TESTDATA["raven-gr4j-cemaneige-nc-ts"]
+        other = tuple(0.95 * p for p in params)
+
+        m = model()
+        hru_state = m.rvc.hru_state
+        q = m.emulate(ts, params=[params, other], **salmon)
+        assert q.dims == ("params", "time", "nbasins")
+
+        # Each row matches the simulation of its own parameter set.
+        for i, p in enumerate([params, other]):
+            np.testing.assert_allclose(q.values[i], model().emulate(ts, params=p, **salmon).values)
+        assert not np.allclose(q.values[0], q.values[1])
+
+        # Initial conditions are not set by the evaluation of derived parameters.
+        assert m.rvc.hru_state == hru_state
@@ -0,0 +1,35 @@
+import os
+
+import xarray as xr
+
+from raven.models.forcing import forcing_metadata, clear_index, _read_metadata
+from .common import TESTDATA
+
+
+def test_forcing_metadata():
+    clear_index()
+    fn = TESTDATA["raven-gr4j-cemaneige-nc-ts"]
+    meta = forcing_metadata(fn)
+
+    with xr.open_dataset(fn) as ds:
+        assert set(meta.variables) == set(ds.data_vars)
+        assert meta.variables["tmin"].dims == ds.tmin.dims
+        assert meta.variables["tmin"].units == ds.tmin.attrs.get("units")
+        assert meta.start == ds.indexes["time"][0]
+        assert meta.end == ds.indexes["time"][-1]
+
+    # The second lookup is served from the index.
+    assert forcing_metadata(fn) is meta
+    assert _read_metadata.cache_info().hits == 1
+
+
+def test_forcing_metadata_modified(tmp_path):
+    fn = tmp_path / "ts.nc"
+    xr.Dataset({"pr": (("time",), [1.0, 2.0])}, coords={"time": [0, 1]}).to_netcdf(fn)
+    meta = forcing_metadata(fn)
+    assert "tasmin" not in meta.variables
+
+    st = os.stat(fn)
+    xr.Dataset({"tasmin": (("time",), [1.0, 2.0])}, coords={"time": [0, 1]}).to_netcdf(fn)
+    os.utime(fn, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+    assert "tasmin" in forcing_metadata(fn).variables
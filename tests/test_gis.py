@@ -1,3 +1,7 @@
+import numpy as np
+import pandas as pd
+import pytest
+
 from raven.utilities import gis
 
 
@@ -12,3 +16,39 @@ class TestSelect_hybas_domain:
         bbox = (-114.65, 61.35, -114.65, 61.35)
         dom = gis.select_hybas_domain(bbox)
         assert dom == 'ar'
+
+
+class TestUpstreamIndex:
+    # Two networks: 1 <- 2 <- (3, 4), 2 <- 5 <- 6, and 10 <- 11.
+    df = pd.DataFrame({"HYBAS_ID": [5, 2, 11, 1, 4, 6, 10, 3],
+                       "NEXT_DOWN": [2, 1, 10, 0, 2, 5, 0, 2],
+                       "MAIN_BAS": [1, 1, 10, 1, 1, 1, 10, 1]})
+
+    def test_upstream(self):
+        index = gis.UpstreamIndex.from_frame(self.df)
+        assert sorted(index.upstream(1)) == [1, 2, 3, 4, 5, 6]
+        assert sorted(index.upstream(2)) == [2, 3, 4, 5, 6]
+        assert sorted(index.upstream(5)) == [5, 6]
+        assert list(index.upstream(4)) == [4]
+        assert sorted(index.upstream(10)) == [10, 11]
+
+    def test_upstream_ids(self):
+        up = gis.hydrobasins_upstream_ids(5, self.df)
+        assert list(up["HYBAS_ID"]) == [5, 6]
+
+        up = gis.hydrobasins_upstream_ids(2, self.df, index=gis.UpstreamIndex.from_frame(self.df))
+        assert list(up["HYBAS_ID"]) == [5, 2, 4, 6, 3]
+
+    def test_persist(self, tmp_path):
+        fn = tmp_path / "index.npz"
+        index = gis.hydrobasins_upstream_index(self.df, fn)
+        assert fn.exists()
+
+        loaded = gis.hydrobasins_upstream_index(self.df.iloc[:0], fn)
+        np.testing.assert_array_equal(loaded.ids, index.ids)
+        np.testing.assert_array_equal(loaded.upstream(2), index.upstream(2))
+
+    def test_loop(self):
+        df = pd.DataFrame({"HYBAS_ID": [1, 2, 3], "NEXT_DOWN": [0, 3, 2]})
+        with pytest.raises(ValueError):
+            gis.UpstreamIndex.from_frame(df)
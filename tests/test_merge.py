@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from raven.models.merge import merge_netcdf, ZarrEnsemble
+
+
+def hydrograph(q, name="basin", nbasins=1):
+    time = pd.date_range("2000-01-01", periods=len(q), freq="D")
+    return xr.Dataset(
+        data_vars={
+            "q_sim": (("time", "nbasins"), np.tile(np.asarray(q, dtype=float)[:, None], nbasins)),
+            "q_obs": (("time", "nbasins"), np.ones((len(q), nbasins))),
+            "basin_name": (("nbasins",), [name] * nbasins),
+            "precip": (("time",), np.arange(len(q), dtype=float)),
+        },
+        coords={"time": time},
+    )
+
+
+def write(datasets, path):
+    files = []
+    for i, ds in enumerate(datasets):
+        fn = path / "m{}_Hydrographs.nc".format(i)
+        ds.to_netcdf(fn)
+        files.append(fn)
+    return files
+
+
+def test_merge_params(tmp_path):
+    files = write([hydrograph([1, 2, 3]), hydrograph([4, 5, 6]), hydrograph([7, 8, 9])], tmp_path)
+    out = merge_netcdf(files, tmp_path / "out.nc", "params")
+
+    expected = xr.concat([xr.open_dataset(fn) for fn in files], "params", data_vars="different")
+    with xr.open_dataset(out) as ds:
+        xr.testing.assert_equal(ds.load(), expected.load())
+        assert ds.q_sim.dims == ("params", "time", "nbasins")
+        assert ds.q_obs.dims == ("time", "nbasins")
+
+
+def test_merge_nbasins(tmp_path):
+    files = write([hydrograph([1, 2, 3], "b1"), hydrograph([4, 5, 6], "b2")], tmp_path)
+    out = merge_netcdf(files, tmp_path / "out.nc", "nbasins")
+
+    expected = xr.concat([xr.open_dataset(fn) for fn in files], "nbasins", data_vars="different")
+    with xr.open_dataset(out) as ds:
+        xr.testing.assert_equal(ds.load(), expected.load())
+        np.testing.assert_array_equal(ds.basin_name, ["b1", "b2"])
+
+
+def test_merge_digests(tmp_path, monkeypatch):
+    from raven.models import merge
+
+    digested = []
+    digest = merge._digest
+    monkeypatch.setattr(merge, "_digest", lambda values: digested.append(values.shape) or digest(values))
+
+    files = write([hydrograph([1, 2, 3], "b1"), hydrograph([4, 5, 6], "b2"), hydrograph([7, 8, 9], "b3")], tmp_path)
+    merge_netcdf(files, tmp_path / "out.nc", "nbasins")
+
+    # Only `time` and `precip` lack the `nbasins` dimension, and they are identical among members.
+    assert digested == [(3,)] * 6
+
+
+def test_merge_incompatible(tmp_path):
+    files = write([hydrograph([1, 2, 3]), hydrograph([4, 5])], tmp_path)
+    with pytest.raises(ValueError):
+        merge_netcdf(files, tmp_path / "out.nc", "params")
+
+
+def test_merge_no_files(tmp_path):
+    with pytest.raises(ValueError):
+        merge_netcdf([], tmp_path / "out.nc", "params")
+
+
+class TestZarrEnsemble:
+    def test_params(self, tmp_path):
+        pytest.importorskip("zarr")
+        files = write([hydrograph([1, 2, 3]), hydrograph([4, 5, 6]), hydrograph([7, 8, 9])], tmp_path)
+        store = ZarrEnsemble(tmp_path / "out.zarr", "params", 3, time_chunk=2)
+
+        # Members are written in the order simulations complete.
+        for i in [2, 0, 1]:
+            assert not store.complete
+            store.write(files[i], i)
+        assert store.complete
+
+        with xr.open_zarr(str(store.path)) as ds:
+            assert ds.q_sim.dims == ("params", "time", "nbasins")
+            assert ds.q_sim.data.chunks == ((1, 1, 1), (2, 1), (1,))
+            np.testing.assert_array_equal(ds.q_sim.isel(nbasins=0), [[1, 2, 3], [4, 5, 6], [7, 8, 9]])
+            np.testing.assert_array_equal(ds.precip.isel(params=1), [0, 1, 2])
+            assert ds.basin_name.dims == ("nbasins",)
+
+    def test_nbasins(self, tmp_path):
+        pytest.importorskip("zarr")
+        files = write([hydrograph([1, 2, 3], "b1"), hydrograph([4, 5, 6], "long_basin_name")], tmp_path)
+        store = ZarrEnsemble(tmp_path / "out.zarr", "nbasins", 2)
+        for i, fn in enumerate(files):
+            store.write(fn, i)
+
+        expected = xr.concat([xr.open_dataset(fn) for fn in files], "nbasins", data_vars="different")
+        with xr.open_zarr(str(store.path)) as ds:
+            np.testing.assert_array_equal(ds.q_sim, expected.q_sim)
+            np.testing.assert_array_equal(ds.basin_name, ["b1", "long_basin_name"])
@@ -0,0 +1,43 @@
+import time
+
+from raven.models.profiling import Profile, bytes_written
+from raven.models.scheduler import RunResult
+
+
+class TestProfile:
+    def test_phase(self, tmp_path):
+        p = Profile()
+        with p.phase("dump_rv"):
+            with p.phase("dump_rv"):
+                (tmp_path / "a.rvi").write_text("x" * 1000)
+        with p.phase("dump_rv"):
+            time.sleep(0.05)
+
+        stats = p.as_dict()["phases"]["dump_rv"]
+        assert stats["calls"] == 2
+        assert stats["wall_time"] >= 0.05
+        assert stats["cpu_time"] < stats["wall_time"]
+        assert stats["bytes_written"] is None or stats["bytes_written"] >= 1000
+
+    def test_runs(self, tmp_path):
+        p = Profile()
+        with p.phase("run", children=True):
+            p.add_run(RunResult(0, ["raven"], tmp_path, 0, "", 1.5, 1.2), bytes_written=100)
+
+        out = p.as_dict()
+        assert out["runs"] == [dict(index=0, returncode=0, wall_time=1.5, cpu_time=1.2, bytes_written=100)]
+        assert out["phases"]["run"]["bytes_written"] is None or out["phases"]["run"]["bytes_written"] >= 100
+
+        p.reset()
+        assert p.as_dict() == dict(phases={}, runs=[])
+
+
+def test_bytes_written(tmp_path):
+    (tmp_path / "old.txt").write_text("x" * 10)
+    since = time.time()
+    time.sleep(0.01)
+    (tmp_path / "output").mkdir()
+    (tmp_path / "output" / "new.txt").write_text("x" * 100)
+    (tmp_path / "link.txt").symlink_to(tmp_path / "output" / "new.txt")
+
+    assert bytes_written(tmp_path, since) == 100
@@ -1,5 +1,12 @@
 import datetime as dt
+import os
+from pathlib import Path
 
+import numpy as np
+import pandas as pd
+import pytest
+
+from raven import config
 from raven.utilities import regionalization as reg
 from .common import TESTDATA
 
@@ -28,4 +35,171 @@ def test_regionalization():
     assert (qsim.max() > 1)
     assert (len(ens) == 2)
     assert 'realization' in ens.dims
+    assert ens.q_sim.dims[0] == 'realization'
+    assert (ens.q_sim.isel(realization=0) != ens.q_sim.isel(realization=1)).any()
     assert 'param' in ens.dims
+
+
+def test_regionalization_batch():
+    model = 'GR4JCN'
+    nash, params = reg.read_gauged_params(model)
+    variables = ['latitude', 'longitude', 'area', 'forest']
+    props = reg.read_gauged_properties(variables)
+    targets = pd.DataFrame({'latitude': [40.4848, 54.4848], 'longitude': [-103.3659, -123.3659],
+                            'area': [4250.6, 1000.], 'forest': [0.4, 0.6]}, index=['Salmon', 'other'])
+    kwds = dict(start_date=dt.datetime(2000, 1, 1),
+                end_date=dt.datetime(2002, 1, 1),
+                area=targets.area.values,
+                elevation='843.0',
+                latitude=targets.latitude.values,
+                longitude=targets.longitude.values,
+                ts=TESTDATA['raven-hmets-nc-ts'])
+
+    qsim, ens = reg.regionalize_batch('SP_IDW', model, nash, params, props, targets, size=2, min_NSE=0.6, **kwds)
+
+    assert qsim.dims == ('target', 'time')
+    assert ens.q_sim.dims == ('target', 'realization', 'time')
+    assert ens.parameter.dims == ('target', 'realization', 'param')
+    assert list(ens.target.values) == ['Salmon', 'other']
+
+    # Same result as the regionalization of a single target.
+    kwds.update(area=4250.6, latitude=40.4848, longitude=-103.3659)
+    q1, ens1 = reg.regionalize('SP_IDW', model, nash, params, props, targets.loc['Salmon'], size=2, **kwds)
+    np.testing.assert_allclose(qsim.sel(target='Salmon').values, q1.values.squeeze())
+    np.testing.assert_array_equal(ens.parameter.sel(target='Salmon').values, ens1.parameter.values)
+
+
+class TestDonorIndex:
+    props = reg.read_gauged_properties(['latitude', 'longitude', 'area', 'forest'])
+    target = {'latitude': 54.4848, 'longitude': -123.3659, 'area': 4250.6, 'forest': 0.4}
+
+    def test_distance(self):
+        nash, _ = reg.read_gauged_params('GR4JCN')
+        donors = self.props[nash > 0.6]
+        expected = reg.distance(donors, pd.Series(self.target)).sort_values().iloc[:5]
+
+        dist = reg.DonorIndex(self.props, nash).nearest(self.target, 5, min_NSE=0.6)
+        np.testing.assert_array_equal(dist.index, expected.index)
+        np.testing.assert_allclose(dist.values, expected.values)
+
+    def test_similarity(self):
+        nash, _ = reg.read_gauged_params('GR4JCN')
+        donors = self.props[nash > 0.6]
+        expected = reg.similarity(donors, pd.Series(self.target)).sort_values().iloc[:5]
+
+        dist = reg.DonorIndex(self.props, nash).nearest(self.target, 5, method='similarity', min_NSE=0.6)
+        np.testing.assert_array_equal(dist.index, expected.index)
+        np.testing.assert_allclose(dist.values, expected.values)
+
+    def test_model(self):
+        nash = pd.DataFrame({model: reg.read_gauged_params(model)[0] for model in ['GR4JCN', 'HMETS']})
+        index = reg.DonorIndex(self.props, nash)
+
+        for model in nash:
+            dist = index.nearest(self.target, 5, model=model, min_NSE=0.7)
+            assert (nash[model][dist.index] > 0.7).all()
+            assert len(index.donors(model, 0.7)) == (nash[model] > 0.7).sum()
+
+
+class TestReadTable:
+    @pytest.fixture
+    def csv(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(config, 'table_cache_dir', str(tmp_path / 'cache'))
+        reg.clear_tables()
+        fn = tmp_path / 'table.csv'
+        fn.write_text("ID,NASH,X1\n1,0.5,10.\n2,0.8,20.\n")
+        yield fn
+        reg.clear_tables()
+
+    def test_cached(self, csv):
+        table = reg.read_table(csv)
+        assert reg.read_table(csv) is table
+        assert table.loc[2, 'X1'] == 20.
+
+    def test_modified(self, csv):
+        table = reg.read_table(csv)
+        csv.write_text("ID,NASH,X1\n1,0.5,10.\n2,0.8,30.\n")
+        os.utime(csv, ns=(csv.stat().st_atime_ns, csv.stat().st_mtime_ns + 10 ** 9))
+
+        new = reg.read_table(csv)
+        assert new is not table
+        assert new.loc[2, 'X1'] == 30.
+
+    def test_binary(self, csv, monkeypatch):
+        table = reg.read_table(csv)
+        assert len(list(Path(config.table_cache_dir).glob('table-*.npz'))) == 1
+
+        # Another process loads the binary copy instead of parsing the CSV file.
+        reg.clear_tables()
+        monkeypatch.setattr(reg.pd, 'read_csv', None)
+        pd.testing.assert_frame_equal(reg.read_table(csv), table)
+
+    def test_memory_only(self, csv, monkeypatch):
+        monkeypatch.setattr(config, 'table_cache_dir', None)
+        reg.read_table(csv)
+        assert not Path(csv.parent / 'cache').exists()
+
+    def test_read_gauged_params(self):
+        nash, params = reg.read_gauged_params('GR4JCN')
+        nash[:] = 0
+        assert (reg.read_gauged_params('GR4JCN')[0] != 0).any()
+
+
+class TestMLR:
+    properties = ['latitude', 'longitude', 'area', 'forest']
+
+    def test_fit(self):
+        rng = np.random.RandomState(0)
+        source = pd.DataFrame(rng.uniform(size=(50, 2)), columns=['a', 'b'])
+        coef = np.array([[1., -2.], [3., 0.5], [-1., 4.]])
+        params = pd.DataFrame(coef[0] + source.values @ coef[1:], columns=['x1', 'x2'])
+        params['x3'] = rng.normal(size=50)
+
+        fit = reg.fit_mlr(source, params)
+        np.testing.assert_allclose(fit.coef[:, :2], coef)
+        np.testing.assert_allclose(fit.r2[:2], 1)
+        assert fit.r2[2] < 0.5
+
+        target = {'b': 0.2, 'a': 0.1}
+        np.testing.assert_allclose(fit.predict(target)[0, :2], [1 + 0.3 - 0.2, -2 + 0.05 + 0.8])
+        assert fit.predict(source.iloc[:3]).shape == (3, 3)
+
+    def test_multiple_linear_regression(self):
+        nash, params = reg.read_gauged_params('GR4JCN')
+        props = reg.read_gauged_properties(self.properties)
+        fit = reg.gauged_mlr('GR4JCN', self.properties, 0.6)
+
+        valid = nash > 0.6
+        mlr_params, r2 = reg.multiple_linear_regression(props[valid], params[valid], props.iloc[:1])
+        np.testing.assert_allclose(mlr_params, fit.predict(props.iloc[:1])[0])
+        np.testing.assert_allclose(r2, fit.r2)
+
+    def test_reference(self):
+        # Compare with an ordinary least squares fit of each parameter in turn, as done with statsmodels' OLS.
+        nash, params = reg.read_gauged_params('GR4JCN')
+        props = reg.read_gauged_properties(self.properties)
+        valid = nash > 0.6
+        source, params = props.where(valid).dropna(), params.where(valid).dropna()
+        target = pd.DataFrame([{'latitude': 54.4848, 'longitude': -123.3659, 'area': 4250.6, 'forest': 0.4}])
+
+        x = np.column_stack([np.ones(len(source)), source.values])
+        n, k = source.shape
+        fit = reg.fit_mlr(source, params)
+        mlr_params, r2 = reg.multiple_linear_regression(source, params, target)
+
+        for i, name in enumerate(params):
+            y = params[name].values
+            coef = np.linalg.lstsq(x, y, rcond=None)[0]
+            rsquared = 1 - ((y - x @ coef) ** 2).sum() / ((y - y.mean()) ** 2).sum()
+            rsquared_adj = 1 - (n - 1) / (n - k - 1) * (1 - rsquared)
+
+            np.testing.assert_allclose(fit.coef[:, i], coef, rtol=1e-8)
+            np.testing.assert_allclose(r2[i], rsquared_adj, rtol=1e-8)
+            np.testing.assert_allclose(mlr_params[i], coef[0] + target[self.properties].values[0] @ coef[1:],
+                                       rtol=1e-8)
+
+    def test_cached(self):
+        fit = reg.gauged_mlr('GR4JCN', self.properties, 0.6)
+        assert reg.gauged_mlr('GR4JCN', tuple(self.properties), 0.6) is fit
+        assert reg.gauged_mlr('GR4JCN', self.properties, 0.7) is not fit
+        assert fit.params == tuple(reg.read_gauged_params('GR4JCN')[1].columns)
@@ -1,3 +1,5 @@
+import os
+
 import pytest
 import raven
 from raven.models.rv import (
@@ -54,6 +56,38 @@ class TestRVFile:
         assert isinstance(rvf.tags, list)
         assert "params.GR4J_X3" in rvf.tags
 
+    def test_render(self, tmp_path):
+        fn = tmp_path / "test.rvi"
+        fn.write_text(":RunName {run_name}\n:Note {{literal}}\n")
+        rvf = RVFile(fn)
+
+        assert rvf.render() == ":RunName {run_name}\n:Note {{literal}}\n"
+        assert rvf.render(run_name="a") == ":RunName a\n:Note {literal}\n"
+
+        rvf.content = ":RunName test\n:Note {{literal}}\n"
+        assert "run_name" not in rvf.tags
+        assert rvf.render(run_name="a") == ":RunName test\n:Note {literal}\n"
+
+    def test_write_unchanged(self, tmp_path):
+        fn = tmp_path / "test.rvi"
+        fn.write_text(":RunName {run_name}\n")
+        rvf = RVFile(fn)
+        path = tmp_path / "model"
+        path.mkdir()
+
+        out = rvf.write(path, run_name="a")
+        assert out.read_text() == ":RunName a\n"
+        mtime = out.stat().st_mtime_ns
+
+        # Identical content is not written again.
+        os.utime(str(out), ns=(0, 0))
+        rvf.write(path, run_name="a")
+        assert out.stat().st_mtime_ns == 0
+
+        rvf.write(path, run_name="b")
+        assert out.read_text() == ":RunName b\n"
+        assert out.stat().st_mtime_ns >= mtime
+
     def test_fail(self):
         fn = Path(raven.__file__).parent
         with pytest.raises(ValueError):
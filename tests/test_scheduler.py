@@ -0,0 +1,109 @@
+import asyncio
+import sys
+
+import pytest
+
+from raven.models.scheduler import (Job, RunResult, run_processes, arun_processes, default_max_processes, read_progress,
+                                    ProgressTracker)
+
+
+def test_default_max_processes():
+    assert default_max_processes() >= 1
+
+
+def test_run_processes(tmp_path):
+    script = "import sys, time; time.sleep(0.1); sys.stderr.write('err{}'); sys.exit({})"
+    jobs = [([sys.executable, "-c", script.format(i, i % 2)], tmp_path) for i in range(5)]
+
+    completed = []
+    results = run_processes(jobs, max_processes=2, callback=completed.append)
+
+    assert len(completed) == 5
+    assert [r.index for r in results] == list(range(5))
+    assert [r.returncode for r in results] == [0, 1, 0, 1, 0]
+    assert results[3].stderr == "err3"
+    assert all(r.wall_time >= 0.1 for r in results)
+
+
+def test_run_processes_cpu_time(tmp_path):
+    script = "import time; t = time.process_time(); exec('while time.process_time() - t < {}: pass')"
+    jobs = [([sys.executable, "-c", script.format(t)], tmp_path) for t in (0.1, 0.5)]
+    results = run_processes(jobs, max_processes=2)
+
+    assert 0.1 <= results[0].cpu_time < 0.5
+    assert results[1].cpu_time >= 0.5
+
+
+def test_run_processes_bound(tmp_path):
+    # Each job records the number of sibling jobs running at the same time using lock files.
+    script = ("import os, time, pathlib; p = pathlib.Path('{i}.lock'); p.touch(); "
+              "n = len(list(pathlib.Path('.').glob('*.lock'))); time.sleep(0.2); "
+              "pathlib.Path('{i}.n').write_text(str(n)); p.unlink()")
+    jobs = [([sys.executable, "-c", script.format(i=i)], tmp_path) for i in range(6)]
+    run_processes(jobs, max_processes=2)
+
+    assert max(int(f.read_text()) for f in tmp_path.glob("*.n")) <= 2
+
+
+def test_run_processes_progress(tmp_path):
+    script = ("import time, pathlib; p = pathlib.Path('progress{i}.txt'); "
+              "[(p.write_text('{{\"progress\": %d}}' % v), time.sleep(0.1)) for v in (10, 50, 100)]")
+    jobs = [Job([sys.executable, "-c", script.format(i=i)], tmp_path, tmp_path / "progress{}.txt".format(i))
+            for i in range(3)]
+
+    progress = []
+    run_processes(jobs, max_processes=2, progress=lambda i, p: progress.append((i, p)), progress_interval=0.02)
+
+    assert {i for i, p in progress} == {0, 1, 2}
+    assert (0, 10) in progress
+    assert len(progress) == len(set(progress))
+
+
+def test_progress_tracker():
+    reported = []
+    tracker = ProgressTracker(4, reported.append, min_interval=60)
+    tracker.update(0, 40)
+    tracker.update(1, 40)  # Throttled
+    tracker.update(0, 20)  # Progress does not go backwards
+    assert reported == [10]
+    assert tracker.percent == 20
+
+    for i in range(4):
+        tracker.completed(RunResult(i, [], ".", 0, ""))
+    assert reported == [10, 100]
+
+
+def test_run_processes_invalid(tmp_path):
+    with pytest.raises(ValueError):
+        run_processes([], max_processes=-1)
+
+
+def test_arun_processes(tmp_path):
+    script = ("import time, pathlib; p = pathlib.Path('progress{i}.txt'); "
+              "[(p.write_text('{{\"progress\": %d}}' % v), time.sleep(0.1)) for v in (10, 50, 100)]; "
+              "exit({i} % 2)")
+    jobs = [Job([sys.executable, "-c", script.format(i=i)], tmp_path, tmp_path / "progress{}.txt".format(i))
+            for i in range(4)]
+
+    completed = []
+    progress = []
+    loop = asyncio.new_event_loop()
+    try:
+        results = loop.run_until_complete(arun_processes(jobs, max_processes=2, callback=completed.append,
+                                                         progress=lambda i, p: progress.append((i, p)),
+                                                         poll_interval=0.02))
+    finally:
+        loop.close()
+
+    assert len(completed) == 4
+    assert [r.returncode for r in results] == [0, 1, 0, 1]
+    assert (0, 10) in progress
+    assert max(p for i, p in progress if i == 0) >= 50
+
+
+def test_read_progress(tmp_path):
+    fn = tmp_path / "Raven_progress.txt"
+    assert read_progress(fn) is None
+
+    fn.write_text('{\n  "processing": true,\n  "progress": 42\n}')
+    assert read_progress(fn) == 42
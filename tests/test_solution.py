@@ -0,0 +1,49 @@
+import numpy as np
+
+from raven.models.rv import parse_solution
+from raven.models.solution import Solution, read_solution, write_solution
+from raven.models.state import HRUStateVariables, BasinStateVariables
+from .common import TESTDATA
+
+
+class TestSolution:
+    def test_read(self):
+        sol = read_solution(TESTDATA["solution.rvc"])
+        ref = parse_solution(TESTDATA["solution.rvc"].read_text())
+
+        assert sol.timestamp == "2002-01-01 00:00:00.00"
+        assert sol.hru_state.dtype.names[:3] == ("index", "surface_water", "atmosphere")
+        assert set(sol.hru_state.dtype.names[1:]) == set(HRUStateVariables._fields)
+        assert sol.hru_state["index"].tolist() == [1]
+        np.testing.assert_array_equal(sol.hru_state[0].tolist()[1:], ref["HRUStateVariableTable"]["data"][1])
+
+        basin = sol.basin_state[0]
+        assert basin.name == "watershed"
+        assert basin.qout == [13.21660]
+        assert basin.qoutlast == 13.29232
+        assert len(basin.qin) == 20
+
+    def test_round_trip(self, tmp_path):
+        sol = read_solution(TESTDATA["solution.rvc"].read_text())
+        hru_state = np.repeat(sol.hru_state, 3)
+        hru_state["index"] = [1, 2, 3]
+        hru_state["soil0"] = [0.1, 1 / 3, 1e-9]
+
+        fn = write_solution(sol._replace(hru_state=hru_state), tmp_path / "solution.rvc")
+        out = read_solution(fn)
+
+        np.testing.assert_array_equal(out.hru_state, hru_state)
+        assert out.basin_state == sol.basin_state
+        assert out.attributes == sol.attributes
+        assert out.units == sol.units
+        assert out.timestamp == sol.timestamp
+
+    def test_write_defaults(self, tmp_path):
+        hru_state = np.zeros(2, dtype=[("index", int), ("soil0", float), ("conv_stor12", float)])
+        hru_state["index"] = [1, 2]
+        fn = write_solution(Solution(hru_state, [BasinStateVariables()]), tmp_path / "solution.rvc")
+
+        assert ":Attributes,SOIL[0],CONV_STOR[12]" in fn.read_text()
+        out = read_solution(fn)
+        np.testing.assert_array_equal(out.hru_state, hru_state)
+        assert out.basin_state[0].name == "watershed"
@@ -0,0 +1,110 @@
+import numpy as np
+import pytest
+
+from raven.models.rv import RVC
+from raven.models.solution import read_solution
+from raven.models.state import HRUStates, BasinStates, HRUStateVariables, BasinStateVariables
+from .common import TESTDATA
+
+
+class TestHRUStates:
+    def test_defaults(self):
+        s = HRUStates(index=range(1, 4), soil0=[1, 2, 3], soil1=15)
+
+        assert len(s) == 3
+        np.testing.assert_array_equal(s["soil0"], [1, 2, 3])
+        np.testing.assert_array_equal(s["soil1"], [15, 15, 15])
+        assert s.record(2) == HRUStateVariables(soil0=2, soil1=15)
+        assert s.record(4) is None
+
+        with pytest.raises(ValueError):
+            HRUStates(index=[1], soil99=0)
+
+    def test_update(self):
+        s = HRUStates(index=range(1, 1001), soil0=50)
+        s["soil1"][:10] = 15
+        s.update(soil0=25, where=s["index"] > 500)
+        s.update({"snow": 1})
+
+        assert s["soil1"].sum() == 150
+        assert s["soil0"].sum() == 500 * 50 + 500 * 25
+        assert (s["snow"] == 1).all()
+
+    def test_slice(self):
+        s = HRUStates(index=range(1, 11), soil0=np.arange(10))
+        sub = s[::2]
+
+        assert sub["index"].tolist() == [1, 3, 5, 7, 9]
+        assert sub[-1]["soil0"].tolist() == [8]
+        assert s[s["soil0"] > 7]["index"].tolist() == [9, 10]
+
+    def test_set(self):
+        s = HRUStates(index=[])
+        s.set(1, HRUStateVariables(soil0=1))
+        s.set(2, HRUStateVariables(soil0=2))
+        s.set(1, HRUStateVariables(soil0=3))
+        assert s["soil0"].tolist() == [3, 2]
+
+        s.drop(1)
+        assert s["index"].tolist() == [2]
+
+    def test_array_valued(self):
+        # Derived states evaluated for several parameter sets at once hold one value per parameter set.
+        soil0 = np.array([1., 2., 3.])
+        s = HRUStates(index=[])
+        s.set(1, HRUStateVariables(soil0=soil0, soil1=15))
+        np.testing.assert_array_equal(s.record(1).soil0, soil0)
+        assert s.record(1).soil1 == 15
+
+        s = HRUStates.from_records([HRUStateVariables(soil0=1)])
+        s.set(1, HRUStateVariables(soil0=soil0))
+        np.testing.assert_array_equal(s.record(1).soil0, soil0)
+
+    def test_text(self):
+        s = HRUStates.from_records([HRUStateVariables(soil0=1), HRUStateVariables(soil0=1 / 3)])
+        rows = s.to_text().splitlines()
+
+        assert len(rows) == 2
+        assert rows[1].startswith("2,0.0,0.0,0.0,0.0,{!r},".format(1 / 3))
+        assert len(rows[1].split(",")) == len(HRUStateVariables._fields) + 1
+
+    def test_table(self):
+        sol = read_solution(TESTDATA["solution.rvc"])
+        s = HRUStates.from_table(sol.hru_state)
+        np.testing.assert_array_equal(s.to_table(), sol.hru_state[list(s.to_table().dtype.names)])
+
+
+class TestBasinStates:
+    def test_records(self):
+        b = BasinStates.from_records([BasinStateVariables(index=3, name="a"), BasinStateVariables(index=5, name="b")])
+
+        assert b["index"].tolist() == [3, 5]
+        assert b["qin"].shape == (2, 20)
+        assert b.record(5) == BasinStateVariables(index=5, name="b", qout=[0], qlat=[0, 0, 0], qin=[0] * 20)
+
+    def test_ragged(self):
+        b = BasinStates.from_records([BasinStateVariables(qout=(1, 2)), BasinStateVariables(index=2)])
+        assert b.record(1).qout == [1, 2]
+        assert b.record(2).qout == [0]
+
+        b.set(3, BasinStateVariables(qout=(1, 2, 3)))
+        assert b.record(3).qout == [1, 2, 3]
+        assert ":Qout,3,1.0,2.0,3.0,0.0" in b.to_text()
+
+
+class TestRVCStates:
+    def test_parse(self):
+        rvc = RVC()
+        rvc.parse(TESTDATA["solution.rvc"].read_text())
+
+        assert rvc.hru_states["atmosphere"].tolist() == [821.98274]
+        assert rvc.basin_states["qlat"].tolist() == [[13.21660, 13.29232, 13.36898]]
+
+        # Text output can be parsed back.
+        rvc.hru_states["soil0"] += 1
+        other = RVC()
+        other.parse(":HRUStateVariableTable\n:Attributes,{}\n{}\n:EndHRUStateVariableTable\n"
+                    ":BasinStateVariables\n{}\n:EndBasinStateVariables\n".format(
+                        ",".join(HRUStateVariables._fields), rvc.txt_hru_state, rvc.txt_basin_state))
+        assert other.hru_state == rvc.hru_state
+        assert other.basin_state == rvc.basin_state